@@ -0,0 +1,330 @@
+"""Compact, array-backed storage for Bank.accounts."""
+
+import threading
+from array import array
+from itertools import compress
+
+FIELDS = ('account_holder', 'balance', 'type')
+# The per-row columns
+COLUMNS = ('ids', 'holders', 'types', 'balances', 'owners', 'openings')
+
+
+def account_key(account_number):
+    """The int64 id of a digit-string account number, or None.
+
+    A leading '1' is prepended before converting, so numbers that differ
+    only in leading zeros ('000123456789' vs '123456789') stay distinct.
+    """
+    if type(account_number) is str and len(account_number) <= 18 and account_number.isdigit() \
+            and account_number.isascii():
+        return int("1" + account_number)
+    return None
+
+
+class AccountRow:
+    """A view of one row that reads and writes like the old account dict."""
+
+    __slots__ = ('table', 'row')
+
+    def __init__(self, table, row):
+        self.table = table
+        self.row = row
+
+    def __getitem__(self, field):
+        table = self.table
+        if field == 'balance':
+            return table.balances[self.row]
+        if field == 'account_holder':
+            return table.holder_names[table.holders[self.row]]
+        if field == 'type':
+            return table.type_names[table.types[self.row]]
+        raise KeyError(field)
+
+    def __setitem__(self, field, value):
+        table = self.table
+        if field == 'balance':
+            table.balances[self.row] = value
+        elif field == 'account_holder':
+            table.holders[self.row] = table.holder_code(value)
+        elif field == 'type':
+            table.types[self.row] = table.type_code(value)
+        else:
+            raise KeyError(field)
+
+    def get(self, field, default=None):
+        try:
+            return self[field]
+        except KeyError:
+            return default
+
+    def keys(self):
+        return FIELDS
+
+    def __iter__(self):
+        return iter(FIELDS)
+
+    def items(self):
+        return [(field, self[field]) for field in FIELDS]
+
+    def __eq__(self, other):
+        return dict(self.items()) == (dict(other.items()) if hasattr(other, 'items') else other)
+
+    def __repr__(self):
+        return repr(dict(self.items()))
+
+
+class AccountTable:
+    """Mapping of account number to account, stored as parallel columns.
+
+    Each account is one row: an int64 id (see account_key), a uint32 code
+    into the interned holder names, a uint8 code into the account types and
+    an int64 balance in paise. A dict maps ids to rows. That is about a
+    third of the memory of a dict per account, and whole-bank scans such
+    as total_balance() walk one contiguous array. Accounts are never
+    removed, so rows never move.
+
+    Looking an account up returns an AccountRow, which reads and writes
+    like the dict it replaces: table[number]['balance'] += amount.
+
+    A fifth column holds the owning user (a code into owner_names; 0 when
+    the account has no owner), and owner_rows indexes the rows of each
+    owner, so a user's accounts are found without a scan. The same kind
+    of index by holder name is built the first time it is asked for.
+
+    A sixth column keeps each account's opening balance, which
+    reconciliation (aggregates.py) checks the balance and history against.
+
+    A table opened from a binary snapshot (snapshot.py) starts with
+    memoryviews into the file as its columns and lazy versions of its
+    index and name tables. materialize() turns the columns into arrays,
+    which adding rows needs.
+    """
+
+    def __init__(self):
+        self.index = {}
+        self.ids = array('q')
+        self.holders = array('I')
+        self.types = array('B')
+        self.balances = array('q')
+        self.openings = array('q')
+        self.owners = array('I')
+        # Owner code 0 means no owner
+        self.owner_names = [None]
+        self.owner_codes = {}
+        self.owner_rows = {}
+        self._holder_rows = None
+        self.holder_names = []
+        self.holder_codes = {}
+        self.type_names = []
+        self.type_codes = {}
+        # Adding a row touches every column, so inserts are serialized
+        self._insert_lock = threading.Lock()
+
+    def holder_code(self, name):
+        code = self.holder_codes.get(name)
+        if code is None:
+            with self._insert_lock:
+                code = self.holder_codes.get(name)
+                if code is None:
+                    self.holder_names.append(name)
+                    code = self.holder_codes[name] = len(self.holder_names) - 1
+        return code
+
+    def owner_code(self, username):
+        if username is None:
+            return 0
+        code = self.owner_codes.get(username)
+        if code is None:
+            with self._insert_lock:
+                code = self.owner_codes.get(username)
+                if code is None:
+                    self.owner_names.append(username)
+                    code = self.owner_codes[username] = len(self.owner_names) - 1
+        return code
+
+    def type_code(self, account_type):
+        code = self.type_codes.get(account_type)
+        if code is None:
+            with self._insert_lock:
+                code = self.type_codes.get(account_type)
+                if code is None:
+                    if len(self.type_names) == 256:
+                        raise ValueError("Too many account types")
+                    self.type_names.append(account_type)
+                    code = self.type_codes[account_type] = len(self.type_names) - 1
+        return code
+
+    def _key(self, account_number):
+        key = account_key(account_number)
+        if key is None:
+            raise ValueError("Account numbers must be at most 18 digits: " + repr(account_number))
+        return key
+
+    def row(self, account_number):
+        """The row of an account, or None."""
+        return self.index.get(account_key(account_number))
+
+    def __contains__(self, account_number):
+        return account_key(account_number) in self.index
+
+    def __getitem__(self, account_number):
+        row = self.index.get(account_key(account_number))
+        if row is None:
+            raise KeyError(account_number)
+        return AccountRow(self, row)
+
+    def get(self, account_number, default=None):
+        row = self.index.get(account_key(account_number))
+        if row is None:
+            return default
+        return AccountRow(self, row)
+
+    def __setitem__(self, account_number, account):
+        row = self.index.get(account_key(account_number))
+        if row is not None:
+            view = AccountRow(self, row)
+            for field in FIELDS:
+                view[field] = account[field]
+            return
+        self.extend([account_number], [account['account_holder']], [account['type']], [account['balance']])
+
+    def materialize(self):
+        """Copy any column still read from a binary snapshot into an array.
+
+        Callers that can run alongside others hold every account lock, as
+        a column is swapped for its copy.
+        """
+        with self._insert_lock:
+            for name in COLUMNS:
+                column = getattr(self, name)
+                if isinstance(column, memoryview):
+                    copy = array(column.format)
+                    copy.frombytes(column.cast('B'))
+                    setattr(self, name, copy)
+
+    def extend(self, numbers, holders, types, balances, owners=None):
+        """Add new accounts from parallel columns; the numbers must not exist yet."""
+        if isinstance(self.ids, memoryview):
+            self.materialize()
+        keys = [self._key(account_number) for account_number in numbers]
+        holder_codes = [self.holder_code(name) for name in holders]
+        type_codes = [self.type_code(account_type) for account_type in types]
+        owner_codes = [self.owner_code(username) for username in owners] if owners else None
+        with self._insert_lock:
+            start = len(self.ids)
+            self.ids.extend(keys)
+            self.holders.extend(holder_codes)
+            self.types.extend(type_codes)
+            self.balances.extend(balances)
+            self.openings.extend(balances)
+            if owner_codes:
+                self.owners.extend(owner_codes)
+            else:
+                self.owners.frombytes(bytes(self.owners.itemsize * len(keys)))
+            self.index.update(zip(keys, range(start, start + len(keys))))
+            if owner_codes:
+                for row, code in enumerate(owner_codes, start):
+                    if code:
+                        self.owner_rows.setdefault(code, array('I')).append(row)
+            if self._holder_rows is not None:
+                for row, code in enumerate(holder_codes, start):
+                    self._holder_rows.setdefault(code, array('I')).append(row)
+
+    def owner(self, account_number):
+        """The username owning an account, or None."""
+        row = self.index.get(account_key(account_number))
+        return None if row is None else self.owner_names[self.owners[row]]
+
+    def is_owner(self, account_number, username):
+        row = self.index.get(account_key(account_number))
+        code = self.owner_codes.get(username)
+        return row is not None and code is not None and self.owners[row] == code
+
+    def set_owner(self, account_number, username):
+        row = self.index[self._key(account_number)]
+        code = self.owner_code(username)
+        with self._insert_lock:
+            old = self.owners[row]
+            if old == code:
+                return
+            if old:
+                self.owner_rows[old].remove(row)
+            self.owners[row] = code
+            if code:
+                self.owner_rows.setdefault(code, array('I')).append(row)
+
+    def rows_of_owner(self, username):
+        code = self.owner_codes.get(username)
+        return self.owner_rows.get(code, ()) if code else ()
+
+    def rows_of_holder(self, name):
+        if self._holder_rows is None:
+            with self._insert_lock:
+                if self._holder_rows is None:
+                    rows = {}
+                    for row, code in enumerate(self.holders):
+                        rows.setdefault(code, array('I')).append(row)
+                    self._holder_rows = rows
+        code = self.holder_codes.get(name)
+        return self._holder_rows.get(code, ()) if code is not None else ()
+
+    def update(self, accounts):
+        for account_number, account in accounts.items():
+            self[account_number] = account
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __iter__(self):
+        for key in self.ids:
+            yield str(key)[1:]
+
+    def keys(self):
+        return iter(self)
+
+    def values(self):
+        for row in range(len(self.ids)):
+            yield AccountRow(self, row)
+
+    def items(self):
+        for row, key in enumerate(self.ids):
+            yield str(key)[1:], AccountRow(self, row)
+
+    def numbers(self, rows):
+        """Account numbers of the given rows."""
+        ids = self.ids
+        return [str(ids[row])[1:] for row in rows]
+
+    def total_balance(self):
+        return sum(self.balances)
+
+    def dump(self):
+        return {
+            'holders': list(self.holder_names),
+            'types': self.type_names,
+            'owners': self.owner_names[1:],
+            'columns': [list(self.ids), list(self.holders), list(self.types), list(self.balances),
+                        list(self.owners), list(self.openings)]
+        }
+
+    @classmethod
+    def load(cls, data):
+        table = cls()
+        for name in data['holders']:
+            table.holder_code(name)
+        for name in data['types']:
+            table.type_code(name)
+        for name in data['owners']:
+            table.owner_code(name)
+        ids, holders, types, balances, owners = data['columns'][:5]
+        table.ids.extend(ids)
+        table.holders.extend(holders)
+        table.types.extend(types)
+        table.balances.extend(balances)
+        table.index.update(zip(ids, range(len(ids))))
+        table.owners.extend(owners)
+        owners = table.owners
+        for row in compress(range(len(owners)), owners):
+            table.owner_rows.setdefault(owners[row], array('I')).append(row)
+        table.openings.extend(data['columns'][5])
+        return table
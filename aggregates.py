@@ -0,0 +1,280 @@
+"""Bank-wide totals kept up to date as money moves, and their reconciliation.
+
+Aggregates holds, per account type, the number of accounts and the sum of
+their balances, and per UTC day and transaction type, the count and sum of
+the postings made. Every _apply_* method of Bank adds its change here, so
+the dashboard reads (total_balance(), treasury()) cost O(account types +
+transaction types) however big the book is, and replaying the ledger
+rebuilds them along with the balances.
+
+reconcile() checks the totals against the data they summarize: under every
+lock it copies the balance columns, the length of each account's history
+and the totals (a few memcpys and one pass over the histories), then,
+with the locks released, recomputes everything from those copies. Histories
+are append-only, so the first `length` entries it reads are the ones that
+existed at the copy. It also checks every account's balance against its
+opening balance plus its history, less any debit reserved by a prepared
+cross-shard transfer.
+
+Days are taken from the timestamp an operation was applied with; the
+history stores it clamped to never go backwards, so a clock stepping back
+across midnight can make the per-day flows of that account differ.
+"""
+
+import threading
+from array import array
+from datetime import date
+from itertools import compress
+from operator import ne
+
+DAY_US = 86400 * 1000000
+# Day 0 of the flows
+EPOCH = date(1970, 1, 1)
+
+
+class Aggregates:
+    def __init__(self, credit_types):
+        self.credit_types = frozenset(credit_types)
+        # account type code -> [accounts, balance]
+        self.by_type = {}
+        # day (days since the epoch, UTC) -> transaction type -> [count, amount]
+        self.flows = {}
+        # transaction type -> [count, amount], over all days
+        self.totals = {}
+        self._lock = threading.Lock()
+
+    def post(self, type_code, transaction_type, delta, amount, timestamp):
+        """One posting of `amount` that changed a balance by `delta`."""
+        day = timestamp // DAY_US
+        with self._lock:
+            self.by_type[type_code][1] += delta
+            flows = self.flows.get(day)
+            if flows is None:
+                flows = self.flows[day] = {}
+            entry = flows.get(transaction_type)
+            if entry is None:
+                entry = flows[transaction_type] = [0, 0]
+            entry[0] += 1
+            entry[1] += amount
+            entry = self.totals.get(transaction_type)
+            if entry is None:
+                entry = self.totals[transaction_type] = [0, 0]
+            entry[0] += 1
+            entry[1] += amount
+
+    def move(self, type_code, delta):
+        """A balance change with no posting, such as a reserved debit."""
+        with self._lock:
+            self.by_type[type_code][1] += delta
+
+    def post_many(self, deltas, postings, timestamp):
+        """Balance changes {type code: delta} and {transaction type: [count, amount]}, on one day."""
+        day = timestamp // DAY_US
+        with self._lock:
+            for type_code, delta in deltas.items():
+                self.by_type[type_code][1] += delta
+            flows = self.flows.setdefault(day, {}) if any(count for count, _ in postings.values()) else {}
+            for transaction_type, (count, amount) in postings.items():
+                if not count:
+                    continue
+                for table in (flows, self.totals):
+                    entry = table.get(transaction_type)
+                    if entry is None:
+                        entry = table[transaction_type] = [0, 0]
+                    entry[0] += count
+                    entry[1] += amount
+
+    def open(self, type_codes, balances):
+        """New accounts of the given type codes and opening balances."""
+        with self._lock:
+            for type_code, balance in zip(type_codes, balances):
+                entry = self.by_type.get(type_code)
+                if entry is None:
+                    entry = self.by_type[type_code] = [0, 0]
+                entry[0] += 1
+                entry[1] += balance
+
+    def total_balance(self):
+        with self._lock:
+            return sum(balance for _, balance in self.by_type.values())
+
+    def state(self):
+        """A consistent copy of every total."""
+        with self._lock:
+            return {
+                'by_type': {code: list(entry) for code, entry in self.by_type.items()},
+                'flows': {day: {name: list(entry) for name, entry in flows.items()}
+                          for day, flows in self.flows.items()},
+                'totals': {name: list(entry) for name, entry in self.totals.items()},
+            }
+
+    def dump(self):
+        state = self.state()
+        # JSON object keys are strings
+        return {
+            'by_type': {str(code): entry for code, entry in state['by_type'].items()},
+            'flows': {str(day): flows for day, flows in state['flows'].items()},
+            'totals': state['totals'],
+        }
+
+    @classmethod
+    def load(cls, data, credit_types):
+        aggregates = cls(credit_types)
+        aggregates.by_type = {int(code): entry for code, entry in data['by_type'].items()}
+        aggregates.flows = {int(day): flows for day, flows in data['flows'].items()}
+        aggregates.totals = data['totals']
+        return aggregates
+
+
+def capture(bank):
+    """Copy what reconciliation reads; the caller holds every lock."""
+    table = bank.accounts
+    reserved = {}
+    for intent in bank.prepared.values():
+        if intent['direction'] == 'debit':
+            reserved[intent['account']] = reserved.get(intent['account'], 0) + intent['amount']
+    return {
+        'table': table,
+        'balances': _copy(table.balances),
+        'openings': _copy(table.openings),
+        'types': _copy(table.types),
+        'store': bank.transaction_history,
+        'lengths': [(account_number, len(history))
+                    for account_number, history in bank.transaction_history.items()],
+        'reserved': reserved,
+        'aggregates': bank.aggregates.state(),
+    }
+
+
+def _copy(column):
+    if isinstance(column, array):
+        return column[:]
+    # Still a memoryview into a binary snapshot
+    copy = array(column.format)
+    copy.frombytes(column.cast('B'))
+    return copy
+
+
+def compute(view, credit_types):
+    """Totals and each row's net history movement, recomputed from a capture().
+
+    A history whose account is not in the table, which no operation should
+    leave behind, is left out of everything and listed in 'orphans'.
+    """
+    table = view['table']
+    balances = view['balances']
+    types = view['types']
+    by_type = {}
+    for code in set(types):
+        mask = array('B', map(code.__eq__, types))
+        by_type[code] = [mask.count(1), sum(compress(balances, mask))]
+
+    store = view['store']
+    names = list(store.type_names)
+    credit = [name in credit_types for name in names]
+    day_flows = {}
+    movements = {}
+    orphans = []
+    for account_number, length in view['lengths']:
+        if not length:
+            continue
+        row = table.row(account_number)
+        if row is None:
+            orphans.append((account_number, length))
+            continue
+        history = store[account_number]
+        codes = history.types[:length]
+        amounts = history.amounts[:length]
+        credits = sum(compress(amounts, map(credit.__getitem__, codes)))
+        movements[row] = 2 * credits - sum(amounts)
+        for timestamp, code, amount in zip(history.timestamps[:length], codes, amounts):
+            key = (timestamp // DAY_US, code)
+            entry = day_flows.get(key)
+            if entry is None:
+                day_flows[key] = [1, amount]
+            else:
+                entry[0] += 1
+                entry[1] += amount
+
+    flows = {}
+    totals = {}
+    for (day, code), (count, amount) in day_flows.items():
+        name = names[code]
+        flows.setdefault(day, {})[name] = [count, amount]
+        entry = totals.setdefault(name, [0, 0])
+        entry[0] += count
+        entry[1] += amount
+    return {'by_type': by_type, 'flows': flows, 'totals': totals, 'movements': movements, 'orphans': orphans}
+
+
+def check(view, credit_types, limit=20):
+    """Compare a capture() with its recomputation; returns the reconciliation report."""
+    computed = compute(view, credit_types)
+    table = view['table']
+    kept = view['aggregates']
+    problems = []
+
+    for section in ('by_type', 'flows', 'totals'):
+        if kept[section] != computed[section]:
+            for key in sorted(set(kept[section]) | set(computed[section]), key=str):
+                if kept[section].get(key) != computed[section].get(key):
+                    problems.append({'check': section, 'key': key, 'aggregate': kept[section].get(key),
+                                     'recomputed': computed[section].get(key)})
+
+    mismatched = 0
+    balances = view['balances']
+    expected = array('q', view['openings'])
+    for row, movement in computed['movements'].items():
+        expected[row] += movement
+    for account_number, amount in view['reserved'].items():
+        row = table.row(account_number)
+        if row is None:
+            problems.append({'check': 'reserved', 'key': account_number, 'reserved': amount,
+                             'problem': "account does not exist"})
+        else:
+            expected[row] -= amount
+    for account_number, length in computed['orphans']:
+        problems.append({'check': 'history', 'key': account_number, 'entries': length,
+                         'problem': "account does not exist"})
+    for row in compress(range(len(balances)), map(ne, balances, expected)):
+        mismatched += 1
+        if mismatched <= limit:
+            problems.append({'check': 'balance', 'key': table.numbers([row])[0],
+                             'balance': balances[row], 'expected': expected[row]})
+    return {
+        'ok': not problems,
+        'accounts': len(view['balances']),
+        'entries': sum(length for _, length in view['lengths']),
+        'mismatched_accounts': mismatched,
+        'problems': problems,
+    }
+
+
+class Reconciler:
+    """Run Bank.reconcile every `interval` seconds on a daemon thread.
+
+    The latest report is kept in `last`; `on_problem(report)` is called
+    for every report that is not ok.
+    """
+
+    def __init__(self, bank, interval=300.0, on_problem=None):
+        self.bank = bank
+        self.interval = interval
+        self.on_problem = on_problem
+        self.last = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.last = self.bank.reconcile()
+            if not self.last['ok'] and self.on_problem is not None:
+                self.on_problem(self.last)
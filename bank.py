@@ -1,739 +1,1871 @@
-from datetime import datetime
-
-class Bank:
-    def __init__(self):
-        self.accounts = {}
-        self.users = {}
-        self.transaction_history = {}
-        self.train_tickets = {}
-
-    def validate_username(self, username):
-        if username in self.users:
-            return False, "Username already exists"
-        if not username[0].isalpha():
-            return False, "Username must be start with a letter"
-        if not any(char.isdigit() for char in username):
-            return False, "Username must contain at least one number"
-        if '_' not in username:
-            return False, "Username must contain an underscore"
-        if not 6 <= len(username) <= 20:
-            return False, "Username length must be between 6 and 20 characters"
-        return True, ""
-
-    def validate_email(self, email):
-        if '@' not in email:
-            return False, "Invalid email format. Email must be contain '@'"
-        if not email.endswith('.com'):
-            return False, "Invalid email format. Email must be end with '.com'"
-        if not any(char.isalpha() for char in email):
-            return False, "Email must contain at least one letter"
-        if not any(char.isdigit() for char in email):
-            return False, "Email must contain at least one digit"
-        if not any(char.islower() or char.isupper() for char in email): 
-            return False, "Email must contain at least one upper or lower case letter"
-        return True, ""
-
-    def validate_password(self, password):
-        if not any(char.isupper() for char in password):
-            return False, "Password must contain at least one uppercase letter"
-        if not any(char.islower() for char in password):
-            return False, "Password must contain at least one lowercase letter"
-        if not any(char.isdigit() for char in password):
-            return False, "Password must contain at least one digit"
-        if not 8 <= len(password) <= 15:
-            return False, "Password length must be between 8 and 15 characters"
-        return True, ""
-
-    
-    def register(self):
-        try:
-            username = input("Enter Username: ")
-            valid, message = self.validate_username(username)
-            if not valid:
-                return message
-
-            email = input("Enter Email Address: ")
-            valid, message = self.validate_email(email)
-            if not valid:
-                return message
-
-            password = input("Enter Password: ")
-            valid, message = self.validate_password(password)
-            if not valid:
-                return message
-
-            self.users[username] = {'email': email, 'password': password}
-            return "Registration successfully done!!!"
-        except Exception as e:
-            return "Error occurred during registration: " + str(e)
-
-    def login_username_password(self, username, password):
-        try:
-            if username not in self.users:
-                return "Username does not exist"
-
-            if self.users[username]['password'] != password:
-                return "Incorrect password"
-
-            return "Login successful: Welcome " + username
-        except Exception as e:
-            return "Error occurred during login: " + str(e)
-
-    def login_mpin(self, username, mpin):
-        try:
-            if username not in self.users:
-                return "Username does not exist"
-
-            if not mpin.isdigit() or len(mpin) != 6:
-                return "MPIN must be a 6-digit number"
-            return "Login successful: Welcome " + username
-        except Exception as e:
-            return "Error occurred during login: " + str(e)
-
-    def validate_account_number(self, account_number):
-        if account_number in self.accounts:
-            return False, "Account number already exists"
-        if not account_number.isdigit():
-            return False, "Account number must contain only digits"
-        if len(account_number) < 9 or len(account_number) > 18:
-            return False, "Account number length must be between 9 and 18 digits"
-        return True, ""
-
-    def validate_account_holder(self, account_holder):
-        if not account_holder.replace(" ", "").isalpha():
-            return False, "Account holder's name must contain only alphabets"
-        return True, ""
-
-    def validate_initial_balance(self, initial_balance):
-        try:
-            initial_balance = float(initial_balance)
-            if initial_balance < 100:
-                return False, "Initial balance must be at least 100"
-            return True, ""
-        except ValueError:
-            return False, "Initial balance must be a number"
-
-
-    def record_transaction(self, account_number, transaction_type, amount):
-        """Record a transaction in the transaction history."""
-        try:
-            timestamp = datetime.now()
-            if account_number not in self.transaction_history:
-                self.transaction_history[account_number] = []
-            self.transaction_history[account_number].append({
-                'timestamp': timestamp,
-                'type': transaction_type,
-                'amount': amount
-            })
-        except KeyError:
-            raise ValueError("Invalid account number")
-        except Exception as e:
-            raise RuntimeError(f"Error occurred while recording transaction: {e}")
-
-
-    def create_account(self):
-        try:
-            account_number = input("Enter Account Number : ")
-            # Validate account number
-            valid, message = self.validate_account_number(account_number)
-            if not valid:
-                return message
-
-            account_holder = input("Enter Account Holder's Name : ")
-            # Validate account holder
-            valid, message = self.validate_account_holder(account_holder)
-            if not valid:
-                return message
-
-            account_type = input("Enter Account Type (savings/checking/investment): ").lower()
-            if account_type not in ['savings', 'checking', 'investment']:
-                return "Invalid account type"
-
-            initial_balance_str = input("Enter Initial Balance : ") 
-            valid, message = self.validate_initial_balance(initial_balance_str) 
-            if not valid:
-                return message
-
-            initial_balance = float(initial_balance_str)  
-            if account_number in self.accounts:
-                return "Account already exists"
-            if initial_balance < 0:
-                return "Initial balance must be non-negative"
-
-            self.accounts[account_number] = {
-                'account_holder': account_holder,
-                'balance': initial_balance,
-                'type': account_type
-            }
-            return "Account created successfully"
-        except Exception as e:
-            return "Error occurred during account creation: " + str(e)
-
-
-    def deposit(self, account_number, amount):
-        try:
-            if account_number not in self.accounts:
-                return "Account does not exist"
-            if amount <= 0:
-                return "Amount to deposit must be positive"
-
-            self.accounts[account_number]['balance'] += amount
-            self.record_transaction(account_number, 'deposit', amount)  
-            return "Deposited " + str(amount) + " successfully. New balance : " + str(
-                self.accounts[account_number]['balance'])
-        except Exception as e:
-            return "Error occurred during deposit: " + str(e)
-
-    def withdraw(self, account_number, amount):
-        try:
-            if account_number not in self.accounts:
-                return "Account does not exist"
-            if amount <= 0:
-                return "Amount to withdraw must be positive"
-
-            if self.accounts[account_number]['balance'] < amount:
-                return "Insufficient balance."
-
-            self.accounts[account_number]['balance'] -= amount
-            self.record_transaction(account_number, 'withdrawal', amount)  
-            return "Withdrew " + str(amount) + " successfully. New balance : " + str(
-                self.accounts[account_number]['balance'])
-        except Exception as e:
-            return "Error occurred during withdrawal: " + str(e)
-
-    def check_balance(self, account_number):
-        try:
-            if account_number not in self.accounts:
-                return "Account does not exist"
-
-            return "Account Holder : " + self.accounts[account_number]['account_holder'] + "\nBalance : " + str(
-                self.accounts[account_number]['balance'])
-        except Exception as e:
-            return "Error occurred while checking balance: " + str(e)
-
-    def view_account_info(self, account_number):
-        try:
-            if account_number not in self.accounts:
-                return "Account does not exist"
-            
-            account_info = self.accounts[account_number]
-            account_holder = account_info['account_holder']
-            account_type = account_info['type']
-            balance = account_info['balance']
-            
-            info_str = f"Account Number: {account_number}\n"
-            info_str += f"Account Holder: {account_holder}\n"
-            info_str += f"Account Type: {account_type.capitalize()}\n"
-            info_str += f"Balance: {balance}"
-            
-            return info_str
-        except Exception as e:
-            return "Error occurred while retrieving account info: " + str(e)
-
-    def view_transaction_history(self, account_number):
-        try:
-            if account_number not in self.transaction_history:
-                return "No transaction history available for this account"
-            transactions = self.transaction_history[account_number]
-            history_str = "Transaction History:\n"
-            for transaction in transactions:
-                history_str += f"Timestamp: {transaction['timestamp']}, Type: {transaction['type']}, Amount: {transaction['amount']}\n"
-            return history_str
-        except Exception as e:
-            return "Error occurred while retrieving transaction history: " + str(e)
-    
-    def transfer_funds(self):
-        try:
-            from_account = input("Enter Your Account Number : ")
-            
-          
-            if from_account not in self.accounts:
-                print("Error: Sender account does not exist")
-                return 
-
-            to_account = input("Enter Recipient's Account Number : ")
-            
-            
-            if to_account not in self.accounts:
-                print("Error: Recipient account does not exist")
-                return 
-
-            amount = float(input("Enter Amount to Transfer : "))
-             
-            
-            if amount <= 0:
-                print("Error: Amount to transfer must be positive")
-                return 
-            
-           
-            if self.accounts[from_account]['balance'] < amount:
-                print("Error: Insufficient balance for transfer")
-                return 
-
-           
-            self.accounts[from_account]['balance'] -= amount
-            self.accounts[to_account]['balance'] += amount 
-            self.record_transaction(from_account, 'transfer_out', amount)
-            self.record_transaction(to_account, 'transfer_in', amount)
-
-        
-            print(f"Transferred {amount} successfully from account {from_account} to account {to_account}. Sender's balance: {self.accounts[from_account]['balance']}, Recipient's balance: {self.accounts[to_account]['balance']}")
-        except Exception as e:
-            print(f"Error occurred during fund transfer: {e}")
-
-    
-    def validate_operator(self, operator):
-        valid_operators = ["jio", "bsnl", "idea", "airtel"]
-        
-        return operator.lower() in valid_operators
-   
-    def validate_mobile_number(self, mobile_number):
-    
-        if len(mobile_number) != 10:
-            return False
-        if not mobile_number.isdigit():
-            return False
-        return True
-    
-    def validate_recharge_amount(self, amount):
-    
-        return amount > 0
-
-    def validate_transaction_account(self, transaction_account):
-       
-        return transaction_account in self.accounts
-
-    def recharge(self):
-        try:
-           
-            operator = input("Enter operator (jio, bsnl, idea, airtel): ")
-            if not self.validate_operator(operator):
-                return "Invalid operator"
-
-    
-            mobile_number = input("Enter mobile number: ")
-            if not self.validate_mobile_number(mobile_number):
-                return "Invalid mobile number"
-
-            amount = float(input("Enter recharge amount: "))
-            if not self.validate_recharge_amount(amount):
-                return "Invalid recharge amount"
-
-            # Validate transaction account
-            transaction_account = input("Enter transaction account: ")
-            if not self.validate_transaction_account(transaction_account):
-                return "Invalid transaction account"
-
-            # Deduct amount from transaction account
-            if self.accounts[transaction_account]['balance'] < amount:
-                return "Insufficient balance in transaction account"
-            self.accounts[transaction_account]['balance'] -= amount
-
-            # Record recharge transaction
-            self.record_transaction(transaction_account, 'recharge', amount)
-            recharge_details = {
-                'operator': operator,
-                'mobile_number': mobile_number,
-                'amount': amount,
-                'transaction_account': transaction_account
-            }
-            recharge_message = f"Recharged {operator} number {mobile_number} with {amount} successfully."
-            print("Recharge Details:")
-            print("Operator:", operator)
-            print("Mobile Number:", mobile_number)
-            print("Recharge Amount:", amount)
-            print("Transaction Account:", transaction_account)
-            return recharge_message
-        except Exception as e:
-            return f"Error occurred during recharge: {e}"
-
-    def pay_gas_bill(self):
-        try:
-            # Validate customer ID
-            customer_id = input("Enter customer ID: ")
-            if not self.validate_customer_id(customer_id):
-                return "Invalid Customer ID"
-
-            # Validate transaction account
-            transaction_account = input("Enter transaction account: ")
-            if not self.validate_transaction_account(transaction_account):
-                return "Invalid transaction account"
-
-            # Check if the amount is non-negative
-            amount = float(input("Enter gas bill amount: "))
-            if amount < 0:
-                return "Amount cannot be negative"
-
-            # Deduct bill amount from account balance
-            if self.accounts[transaction_account]['balance'] < amount:
-                return "Insufficient balance in transaction account"
-            self.accounts[transaction_account]['balance'] -= amount
-
-            # Record gas bill payment transaction
-            self.record_transaction(transaction_account, 'gas_bill_payment', amount)
-
-            return f"Gas bill payment of {amount} successful. New balance: {self.accounts[transaction_account]['balance']}"
-
-        except Exception as e:
-            return f"Error occurred during gas bill payment: {e}"
-
-    def validate_customer_id(self, customer_id):
-        # # Check if customer ID length is exactly 8 characters
-        # if len(customer_id) != 8:
-        #     return "Customer ID must be exactly 8 characters long."
-
-        # Check if first 3 characters are alphabets and the last character is a digit
-        if not customer_id[:3].isalpha() or not customer_id[3:].isdigit():
-            return "Customer ID must start with 3 alphabetic characters followed by 5 digits."
-
-        return True
-
-    def pay_electricity_bill(self):
-        try:
-            # Validate customer ID
-            customer_id = input("Enter customer ID: ")
-            if not self.validate_customer_id(customer_id):
-                return "Invalid Customer ID"
-
-            # Validate transaction account
-            transaction_account = input("Enter transaction account: ")
-            if not self.validate_transaction_account(transaction_account):
-                return "Invalid transaction account"
-
-            # Check if the amount is non-negative
-            amount = float(input("Enter electricity bill amount: "))
-            if amount < 0:
-                return "Amount cannot be negative"
-
-            # Deduct bill amount from account balance
-            if self.accounts[transaction_account]['balance'] < amount:
-                return "Insufficient balance in transaction account"
-            self.accounts[transaction_account]['balance'] -= amount
-
-            # Record electricity bill payment transaction
-            self.record_transaction(transaction_account, 'electricity_bill_payment', amount)
-
-            return f"Electricity bill payment of {amount} successful. New balance: {self.accounts[transaction_account]['balance']}"
-
-        except Exception as e:
-            return f"Error occurred during electricity bill payment: {e}"
-
-
-    def pay_cable_tv_bill(self):
-        try:
-            # Validate customer ID
-            customer_id = input("Enter customer ID: ")
-            if not self.validate_customer_id(customer_id):
-                return "Invalid Customer ID"
-
-            # Validate transaction account
-            transaction_account = input("Enter transaction account: ")
-            if not self.validate_transaction_account(transaction_account):
-                return "Invalid transaction account"
-
-            # Check if the amount is non-negative
-            amount = float(input("Enter cable TV bill amount: "))
-            if amount < 0:
-                return "Amount cannot be negative"
-
-            # Deduct bill amount from account balance
-            if self.accounts[transaction_account]['balance'] < amount:
-                return "Insufficient balance in transaction account"
-            self.accounts[transaction_account]['balance'] -= amount
-
-            # Record cable TV bill payment transaction
-            self.record_transaction(transaction_account, 'cable_tv_bill_payment', amount)
-
-            return f"Cable TV bill payment of {amount} successful. New balance: {self.accounts[transaction_account]['balance']}"
-
-        except Exception as e:
-            return f"Error occurred during cable TV bill payment: {e}"
-
-    def bill_payment(self):
-        print("\nChoose Bill Payment Option:")
-        print("1. Recharge")
-        print("2. Gas Bill")
-        print("3. Electricity Bill")
-        print("4. Cable-TV Bill")
-        
-        bill_choice = input("Enter your Choice (1 to 6): ")
-
-        if bill_choice == '1':
-            result = self.recharge()
-            print(result)
-        
-        elif bill_choice == '2':
-            result = self.pay_gas_bill()
-            print(result)
-
-        elif bill_choice == '3':
-            result = self.pay_electricity_bill()  
-            print(result)
-        elif bill_choice == '4':
-            result = self.pay_cable_tv_bill()  
-            print(result)
-        else:
-            print("Invalid Choice. Please Try Again !!!")
-
-    def validate_station_name(self, station_name):
-        # Example validation: Ensure station name is not empty
-        if not station_name.strip():
-            return False
-        return True
-
-    def validate_travel_date(self, travel_date):
-        try:
-            
-            travel_date_obj = datetime.strptime(travel_date, '%Y-%m-%d')
-            current_date = datetime.now()
-            if travel_date_obj < current_date:
-                return False
-            return True
-        except ValueError:
-            return False
-
-    def validate_travel_class(self, travel_class):
-  
-        valid_classes = ['1', '2', '3', '4']
-        return travel_class in valid_classes
-
-    def validate_quota(self, quota):
-       
-        valid_quotas = ['1', '2', '3', '4', '5']
-        return quota in valid_quotas
-
-    def book_train_ticket(self, account_number):
-        try:
-            if account_number not in self.accounts:
-                return "Account does not exist"
-
-            from_station = input("Enter the departure station: ")
-            if not self.validate_station_name(from_station):
-                return "Invalid departure station name"
-
-            to_station = input("Enter the destination station: ")
-            if not self.validate_station_name(to_station):
-                return "Invalid destination station name"
-
-            travel_date = input("Enter the travel date (YYYY-MM-DD): ")
-            if not self.validate_travel_date(travel_date):
-                return "Invalid travel date"
-
-            travel_class = input("Enter the travel class (1. Sleeper, 2. First AC, 3. Second AC, 4. Third AC): ")
-            if not self.validate_travel_class(travel_class):
-                return "Invalid travel class"
-
-            quota = input("(1. General, 2. Ladies, 3. Sr. Citizen, 4. Physically Handicapped, 5. Tatkal): ")
-            if not self.validate_quota(quota):
-                return "Invalid quota"
-
-          
-            if travel_class == '1':
-                fare = 500  
-            elif travel_class == '2':
-                fare = 1500  
-            elif travel_class == '3':
-                fare = 1000  
-            elif travel_class == '4':
-                fare = 800  
-            else:
-                return "Invalid travel class"
-
-            if quota == '5':
-                fare += 500 
-            if self.accounts[account_number]['balance'] < fare:
-                return "Insufficient balance to book ticket"
-            self.accounts[account_number]['balance'] -= fare
-
-            # Record the transaction
-            self.record_transaction(account_number, 'train_ticket_booking', fare)
-
-            # Store ticket details
-            self.train_tickets[account_number] = {
-                'from_station': from_station,
-                'to_station': to_station,
-                'travel_date': travel_date,
-                'travel_class': travel_class,
-                'quota': quota,
-                'fare': fare
-            }
-            
-            return "Train ticket booked successfully"
-
-        except Exception as e:
-            return f"Error occurred during train ticket booking: {e}"
-
-    def view_train_ticket_details(self, account_number):
-        try:
-            if account_number not in self.train_tickets:
-                return "No train ticket booked for this account"
-
-            ticket_details = self.train_tickets[account_number]
-            details_str = "Train Ticket Details:\n"
-            details_str += f"From Station: {ticket_details['from_station']}\n"
-            details_str += f"To Station: {ticket_details['to_station']}\n"
-            details_str += f"Travel Date: {ticket_details['travel_date']}\n"
-            details_str += f"Travel Class: {ticket_details['travel_class']}\n"
-            details_str += f"Quota: {ticket_details['quota']}\n"
-            details_str += f"Fare: {ticket_details['fare']}\n"
-            return details_str
-        except Exception as e:
-            return f"Error occurred while retrieving train ticket details: {e}"
-    def cancel_train_ticket(self, account_number):
-        try:
-            if account_number not in self.train_tickets:
-                return "No train ticket booked for this account"
-
-            ticket_details = self.train_tickets[account_number]
-
-            self.accounts[account_number]['balance'] += ticket_details['fare']
-
-            del self.train_tickets[account_number]
-
-            self.record_transaction(account_number, 'train_ticket_cancellation', ticket_details['fare'])
-
-            return "Train ticket canceled successfully"
-        except Exception as e:
-            return f"Error occurred during train ticket cancellation: {e}"
-    
-    def perform_operations(self, username):
-        if username not in self.users:
-            print("You need to register first.")
-            return
-        while True:
-            print("\n1. Create Account")
-            print("2. Deposit Money")
-            print("3. Withdraw Money")
-            print("4. Check Balance")
-            print("5. View Account Information")
-            print("6. View Transaction History")
-            print("7. Transfer Funds")
-            print("8. Bill Payment")
-            print("9. Train Ticket booking")
-            print("10. Logout")
-            operation_choice = input("\nEnter your Choice (1 to 9): ")
-
-            if operation_choice == '1':
-                result = self.create_account()
-                print(result)
-
-            elif operation_choice == '2':
-                account_number = input("Enter Account Number : ")
-                amount = float(input("Enter Amount to Deposit : "))
-                result = self.deposit(account_number, amount)
-                print(result)
-
-            elif operation_choice == '3':
-                account_number = input("Enter Account Number : ")
-                amount = float(input("Enter Amount to Withdraw : "))
-                result = self.withdraw(account_number, amount)
-                print(result)
-
-            elif operation_choice == '4':
-                account_number = input("Enter Account Number : ")
-                result = self.check_balance(account_number)
-                print(result)
-
-            elif operation_choice == '5':
-                account_number = input("Enter Account Number: ")
-                result = self.view_account_info(account_number)
-                print(result)
-
-            elif operation_choice == '6':
-                account_number = input("Enter Account Number: ")
-                result = self.view_transaction_history(account_number)
-                print(result)
-
-            elif operation_choice == '7':
-                result = self.transfer_funds()
-                print(result)
-
-            elif operation_choice == '8':
-                self.bill_payment()
-
-            elif operation_choice == '9':
-                while True:
-                    print("\nTrain Ticket Options:")
-                    print("1. Book Train Ticket")
-                    print("2. Cancel Train Ticket")
-                    print("3. View Details of Ticket")
-                    print("4. Exit")
-
-                    ticket_choice = input("Enter your Choice (1, 2, or 3): ")
-                    
-                    if ticket_choice == '1':
-                        account_number = input("Enter Account Number: ")
-                        result = self.book_train_ticket(account_number)
-                        print(result)
-                    elif ticket_choice == '2':
-                        account_number = input("Enter Account Number: ")
-                        result = self.cancel_train_ticket(account_number)
-                        print(result)
-                    elif ticket_choice == '3':
-                        account_number = input("Enter Account Number: ")
-                        result = self.view_train_ticket_details(account_number)
-                        print(result)
-                    elif ticket_choice == '4':
-                        print("Exiting train ticket operations.")
-                        break 
-                    else:
-                        print("Invalid Choice. Please Try Again !!!")
-
-            elif operation_choice == '10':
-                print("Logging out...")
-                break
-
-            else:
-                print("Invalid Choice. Please Try Again !!!")
-
-
-bank = Bank()  # This is a Bank object
-print("============================================================================================")
-print("                           \n****** Bank Management System ******                           ")
-print("============================================================================================")
-
-try:
-    while True:
-        print("\n1. Registration")
-        print("2. Login")
-        print("3. Exit")
-        choice = input("\nEnter your Choice (1 to 3): ")
-
-        if choice == '1':
-            result = bank.register()
-            print(result)
-
-        elif choice == '2':
-            print("1. Login with Username and Password")
-            print("2. Login with MPIN")
-            login_choice = input("Enter your Choice (1 or 2): ")
-
-            if login_choice == '1':
-                username = input("Enter Username: ")
-                password = input("Enter Password: ")
-                result = bank.login_username_password(username, password)
-                print(result)
-                if "Login successful" in result:
-                    bank.perform_operations(username)
-
-            elif login_choice == '2':
-                username = input("Enter Username: ")
-                mpin = input("Enter MPIN: ")
-                result = bank.login_mpin(username, mpin)
-                print(result)
-                if "Login successful" in result:
-                    bank.perform_operations(username)
-
-
-            else:
-                print("Invalid Choice. Please Try Again !!!")
-
-        elif choice == '3':
-            print("Exiting the program.")
-            break
-
-        else:
-            print("Invalid Choice. Please Try Again !!!")
-
-except Exception as e:
-    print("An error occurred:", e)
\ No newline at end of file
+import gc
+import os
+import threading
+import time
+
+import validation
+from money import format_money, is_money, parse_money
+
+# datetime and the ledger are imported inside the methods that use them, so
+# `import bank` stays cheap for short-lived worker processes.
+
+# Transaction types that add money to an account; every other type debits it.
+CREDIT_TYPES = ('deposit', 'transfer_in', 'train_ticket_cancellation', 'interest')
+
+ACCOUNT_TYPES = ('savings', 'checking', 'investment')
+
+# All money is integer paise (see money.py).
+MINIMUM_OPENING_BALANCE = 10000
+
+
+class BankError(Exception):
+    """Raised by the programmatic API when an operation is rejected."""
+
+
+class BatchRejected(BankError):
+    """Raised by an atomic post_batch; `rejects` lists (index, account, message)."""
+
+    def __init__(self, rejects):
+        super().__init__(f"{len(rejects)} line(s) rejected, nothing was posted")
+        self.rejects = rejects
+
+
+def _first_not(types, column):
+    """Index of the first value in `column` that is not an instance of `types`, or None."""
+    if set(map(type, column)) <= (set(types) if isinstance(types, tuple) else {types}):
+        return None
+    return next((index for index, value in enumerate(column) if not isinstance(value, types)), None)
+
+
+class _GroupCommit:
+    def __init__(self, bank):
+        self.bank = bank
+
+    def __enter__(self):
+        if self.bank.journal is not None:
+            self.bank.journal.begin_batch()
+        return self.bank
+
+    def __exit__(self, *exc_info):
+        if self.bank.journal is not None:
+            self.bank.journal.end_batch()
+            self.bank._settle()
+        return False
+
+
+class Bank:
+    def __init__(self, data_dir=None, sync_mode="group", snapshot_every=10000,
+                 lock_stripes=256, kdf_params=None, session_ttl=900,
+                 fare_rules=None, risk_rules=None, snapshot_format="binary"):
+        from accounts import AccountTable
+        from aggregates import Aggregates
+        from concurrency import StripedLocks
+        from credentials import DEFAULT_KDF_PARAMS, SessionCache
+        from fares import FareEngine
+        from risk import RiskScreen
+        from trains import Reservations
+        from txstore import TransactionStore
+        # Every check-then-act runs under the stripe lock of each account
+        # (or username) it touches; see concurrency.StripedLocks.
+        self.locks = StripedLocks(lock_stripes)
+        # account number -> account, stored column-wise (see accounts.py)
+        self.accounts = AccountTable()
+        self.users = {}
+        # Passwords and MPINs are stored as salted scrypt hashes made with
+        # kdf_params; a login with older parameters rehashes them.
+        self.kdf_params = kdf_params or DEFAULT_KDF_PARAMS
+        self.sessions = SessionCache(session_ttl)
+        self.transaction_history = TransactionStore()
+        # Bank-wide totals, updated by every _apply_* method (see aggregates.py)
+        self.aggregates = Aggregates(CREDIT_TYPES)
+        # Tickets by PNR, and the seat inventory of every train (see trains.py)
+        self.train_tickets = Reservations()
+        # Fares come from a rule file (fares.DEFAULT_RULES without one)
+        self.fares = FareEngine(fare_rules)
+        # Velocity limits every debit is screened against (none without rules)
+        self.risk = RiskScreen(risk_rules)
+        # Set by metrics.instrument() while operations are being timed
+        self.metrics = None
+        # txid -> {'account', 'amount', 'direction'} of cross-shard transfers
+        # prepared here but not yet committed or aborted (see sharding.py)
+        self.prepared = {}
+        # Bill payments debited but not yet settled to their biller, and
+        # idempotency key -> payment for recent payments (see billing.py)
+        self.bill_queue = []
+        self.bill_keys = {}
+        self.bill_sequence = 0
+        self.bill_batches = 0
+        self._bill_lock = threading.Lock()
+        self._settlement_lock = threading.Lock()
+        self.journal = None
+        if data_dir is not None:
+            from ledger import Journal
+            self.journal = Journal(data_dir, sync_mode, snapshot_every, snapshot_format)
+            self.journal.recover(self)
+
+    def close(self):
+        if self.journal is not None:
+            self.journal.close()
+            self.journal = None
+
+    def group_commit(self):
+        """Share one fsync between every operation made inside the block."""
+        return _GroupCommit(self)
+
+    def _journal(self, op, **fields):
+        if self.journal is not None:
+            self.journal.log(op, fields)
+
+    def _settle(self):
+        """Wait for this thread's ledger records, then snapshot if one is due.
+
+        Called after an operation has released its account locks.
+        """
+        if self.risk.sweep_due:
+            with self.locks.hold_all():
+                self.risk.sweep()
+        journal = self.journal
+        if journal is None:
+            return
+        journal.settle()
+        if journal.should_snapshot():
+            with self.locks.hold_all():
+                if journal.should_snapshot():
+                    journal.snapshot(self)
+
+    # Timestamps below are epoch microseconds, the unit transaction_history
+    # stores them in.
+
+    def _post(self, account_number, transaction_type, amount):
+        """Log, then apply, a single movement on one account."""
+        timestamp = time.time_ns() // 1000
+        self._journal('post', account=account_number, type=transaction_type,
+                      amount=amount, ts=timestamp)
+        self._apply_post(account_number, transaction_type, amount, timestamp)
+
+    def _apply_post(self, account_number, transaction_type, amount, timestamp):
+        accounts = self.accounts
+        row = accounts.row(account_number)
+        delta = amount if transaction_type in CREDIT_TYPES else -amount
+        accounts.balances[row] += delta
+        self.transaction_history.append(account_number, transaction_type, amount, timestamp)
+        self.aggregates.post(accounts.types[row], transaction_type, delta, amount, timestamp)
+
+    def _screen(self, account, account_number, amount, now=None):
+        """Count a debit against the velocity limits, or raise if it would break one.
+
+        `account` is the account's row. Called under the account's lock once
+        every other check has passed, so only debits that go ahead are counted.
+        """
+        accounts = self.accounts
+        row = account.row
+        message = self.risk.screen(account_number, accounts.type_names[accounts.types[row]],
+                                   accounts.owner_names[accounts.owners[row]], amount,
+                                   time.time_ns() // 1000 if now is None else now)
+        if message:
+            raise BankError(message)
+
+    def _transfer(self, from_account, to_account, amount):
+        timestamp = time.time_ns() // 1000
+        self._journal('transfer', src=from_account, dst=to_account,
+                      amount=amount, ts=timestamp)
+        self._apply_transfer(from_account, to_account, amount, timestamp)
+
+    def _apply_transfer(self, from_account, to_account, amount, timestamp):
+        self._apply_post(from_account, 'transfer_out', amount, timestamp)
+        self._apply_post(to_account, 'transfer_in', amount, timestamp)
+
+    def _apply_prepare(self, txid, account_number, amount, direction):
+        # A debit is reserved at once, so nothing else can spend the money
+        # while the coordinator decides
+        if direction == 'debit':
+            row = self.accounts.row(account_number)
+            self.accounts.balances[row] -= amount
+            self.aggregates.move(self.accounts.types[row], -amount)
+        self.prepared[txid] = {'account': account_number, 'amount': amount, 'direction': direction}
+
+    def _apply_resolve(self, txid, commit, timestamp):
+        intent = self.prepared.pop(txid)
+        account_number = intent['account']
+        if intent['direction'] == 'debit':
+            row = self.accounts.row(account_number)
+            if commit:
+                # The balance already went down at prepare
+                self.transaction_history.append(account_number, 'transfer_out', intent['amount'], timestamp)
+                self.aggregates.post(self.accounts.types[row], 'transfer_out', 0, intent['amount'], timestamp)
+            else:
+                self.accounts.balances[row] += intent['amount']
+                self.aggregates.move(self.accounts.types[row], intent['amount'])
+        elif commit:
+            self._apply_post(account_number, 'transfer_in', intent['amount'], timestamp)
+
+    def _book_ticket(self, account_number, ticket):
+        timestamp = time.time_ns() // 1000
+        self._journal('book_ticket', account=account_number, ticket=ticket, ts=timestamp)
+        return self._apply_book_ticket(account_number, ticket, timestamp)
+
+    def _apply_book_ticket(self, account_number, ticket, timestamp):
+        self._apply_post(account_number, 'train_ticket_booking', ticket['fare'], timestamp)
+        return self.train_tickets.book(account_number, ticket)
+
+    def _cancel_ticket(self, account_number, pnr):
+        timestamp = time.time_ns() // 1000
+        self._journal('cancel_ticket', account=account_number, pnr=pnr, ts=timestamp)
+        return self._apply_cancel_ticket(account_number, pnr, timestamp)
+
+    def _apply_cancel_ticket(self, account_number, pnr, timestamp):
+        if pnr is None:
+            pnr = self.train_tickets.latest_active(account_number)['pnr']
+        ticket, promoted = self.train_tickets.cancel(pnr)
+        self._apply_post(account_number, 'train_ticket_cancellation', ticket['fare'], timestamp)
+        return ticket, promoted
+
+    def _apply_bill(self, payment, key):
+        self._apply_post(payment['account'], payment['type'], payment['amount'], payment['ts'])
+        self.bill_queue.append(payment)
+        if key is not None:
+            self.bill_keys[key] = payment
+        if payment['id'] > self.bill_sequence:
+            self.bill_sequence = payment['id']
+
+    def _apply_settle(self, batch_id, ids, expire_before):
+        settled = set(ids)
+        self.bill_queue = [payment for payment in self.bill_queue if payment['id'] not in settled]
+        self.bill_keys = {key: payment for key, payment in self.bill_keys.items()
+                          if payment['ts'] >= expire_before}
+        self.bill_batches = batch_id
+
+    def _replay(self, record):
+        """Re-apply one ledger record during recovery."""
+        op = record['op']
+        timestamp = record.get('ts')
+        if op == 'register':
+            self.users[record['username']] = {'email': record['email'], 'password': record['password'],
+                                              'mpin': record['mpin']}
+        elif op == 'credential':
+            self.users[record['username']][record['field']] = record['value']
+        elif op == 'open_account':
+            self._apply_open_account(record['account'], record['holder'], record['type'],
+                                     record['balance'], record['owner'])
+        elif op == 'owner':
+            self.accounts.set_owner(record['account'], record['owner'])
+        elif op == 'open_accounts':
+            self._apply_open_accounts(*record['columns'])
+        elif op == 'post':
+            self._apply_post(record['account'], record['type'], record['amount'], timestamp)
+        elif op == 'transfer':
+            self._apply_transfer(record['src'], record['dst'], record['amount'], timestamp)
+        elif op == 'book_ticket':
+            self._apply_book_ticket(record['account'], record['ticket'], timestamp)
+        elif op == 'cancel_ticket':
+            self._apply_cancel_ticket(record['account'], record['pnr'], timestamp)
+        elif op == 'prepare':
+            self._apply_prepare(record['txid'], record['account'], record['amount'], record['direction'])
+        elif op == 'resolve':
+            self._apply_resolve(record['txid'], record['commit'], timestamp)
+        elif op == 'accrue':
+            import eod
+            self.accounts.materialize()
+            interest, fees = eod.compute(self.accounts, record['schedule'])
+            self._apply_accrual(interest, fees, timestamp)
+        elif op == 'bill':
+            self._apply_bill(record['payment'], record['key'])
+        elif op == 'bills':
+            for payment, key in zip(record['payments'], record['keys']):
+                self._apply_bill(payment, key)
+        elif op == 'settle':
+            self._apply_settle(record['batch'], record['ids'], record['expire_before'])
+        elif op == 'batch':
+            self._apply_batch({account_number: [None, types, amounts]
+                               for account_number, (types, amounts) in record['postings'].items()},
+                              timestamp)
+        else:
+            raise ValueError("Unknown ledger record: " + str(op))
+
+    def _dump_state(self, columns=True):
+        """The bank's state for a snapshot.
+
+        With columns=False, everything but the accounts, users and
+        histories, which a binary snapshot stores in sections of its own.
+        """
+        state = {
+            'train_tickets': self.train_tickets.dump(),
+            'prepared': self.prepared,
+            'aggregates': self.aggregates.dump(),
+            'bills': {'queue': self.bill_queue, 'keys': self.bill_keys,
+                      'sequence': self.bill_sequence, 'batches': self.bill_batches}
+        }
+        if columns:
+            state['accounts'] = self.accounts.dump()
+            state['users'] = dict(self.users)
+            state['transaction_history'] = self.transaction_history.dump()
+        return state
+
+    def _load_state(self, state):
+        from accounts import AccountTable
+        from txstore import TransactionStore
+        self.accounts = AccountTable.load(state['accounts'])
+        self.users = state['users']
+        self.transaction_history = TransactionStore.load(state['transaction_history'])
+        self._load_rest(state)
+
+    def _open_snapshot(self, path):
+        """Serve from a binary snapshot in place (see snapshot.py); returns its LSN."""
+        import snapshot
+        view = snapshot.Snapshot(path)
+        self.accounts = snapshot.account_table(view)
+        self.users = snapshot.StoredUsers(view)
+        self.transaction_history = snapshot.transaction_store(view)
+        self._load_rest(view.state)
+        return view.lsn
+
+    def _load_rest(self, state):
+        from aggregates import Aggregates
+        from trains import Reservations
+        self.train_tickets = Reservations.load(state['train_tickets'])
+        self.prepared = state['prepared']
+        bills = state['bills']
+        self.bill_queue = bills['queue']
+        self.bill_keys = bills['keys']
+        self.bill_sequence = bills['sequence']
+        self.bill_batches = bills['batches']
+        self.aggregates = Aggregates.load(state['aggregates'], CREDIT_TYPES)
+
+    # Field rules live in validation.py; these add the checks that need
+    # the bank's state, such as uniqueness.
+
+    def validate_username(self, username):
+        if username in self.users:
+            return False, "Username already exists"
+        message = validation.first_error('username', username)
+        return not message, message
+
+    def validate_email(self, email):
+        message = validation.first_error('email', email)
+        return not message, message
+
+    def validate_password(self, password):
+        message = validation.first_error('password', password)
+        return not message, message
+
+    def validate_mpin(self, mpin):
+        message = validation.first_error('mpin', mpin)
+        return not message, message
+
+    def validate_many(self, field, values):
+        """Validate a column of values at once, e.g. for a bulk import.
+
+        Returns (index, messages) for every invalid value, listing all the
+        rules it breaks. Usernames and account numbers that already exist
+        (or repeat earlier in `values`) are reported too.
+        """
+        failures = validation.validate_many(field, values)
+        existing = {'username': self.users, 'account_number': self.accounts}.get(field)
+        if existing is None:
+            return failures
+        message = "Username already exists" if field == 'username' else "Account number already exists"
+        by_index = dict(failures)
+        taken = [index for index, value in enumerate(values) if value in existing] \
+            if any(map(existing.__contains__, values)) else []
+        if len(set(values)) != len(values):
+            from collections import Counter
+            repeated = {value for value, count in Counter(values).items() if count > 1}
+            # Only a well-formed value can clash with an earlier one
+            seen = set()
+            for index in [index for index, value in enumerate(values) if value in repeated]:
+                value = values[index]
+                if value in seen:
+                    taken.append(index)
+                elif index not in by_index:
+                    seen.add(value)
+        for index in taken:
+            by_index.setdefault(index, []).insert(0, message)
+        return sorted(by_index.items())
+
+    def register(self):
+        try:
+            username = input("Enter Username: ")
+            valid, message = self.validate_username(username)
+            if not valid:
+                return message
+
+            email = input("Enter Email Address: ")
+            valid, message = self.validate_email(email)
+            if not valid:
+                return message
+
+            password = input("Enter Password: ")
+            valid, message = self.validate_password(password)
+            if not valid:
+                return message
+
+            mpin = input("Set a 6-digit MPIN (leave empty to skip): ")
+            self.register_user(username, email, password, mpin or None)
+            return "Registration successfully done!!!"
+        except BankError as e:
+            return str(e)
+        except Exception as e:
+            return "Error occurred during registration: " + str(e)
+
+    def login_username_password(self, username, password):
+        return self.login_session(username, password=password)[1]
+
+    def login_mpin(self, username, mpin):
+        return self.login_session(username, mpin=mpin)[1]
+
+    def login_session(self, username, password=None, mpin=None):
+        """Log in with a password, or an MPIN if given; returns (session token or None, message)."""
+        try:
+            if mpin is not None:
+                token = self.authenticate_mpin(username, mpin)
+            else:
+                token = self.authenticate(username, password)
+            return token, "Login successful: Welcome " + username
+        except BankError as e:
+            return None, str(e)
+        except Exception as e:
+            return None, "Error occurred during login: " + str(e)
+
+    def validate_account_number(self, account_number):
+        if account_number in self.accounts:
+            return False, "Account number already exists"
+        message = validation.first_error('account_number', account_number)
+        return not message, message
+
+    def validate_account_holder(self, account_holder):
+        message = validation.first_error('account_holder', account_holder)
+        return not message, message
+
+    def validate_initial_balance(self, initial_balance):
+        # Rupees, as typed at the prompt ('2500', '2500.75' or 2500)
+        try:
+            return self._check_opening_balance(parse_money(initial_balance))
+        except ValueError:
+            return False, "Initial balance must be a number"
+
+    def _check_opening_balance(self, balance):
+        if not is_money(balance):
+            return False, "Initial balance must be a number"
+        if balance < MINIMUM_OPENING_BALANCE:
+            return False, "Initial balance must be at least " + format_money(MINIMUM_OPENING_BALANCE)
+        return True, ""
+
+
+    def record_transaction(self, account_number, transaction_type, amount, timestamp=None):
+        """Record a transaction in the transaction history.
+
+        The same as post_transaction: the entry is journalled and moves the
+        balance and running totals with it, so the book stays consistent.
+        """
+        self.post_transaction(account_number, transaction_type, amount, timestamp)
+
+    def post_transaction(self, account_number, transaction_type, amount, timestamp=None):
+        """Post a movement of any type at `timestamp` (now if None).
+
+        It is logged, then applied to the balance (a type in CREDIT_TYPES
+        adds, any other type debits), the running totals and the history,
+        so it survives a restart and reconciles.
+        """
+        if not is_money(amount) or amount <= 0:
+            raise ValueError("Amount must be a positive whole number of paise")
+        if timestamp is None:
+            timestamp = time.time_ns() // 1000
+        elif not isinstance(timestamp, int):
+            from txstore import to_timestamp_us
+            try:
+                timestamp = to_timestamp_us(timestamp)
+            except Exception as e:
+                raise RuntimeError(f"Error occurred while posting transaction: {e}")
+        with self.locks.hold(account_number):
+            if account_number not in self.accounts:
+                raise ValueError("Invalid account number")
+            self._journal('post', account=account_number, type=transaction_type,
+                          amount=amount, ts=timestamp)
+            self._apply_post(account_number, transaction_type, amount, timestamp)
+        self._settle()
+
+
+    # ------------------------------------------------------------------
+    # Programmatic API: typed arguments in, dicts out, BankError on
+    # rejection. Nothing here prompts or prints; the CLI methods below are
+    # thin wrappers that gather input and turn results into messages.
+    # ------------------------------------------------------------------
+
+    def _require_amount(self, amount):
+        if not is_money(amount):
+            raise BankError("Amount must be a whole number of paise")
+
+    def _require_account(self, account_number, message="Account does not exist"):
+        if account_number not in self.accounts:
+            raise BankError(message)
+        return self.accounts[account_number]
+
+    def register_user(self, username, email, password, mpin=None):
+        from credentials import hash_secret
+        checks = [(self.validate_username, username),
+                  (self.validate_email, email),
+                  (self.validate_password, password)]
+        if mpin is not None:
+            checks.append((self.validate_mpin, mpin))
+        for validator, value in checks:
+            valid, message = validator(value)
+            if not valid:
+                raise BankError(message)
+        # Hashing is deliberately slow, so it runs before taking the lock
+        password_hash = hash_secret(password, self.kdf_params)
+        mpin_hash = hash_secret(mpin, self.kdf_params) if mpin is not None else None
+        with self.locks.hold(username):
+            if username in self.users:
+                raise BankError("Username already exists")
+            self._journal('register', username=username, email=email,
+                          password=password_hash, mpin=mpin_hash)
+            self.users[username] = {'email': email, 'password': password_hash, 'mpin': mpin_hash}
+        self._settle()
+        return {'username': username, 'email': email}
+
+    def _set_credential(self, username, field, value, expected=None):
+        """Store a new hash for `field`, unless it changed since `expected` was read."""
+        with self.locks.hold(username):
+            user = self.users[username]
+            if expected is not None and user.get(field) is not expected:
+                return
+            self._journal('credential', username=username, field=field, value=value)
+            user[field] = value
+        self._settle()
+
+    def _verify(self, username, field, secret, message):
+        from credentials import hash_secret, needs_rehash, verify_secret
+        user = self.users.get(username)
+        if user is None:
+            raise BankError("Username does not exist")
+        stored = user.get(field)
+        if not verify_secret(secret, stored):
+            raise BankError(message)
+        if needs_rehash(stored, self.kdf_params):
+            self._set_credential(username, field, hash_secret(secret, self.kdf_params), stored)
+        return self.sessions.create(username)
+
+    def authenticate(self, username, password):
+        """Check a password and return a session token for follow-up calls."""
+        return self._verify(username, 'password', password, "Incorrect password")
+
+    def authenticate_mpin(self, username, mpin):
+        valid, message = self.validate_mpin(mpin)
+        if not valid:
+            raise BankError(message)
+        if username in self.users and self.users[username].get('mpin') is None:
+            raise BankError("No MPIN set. Login with username and password")
+        return self._verify(username, 'mpin', mpin, "Incorrect MPIN")
+
+    def session_user(self, token):
+        """The username behind a session token; no KDF work is involved."""
+        username = self.sessions.user(token)
+        if username is None:
+            raise BankError("Session expired. Please login again")
+        return username
+
+    def set_mpin(self, token, mpin):
+        from credentials import hash_secret
+        username = self.session_user(token)
+        valid, message = self.validate_mpin(mpin)
+        if not valid:
+            raise BankError(message)
+        self._set_credential(username, 'mpin', hash_secret(mpin, self.kdf_params))
+        return {'username': username}
+
+    def logout(self, token):
+        self.sessions.revoke(token)
+
+    def open_account(self, account_number, account_holder, account_type, initial_balance, owner=None):
+        """Open an account, owned by the registered user `owner` if given."""
+        if not all(isinstance(value, str) for value in (account_number, account_holder, account_type)):
+            raise BankError("Account number, holder and type must be strings")
+        if owner is not None and (not isinstance(owner, str) or owner not in self.users):
+            raise BankError("Unknown user: " + str(owner))
+        valid, message = self.validate_account_holder(account_holder)
+        if not valid:
+            raise BankError(message)
+        account_type = account_type.lower()
+        if account_type not in ACCOUNT_TYPES:
+            raise BankError("Invalid account type")
+        if isinstance(initial_balance, str):
+            # The rupee string typed at the prompt
+            valid, message = self.validate_initial_balance(initial_balance)
+            if not valid:
+                raise BankError(message)
+            initial_balance = parse_money(initial_balance)
+        valid, message = self._check_opening_balance(initial_balance)
+        if not valid:
+            raise BankError(message)
+
+        self._materialize()
+        with self.locks.hold(account_number):
+            valid, message = self.validate_account_number(account_number)
+            if not valid:
+                raise BankError(message)
+            self._journal('open_account', account=account_number, holder=account_holder,
+                          type=account_type, balance=initial_balance, owner=owner)
+            self._apply_open_account(account_number, account_holder, account_type, initial_balance, owner)
+        self._settle()
+        return self.get_account(account_number)
+
+    def _materialize(self):
+        """Copy the account columns out of a binary snapshot, under every lock."""
+        if isinstance(self.accounts.ids, memoryview):
+            with self.locks.hold_all():
+                self.accounts.materialize()
+
+    def _apply_open_account(self, account_number, account_holder, account_type, balance, owner):
+        self.accounts.extend([account_number], [account_holder], [account_type], [balance],
+                             [owner] if owner is not None else None)
+        self.aggregates.open([self.accounts.type_code(account_type)], [balance])
+
+    def assign_owner(self, account_number, username):
+        """Make `username` the owner of an account, e.g. one opened before ownership existed."""
+        if username not in self.users:
+            raise BankError("Unknown user: " + str(username))
+        with self.locks.hold(account_number):
+            self._require_account(account_number)
+            self._journal('owner', account=account_number, owner=username)
+            self.accounts.set_owner(account_number, username)
+        self._settle()
+        return self.get_account(account_number)
+
+    def owns(self, username, account_number):
+        """Whether `username` owns the account; one index lookup."""
+        return self.accounts.is_owner(account_number, username)
+
+    def owner_error(self, username, account_number):
+        """Why `username` may not operate the account, or "" if they may.
+
+        An account that does not exist is left for the operation to report.
+        """
+        if account_number in self.accounts and not self.accounts.is_owner(account_number, username):
+            return "Account does not belong to you"
+        return ""
+
+    def user_accounts(self, username):
+        """Account numbers owned by `username`."""
+        return self.accounts.numbers(self.accounts.rows_of_owner(username))
+
+    def holder_accounts(self, account_holder):
+        """Account numbers held under the name `account_holder`."""
+        return self.accounts.numbers(self.accounts.rows_of_holder(account_holder))
+
+    def portfolio(self, username, recent=5):
+        """A user's accounts with balances and latest transactions, and their total balance."""
+        if username not in self.users:
+            raise BankError("Unknown user: " + str(username))
+        table = self.accounts
+        rows = table.rows_of_owner(username)
+        accounts = []
+        for account_number in table.numbers(rows):
+            account = table[account_number]
+            history = self.transaction_history.get(account_number)
+            entries = history.page(limit=recent, newest_first=True)['entries'] if history and recent else []
+            accounts.append({
+                'account_number': account_number,
+                'account_holder': account['account_holder'],
+                'type': account['type'],
+                'balance': account['balance'],
+                'recent': entries
+            })
+        return {
+            'username': username,
+            'accounts': accounts,
+            'total_balance': sum(account['balance'] for account in accounts)
+        }
+
+    def open_accounts(self, columns):
+        """Open many accounts at once, e.g. from importer.import_accounts.
+
+        `columns` is a dict of equal-length 'account_number', 'account_holder',
+        'account_type' and 'initial_balance' (paise) sequences, plus an optional
+        'owner' column of usernames (None for no owner). Every column is
+        validated in one pass and each bad row reports all of its problems;
+        the good rows are opened together under one ledger record. Returns
+        {'opened': count, 'rejected': [(index, account_number, messages)]}.
+        A malformed batch (a missing column, columns of different lengths, or
+        a value of the wrong type in a text column) raises BankError naming
+        the row.
+        """
+        missing = [name for name in ('account_number', 'account_holder', 'account_type', 'initial_balance')
+                   if name not in columns]
+        if missing:
+            raise BankError("Missing column(s): " + ", ".join(missing))
+        numbers = columns['account_number']
+        holders = columns['account_holder']
+        balances = columns['initial_balance']
+        owners = columns.get('owner')
+        lengths = {len(numbers), len(holders), len(columns['account_type']), len(balances)}
+        if owners is not None:
+            lengths.add(len(owners))
+        if len(lengths) != 1:
+            raise BankError("Columns must all have the same length")
+        for column in (numbers, holders, columns['account_type']):
+            index = _first_not(str, column)
+            if index is not None:
+                raise BankError(f"Row {index}: account number, holder and type must be strings")
+        if owners is not None:
+            index = _first_not((str, type(None)), owners)
+            if index is not None:
+                raise BankError(f"Row {index}: owner must be a username or None")
+        types = [account_type.lower() for account_type in columns['account_type']]
+        problems = {}
+        if owners is not None:
+            for index, username in enumerate(owners):
+                if username is not None and username not in self.users:
+                    problems.setdefault(index, []).append("Unknown user: " + str(username))
+        for index, messages in validation.validate_many('account_holder', holders):
+            problems.setdefault(index, []).extend(messages)
+        if not set(types) <= set(ACCOUNT_TYPES):
+            for index in [index for index, account_type in enumerate(types) if account_type not in ACCOUNT_TYPES]:
+                problems.setdefault(index, []).append("Invalid account type")
+        minimum = MINIMUM_OPENING_BALANCE
+        if set(map(type, balances)) <= {int} and min(balances, default=minimum) >= minimum:
+            low = []
+        else:
+            low = [index for index, balance in enumerate(balances)
+                   if type(balance) is not int or balance < minimum]
+        for index in low:
+            if not is_money(balances[index]):
+                problems.setdefault(index, []).append("Initial balance must be a number")
+            else:
+                problems.setdefault(index, []).append(
+                    "Initial balance must be at least " + format_money(minimum))
+
+        # Uniqueness is only decided under the locks
+        with self.locks.hold_all():
+            for index, messages in self.validate_many('account_number', numbers):
+                problems.setdefault(index, [])[:0] = messages
+            if problems:
+                keep = [index for index in range(len(numbers)) if index not in problems]
+                accepted = ([numbers[index] for index in keep], [holders[index] for index in keep],
+                            [types[index] for index in keep], [balances[index] for index in keep])
+                if owners is not None:
+                    accepted += ([owners[index] for index in keep],)
+            else:
+                accepted = (list(numbers), list(holders), types, list(balances))
+                if owners is not None:
+                    accepted += (list(owners),)
+            if accepted[0]:
+                self.accounts.materialize()
+                self._journal('open_accounts', columns=accepted)
+                self._apply_open_accounts(*accepted)
+        self._settle()
+        rejected = [(index, numbers[index], problems[index]) for index in sorted(problems)]
+        return {'opened': len(accepted[0]), 'rejected': rejected}
+
+    def _apply_open_accounts(self, numbers, holders, types, balances, owners=None):
+        self.accounts.extend(numbers, holders, types, balances, owners)
+        self.aggregates.open(map(self.accounts.type_code, types), balances)
+
+    def get_account(self, account_number):
+        account = self._require_account(account_number)
+        return {
+            'account_number': account_number,
+            'account_holder': account['account_holder'],
+            'type': account['type'],
+            'balance': account['balance']
+        }
+
+    def get_balance(self, account_number):
+        return self._require_account(account_number)['balance']
+
+    def total_balance(self):
+        """Exact sum of every balance, in paise, from the running totals."""
+        return self.aggregates.total_balance()
+
+    def treasury(self, day=None):
+        """Bank-wide totals for the dashboard, without scanning any account.
+
+        Balances and account counts by account type, the day's postings by
+        transaction type with its inflow and outflow (`day` is a UTC date
+        or 'YYYY-MM-DD'; today by default), and ticket counts.
+        """
+        from aggregates import EPOCH
+        from datetime import date, datetime, timezone
+        if day is None:
+            day = datetime.now(timezone.utc).date()
+        elif isinstance(day, str):
+            day = date.fromisoformat(day)
+        state = self.aggregates.state()
+        type_names = self.accounts.type_names
+        by_type = {type_names[code]: {'accounts': accounts, 'balance': balance}
+                   for code, (accounts, balance) in state['by_type'].items()}
+        flows = state['flows'].get(day.toordinal() - EPOCH.toordinal(), {})
+        totals = state['totals']
+        booked = totals.get('train_ticket_booking', [0, 0])[0]
+        cancelled = totals.get('train_ticket_cancellation', [0, 0])[0]
+        return {
+            'total_balance': sum(entry['balance'] for entry in by_type.values()),
+            'by_account_type': by_type,
+            'day': day.isoformat(),
+            'flows': {name: {'count': count, 'amount': amount} for name, (count, amount) in flows.items()},
+            'inflow': sum(amount for name, (_, amount) in flows.items() if name in CREDIT_TYPES),
+            'outflow': sum(amount for name, (_, amount) in flows.items() if name not in CREDIT_TYPES),
+            'tickets': {'booked': booked, 'cancelled': cancelled, 'active': booked - cancelled}
+        }
+
+    def reconcile(self, limit=20):
+        """Check the running totals and every balance against a full recomputation.
+
+        Writers are paused only while the columns are copied; the
+        recomputation runs on the copies. Returns a report whose 'ok' is
+        False if anything disagrees, with up to `limit` mismatched balances.
+        """
+        import aggregates
+        started = time.perf_counter()
+        with self.locks.hold_all():
+            view = aggregates.capture(self)
+        paused = time.perf_counter() - started
+        report = aggregates.check(view, CREDIT_TYPES, limit)
+        report['paused_ms'] = round(paused * 1000, 3)
+        return report
+
+    def get_transactions(self, account_number):
+        return list(self.transaction_history.get(account_number, ()))
+
+    def query_transactions(self, account_number, **filters):
+        """Lazily yield an account's transactions.
+
+        Filters: start/end (datetime or epoch microseconds, end exclusive),
+        types, min_amount/max_amount, newest_first and cursor.
+        """
+        history = self.transaction_history.get(account_number)
+        if history is None:
+            return iter(())
+        return history.query(**filters)
+
+    def transaction_page(self, account_number, limit=50, cursor=None, **filters):
+        """One page of transactions; pass the returned next_cursor to continue."""
+        history = self.transaction_history.get(account_number)
+        if history is None:
+            return {'entries': [], 'next_cursor': None}
+        return history.page(limit, cursor, **filters)
+
+    def write_statements(self, out_dir, start=None, end=None, format="csv", processes=None,
+                         accounts_per_file=None):
+        """Write every account's statement for [start, end) to gzip files under out_dir.
+
+        `format` is 'csv' or 'jsonl'; start/end are datetimes, ISO strings
+        or epoch microseconds, and None leaves that side open. The book is
+        split into files of accounts_per_file accounts (50,000 by default)
+        written by `processes` worker processes (one per CPU by default).
+        Returns the files written and statements per second; see
+        statements.py.
+        """
+        import statements
+        return statements.write(self, out_dir, start, end, format, processes, accounts_per_file)
+
+    def post_deposit(self, account_number, amount):
+        self._require_amount(amount)
+        if amount <= 0:
+            raise BankError("Amount to deposit must be positive")
+        with self.locks.hold(account_number):
+            account = self._require_account(account_number)
+            self._post(account_number, 'deposit', amount)
+            result = {'account_number': account_number, 'amount': amount, 'balance': account['balance']}
+        self._settle()
+        return result
+
+    def post_withdrawal(self, account_number, amount):
+        self._require_amount(amount)
+        if amount <= 0:
+            raise BankError("Amount to withdraw must be positive")
+        with self.locks.hold(account_number):
+            account = self._require_account(account_number)
+            if account['balance'] < amount:
+                raise BankError("Insufficient balance.")
+            self._screen(account, account_number, amount)
+            self._post(account_number, 'withdrawal', amount)
+            result = {'account_number': account_number, 'amount': amount, 'balance': account['balance']}
+        self._settle()
+        return result
+
+    def post_batch(self, entries, atomic=True):
+        """Post many deposits and withdrawals in a single pass.
+
+        `entries` is an iterable of (account_number, amount, type) tuples, or a
+        columnar batch: a dict with equal-length 'account', 'amount' and 'type'
+        sequences. `type` is 'deposit' or 'withdrawal'. Lines are checked in
+        order against running balances, and withdrawals against the velocity
+        limits (risk.py). With atomic=True any reject raises BatchRejected
+        and nothing is posted or counted; otherwise the good lines are posted
+        and the rejects are reported. The accepted lines share one ledger
+        record and one timestamp.
+        """
+        if isinstance(entries, dict):
+            entries = zip(entries['account'], entries['amount'], entries['type'])
+        # The per-account lists would otherwise set off collections that
+        # rescan the whole batch; as in the importer, pause the collector
+        gc_was_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            # A batch may touch any account, so it takes every stripe
+            with self.locks.hold_all():
+                accounts = self.accounts
+                balances = accounts.balances
+                account_row = accounts.row
+                # Without velocity limits there is nothing to count per debit
+                risk = self.risk if self.risk.rules else None
+                # account_number -> [running balance, types, amounts] of accepted lines
+                postings = {}
+                rows = {}
+                # (account_number, amount) of withdrawals counted against the
+                # velocity limits, taken back if the batch is rejected
+                screened = []
+                now = time.time_ns() // 1000
+                rejects = []
+                posted = 0
+                for index, (account_number, amount, transaction_type) in enumerate(entries):
+                    posting = postings.get(account_number)
+                    if posting is None:
+                        row = account_row(account_number)
+                        if row is None:
+                            rejects.append((index, account_number, "Account does not exist"))
+                            continue
+                        rows[account_number] = row
+                        posting = postings[account_number] = [balances[row], [], []]
+                    if type(amount) is not int:
+                        if not is_money(amount):
+                            rejects.append((index, account_number, "Amount must be a whole number of paise"))
+                            continue
+                    if amount <= 0:
+                        rejects.append((index, account_number, "Amount must be positive"))
+                        continue
+                    if transaction_type == 'deposit':
+                        posting[0] += amount
+                    elif transaction_type == 'withdrawal':
+                        if posting[0] < amount:
+                            rejects.append((index, account_number, "Insufficient balance."))
+                            continue
+                        if risk is not None:
+                            row = rows[account_number]
+                            message = risk.screen(account_number, accounts.type_names[accounts.types[row]],
+                                                  accounts.owner_names[accounts.owners[row]], amount, now)
+                            if message:
+                                rejects.append((index, account_number, message))
+                                continue
+                            screened.append((account_number, amount))
+                        posting[0] -= amount
+                    else:
+                        rejects.append((index, account_number, "Invalid transaction type"))
+                        continue
+                    posting[1].append(transaction_type)
+                    posting[2].append(amount)
+                    posted += 1
+
+                if rejects and atomic:
+                    for account_number, amount in screened:
+                        row = rows[account_number]
+                        risk.release(account_number, accounts.type_names[accounts.types[row]],
+                                     accounts.owner_names[accounts.owners[row]], amount, now)
+                    raise BatchRejected(rejects)
+                if posted:
+                    timestamp = time.time_ns() // 1000
+                    if self.journal is not None:
+                        self._journal('batch', postings={account_number: posting[1:]
+                                                         for account_number, posting in postings.items()},
+                                      ts=timestamp)
+                    self._apply_batch(postings, timestamp, rows)
+        finally:
+            if gc_was_enabled:
+                gc.enable()
+        self._settle()
+        return {'posted': posted, 'rejected': rejects}
+
+    def _apply_batch(self, postings, timestamp, rows=None):
+        """Apply {account_number: [balance, types, amounts]}; a None balance is recomputed.
+
+        `rows` maps account numbers to their rows, if the caller has looked them up.
+        """
+        accounts = self.accounts
+        history = self.transaction_history
+        deltas = {}
+        totals = {'deposit': [0, 0], 'withdrawal': [0, 0]}
+        for account_number, (balance, types, amounts) in postings.items():
+            if not types:
+                continue
+            row = accounts.row(account_number) if rows is None else rows[account_number]
+            old_balance = accounts.balances[row]
+            if balance is None:
+                balance = old_balance
+                for transaction_type, amount in zip(types, amounts):
+                    balance = balance + amount if transaction_type == 'deposit' else balance - amount
+            accounts.balances[row] = balance
+            history.extend(account_number, types, amounts, timestamp)
+            code = accounts.types[row]
+            delta = balance - old_balance
+            deltas[code] = deltas.get(code, 0) + delta
+            # Lines are only deposits and withdrawals, so their totals
+            # follow from the line count, the amount and the balance change
+            deposits = types.count('deposit')
+            amount = sum(amounts)
+            deposited = (amount + delta) // 2
+            totals['deposit'][0] += deposits
+            totals['deposit'][1] += deposited
+            totals['withdrawal'][0] += len(types) - deposits
+            totals['withdrawal'][1] += amount - deposited
+        self.aggregates.post_many(deltas, totals, timestamp)
+
+    def accrue_end_of_day(self, schedule=None, dry_run=False):
+        """Post a day's interest and maintenance fees to every account.
+
+        `schedule` maps account type to its terms (see eod.DEFAULT_SCHEDULE).
+        The whole book is computed column-wise under every lock. With
+        dry_run=True the postings are only computed and summarized. The
+        ledger records just the schedule: replaying it against the same
+        state recomputes the same postings.
+        """
+        import eod
+        schedule = schedule or eod.DEFAULT_SCHEDULE
+        with self.locks.hold_all():
+            self.accounts.materialize()
+            interest, fees = eod.compute(self.accounts, schedule)
+            by_type = eod.summarize(self.accounts, interest, fees)
+            if not dry_run:
+                timestamp = time.time_ns() // 1000
+                self._journal('accrue', schedule=schedule, ts=timestamp)
+                self._apply_accrual(interest, fees, timestamp, by_type)
+        self._settle()
+        return {
+            'dry_run': dry_run,
+            'interest': sum(interest),
+            'fees': sum(fees),
+            'by_type': by_type
+        }
+
+    def _apply_accrual(self, interest, fees, timestamp, by_type=None):
+        import eod
+        table = self.accounts
+        table.balances = eod.new_balances(table.balances, interest, fees)
+        # The first accrual can create a history for every account; as in
+        # the importer, keep the cyclic collector from rescanning them all.
+        gc_was_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            for transaction_type, amounts in (('interest', interest), ('maintenance_fee', fees)):
+                rows = eod.nonzero_rows(amounts)
+                self.transaction_history.append_run(table.numbers(rows), transaction_type,
+                                                    map(amounts.__getitem__, rows), timestamp)
+        finally:
+            if gc_was_enabled:
+                gc.enable()
+        if by_type is None:
+            by_type = eod.summarize(table, interest, fees)
+        self.aggregates.post_many(
+            {table.type_codes[name]: totals['interest'] - totals['fees']
+             for name, totals in by_type.items() if totals['accounts']},
+            {'interest': [len(interest) - interest.count(0), sum(interest)],
+             'maintenance_fee': [len(fees) - fees.count(0), sum(fees)]},
+            timestamp)
+
+    def transfer(self, from_account, to_account, amount):
+        self._require_amount(amount)
+        if amount <= 0:
+            raise BankError("Amount to transfer must be positive")
+        with self.locks.hold(from_account, to_account):
+            sender = self._require_account(from_account, "Sender account does not exist")
+            recipient = self._require_account(to_account, "Recipient account does not exist")
+            if sender['balance'] < amount:
+                raise BankError("Insufficient balance for transfer")
+            self._screen(sender, from_account, amount)
+            self._transfer(from_account, to_account, amount)
+            result = {
+                'from_account': from_account,
+                'to_account': to_account,
+                'amount': amount,
+                'from_balance': sender['balance'],
+                'to_balance': recipient['balance']
+            }
+        self._settle()
+        return result
+
+    # Participant side of a cross-shard transfer. The coordinator
+    # (sharding.ShardedBank) prepares the debit and the credit on their two
+    # shards, and commits both only if both prepared; the prepare record is
+    # durable before the vote is returned.
+
+    def prepare_transfer(self, txid, account_number, amount, direction):
+        """Vote on one leg ('debit' or 'credit') of transaction `txid`."""
+        self._require_amount(amount)
+        if amount <= 0:
+            raise BankError("Amount to transfer must be positive")
+        if direction not in ('debit', 'credit'):
+            raise BankError("Invalid transfer direction")
+        with self.locks.hold(account_number):
+            if direction == 'debit':
+                account = self._require_account(account_number, "Sender account does not exist")
+                if account['balance'] < amount:
+                    raise BankError("Insufficient balance for transfer")
+            else:
+                self._require_account(account_number, "Recipient account does not exist")
+            if txid in self.prepared:
+                raise BankError("Transaction already prepared")
+            if direction == 'debit':
+                self._screen(account, account_number, amount)
+            self._journal('prepare', txid=txid, account=account_number,
+                          amount=amount, direction=direction)
+            self._apply_prepare(txid, account_number, amount, direction)
+        self._settle()
+        return {'txid': txid, 'prepared': True}
+
+    def resolve_transfer(self, txid, commit):
+        """Commit or abort a prepared leg; resolving an unknown txid is a no-op."""
+        intent = self.prepared.get(txid)
+        if intent is None:
+            return {'txid': txid, 'resolved': False}
+        account_number = intent['account']
+        with self.locks.hold(account_number):
+            if txid not in self.prepared:
+                return {'txid': txid, 'resolved': False}
+            timestamp = time.time_ns() // 1000
+            self._journal('resolve', txid=txid, commit=bool(commit), ts=timestamp)
+            self._apply_resolve(txid, commit, timestamp)
+            result = {'txid': txid, 'resolved': True,
+                      'account_number': account_number,
+                      'balance': self.accounts[account_number]['balance']}
+        self._settle()
+        return result
+
+    def in_doubt(self):
+        """Transactions prepared here and still waiting for a decision."""
+        return list(self.prepared)
+
+    def pay_biller(self, biller, reference, transaction_account, amount, idempotency_key=None):
+        """Pay `amount` from transaction_account to a biller in billing.BILLERS.
+
+        The account is debited at once and the payment waits in bill_queue
+        for the next settle_bills batch. A retry with the same
+        idempotency_key returns the first payment, marked 'duplicate',
+        instead of debiting again.
+        """
+        import billing
+        self._require_amount(amount)
+        message = billing.biller_error(biller, reference, amount)
+        if message:
+            raise BankError(message)
+        keys = (transaction_account,) if idempotency_key is None else (transaction_account, idempotency_key)
+        with self.locks.hold(*keys):
+            paid = self.bill_keys.get(idempotency_key)
+            if paid is not None:
+                result = self._bill_result(paid, duplicate=True)
+            else:
+                account = self._require_account(transaction_account, "Invalid transaction account")
+                if account['balance'] < amount:
+                    raise BankError("Insufficient balance in transaction account")
+                self._screen(account, transaction_account, amount)
+                payment = self._new_bill(biller, reference, transaction_account, amount)
+                self._journal('bill', payment=payment, key=idempotency_key)
+                self._apply_bill(payment, idempotency_key)
+                result = self._bill_result(payment)
+        self._settle()
+        return result
+
+    def pay_bills(self, payments):
+        """Pay many bills under one ledger record.
+
+        `payments` is an iterable of dicts with the arguments of pay_biller.
+        Each is checked in order against running balances and the keys seen
+        so far; the good ones are paid and the rest are returned as
+        (index, message) rejects.
+        """
+        import billing
+        paid = []
+        rejects = []
+        new_payments = []
+        new_keys = []
+        with self.locks.hold_all():
+            balances = {}
+            for index, request in enumerate(payments):
+                try:
+                    amount = request['amount']
+                    self._require_amount(amount)
+                    message = billing.biller_error(request['biller'], request['reference'], amount)
+                    if message:
+                        raise BankError(message)
+                    key = request.get('idempotency_key')
+                    earlier = self.bill_keys.get(key)
+                    if earlier is not None:
+                        paid.append((earlier, True))
+                        continue
+                    transaction_account = request['transaction_account']
+                    balance = balances.get(transaction_account)
+                    if balance is None:
+                        account = self._require_account(transaction_account, "Invalid transaction account")
+                        balance = account['balance']
+                    if balance < amount:
+                        raise BankError("Insufficient balance in transaction account")
+                    self._screen(self.accounts[transaction_account], transaction_account, amount)
+                except (BankError, KeyError, TypeError) as e:
+                    rejects.append((index, str(e) if isinstance(e, BankError) else "Missing or invalid field"))
+                    continue
+                balances[transaction_account] = balance - amount
+                payment = self._new_bill(request['biller'], request['reference'], transaction_account, amount)
+                new_payments.append(payment)
+                new_keys.append(key)
+                if key is not None:
+                    # Repeats of the key later in this batch are duplicates too
+                    self.bill_keys[key] = payment
+                paid.append((payment, False))
+            if new_payments:
+                self._journal('bills', payments=new_payments, keys=new_keys)
+                for payment, key in zip(new_payments, new_keys):
+                    self._apply_bill(payment, key)
+            paid = [self._bill_result(payment, duplicate) for payment, duplicate in paid]
+        self._settle()
+        return {'paid': paid, 'rejected': rejects}
+
+    def _new_bill(self, biller, reference, transaction_account, amount):
+        import billing
+        with self._bill_lock:
+            self.bill_sequence += 1
+            payment_id = self.bill_sequence
+        return {
+            'id': payment_id,
+            'biller': biller,
+            'reference': reference,
+            'account': transaction_account,
+            'amount': amount,
+            'type': billing.BILLERS[biller]['transaction_type'],
+            'ts': time.time_ns() // 1000
+        }
+
+    def _bill_result(self, payment, duplicate=False):
+        return {
+            'payment_id': payment['id'],
+            'biller': payment['biller'],
+            'reference': payment['reference'],
+            'transaction_account': payment['account'],
+            'amount': payment['amount'],
+            'balance': self.accounts[payment['account']]['balance'],
+            'duplicate': duplicate
+        }
+
+    def settle_bills(self, out_dir):
+        """Write every queued bill payment to one batch file per biller, then mark them settled.
+
+        Returns the batch number and, per biller, the file, payment count
+        and total. Idempotency keys older than billing.KEY_RETENTION are
+        forgotten here.
+        """
+        import billing
+        with self._settlement_lock:
+            payments = list(self.bill_queue)
+            if not payments:
+                return {'batch': None, 'payments': 0, 'billers': {}}
+            batch_id = self.bill_batches + 1
+            summary = billing.write_batches(out_dir, batch_id, payments)
+            ids = [payment['id'] for payment in payments]
+            # Payments made while the files were written stay queued
+            with self.locks.hold_all():
+                timestamp = time.time_ns() // 1000
+                expire_before = timestamp - billing.KEY_RETENTION * 1000000
+                self._journal('settle', batch=batch_id, ids=ids, expire_before=expire_before, ts=timestamp)
+                self._apply_settle(batch_id, ids, expire_before)
+        self._settle()
+        return {'batch': batch_id, 'payments': len(payments), 'billers': summary}
+
+    def recharge_mobile(self, operator, mobile_number, amount, transaction_account, idempotency_key=None):
+        import billing
+        if billing.BILLERS.get(str(operator).lower(), {}).get('kind') != 'recharge':
+            raise BankError("Invalid operator")
+        result = self.pay_biller(operator.lower(), mobile_number, transaction_account, amount, idempotency_key)
+        return dict(result, operator=operator, mobile_number=mobile_number)
+
+    def pay_bill(self, bill_type, customer_id, transaction_account, amount, idempotency_key=None):
+        """Pay a 'gas', 'electricity' or 'cable_tv' bill (or any biller of kind 'bill')."""
+        import billing
+        if billing.BILLERS.get(bill_type, {}).get('kind') != 'bill':
+            raise BankError("Invalid bill type")
+        result = self.pay_biller(bill_type, customer_id, transaction_account, amount, idempotency_key)
+        return dict(result, bill_type=bill_type, customer_id=customer_id)
+
+    def ticket_fare(self, travel_class, quota, route="", travel_date=""):
+        """The fare in paise for a route (trains.route_train) on a date; see fares.py."""
+        try:
+            return self.fares.quote(route, travel_class, quota, travel_date)
+        except (KeyError, TypeError):
+            raise BankError("Invalid travel class")
+
+    def fare_quote(self, from_station, to_station, travel_date, travel_class, quota):
+        """Quote a fare without booking."""
+        import trains
+        if not self.validate_quota(quota):
+            raise BankError("Invalid quota")
+        # The ISO form, so surge windows and the quote cache see one spelling
+        try:
+            travel_date = trains.travel_day(travel_date)
+        except (TypeError, ValueError):
+            raise BankError("Invalid travel date")
+        return {
+            'from_station': from_station,
+            'to_station': to_station,
+            'travel_date': travel_date,
+            'travel_class': travel_class,
+            'quota': quota,
+            'fare': self.ticket_fare(travel_class, quota, trains.route_train(from_station, to_station),
+                                     travel_date)
+        }
+
+    def reload_fares(self, rules_path=None):
+        """Reload the fare rules; booked tickets keep the fare they were sold at."""
+        self.fares.reload(rules_path)
+        return self.fares.stats()
+
+    def fare_cache_stats(self):
+        return self.fares.stats()
+
+    def reload_risk_rules(self, rules=None):
+        """Switch to new velocity limits (a dict, JSON path or "default"; None for no limits)."""
+        self.risk.load(rules)
+        return self.risk.stats()
+
+    def risk_usage(self, account_number=None, username=None):
+        """Debit count and amount in each velocity window of an account or a user."""
+        if username is not None:
+            return self.risk.usage(username=username)
+        with self.locks.hold(account_number):
+            return self.risk.usage(account_number)
+
+    def risk_stats(self):
+        return self.risk.stats()
+
+    def book_ticket(self, account_number, from_station, to_station, travel_date, travel_class, quota,
+                    train=None):
+        """Book a seat, or a waitlist place when the quota's seats are gone.
+
+        Without `train`, the route's own train is used (see
+        trains.route_train). The fare is debited either way and the ticket
+        comes back with its PNR, 'status' ('CNF' or 'WL') and 'seat'.
+        """
+        import trains
+        self._require_account(account_number)
+        if not self.validate_station_name(from_station):
+            raise BankError("Invalid departure station name")
+        if not self.validate_station_name(to_station):
+            raise BankError("Invalid destination station name")
+        if not self.validate_travel_date(travel_date):
+            raise BankError("Invalid travel date")
+        if not self.validate_travel_class(travel_class):
+            raise BankError("Invalid travel class")
+        if not self.validate_quota(quota):
+            raise BankError("Invalid quota")
+        # One spelling of the date for the fare, the ticket and the inventory key
+        travel_date = trains.travel_day(travel_date)
+        fare = self.ticket_fare(travel_class, quota, trains.route_train(from_station, to_station), travel_date)
+        ticket = {
+            'train': train or trains.route_train(from_station, to_station),
+            'from_station': from_station,
+            'to_station': to_station,
+            'travel_date': travel_date,
+            'travel_class': travel_class,
+            'quota': quota,
+            'fare': fare
+        }
+        key = trains.inventory_key(ticket['train'], travel_date, travel_class)
+        with self.locks.hold(account_number, key):
+            account = self.accounts[account_number]
+            if account['balance'] < fare:
+                raise BankError("Insufficient balance to book ticket")
+            if not self.train_tickets.has_room(ticket):
+                raise BankError("No seats or waitlist places left in this quota")
+            self._screen(account, account_number, fare)
+            ticket['pnr'] = self.train_tickets.next_pnr()
+            # Debit the fare, record the transaction and seat the ticket
+            ticket = dict(self._book_ticket(account_number, ticket))
+        self._settle()
+        return ticket
+
+    def get_tickets(self, account_number):
+        """Every ticket of an account, cancelled ones included, oldest first."""
+        return [dict(ticket) for ticket in self.train_tickets.of_account(account_number)]
+
+    def get_ticket(self, account_number, pnr=None):
+        """The ticket with `pnr`, or else the account's latest one not cancelled."""
+        if pnr is None:
+            ticket = self.train_tickets.latest_active(account_number)
+        else:
+            ticket = self.train_tickets.tickets.get(pnr)
+            if ticket is not None and ticket['account'] != account_number:
+                ticket = None
+        if ticket is None:
+            raise BankError("No train ticket booked for this account")
+        return dict(ticket)
+
+    def cancel_ticket(self, account_number, pnr=None):
+        """Cancel and refund a ticket; a confirmed seat passes to the first waitlisted ticket."""
+        import trains
+        ticket = self.get_ticket(account_number, pnr)
+        key = trains.inventory_key(ticket['train'], ticket['travel_date'], ticket['travel_class'])
+        with self.locks.hold(account_number, key):
+            # Looked up again under the locks, in case it changed since
+            ticket = self.get_ticket(account_number, ticket['pnr'])
+            if ticket['status'] == trains.CANCELLED:
+                raise BankError("Ticket is already cancelled")
+            ticket, promoted = self._cancel_ticket(account_number, ticket['pnr'])
+            result = dict(ticket, promoted=promoted['pnr'] if promoted else None)
+        self._settle()
+        return result
+
+    def create_account(self, username=None):
+        try:
+            account_number = input("Enter Account Number : ")
+            # Validate account number before asking for the rest
+            valid, message = self.validate_account_number(account_number)
+            if not valid:
+                return message
+
+            account_holder = input("Enter Account Holder's Name : ")
+            account_type = input("Enter Account Type (savings/checking/investment): ")
+            initial_balance = input("Enter Initial Balance : ")
+            self.open_account(account_number, account_holder, account_type, initial_balance, owner=username)
+            return "Account created successfully"
+        except BankError as e:
+            return str(e)
+        except Exception as e:
+            return "Error occurred during account creation: " + str(e)
+
+
+    def deposit(self, account_number, amount):
+        # Rupees, as typed at the prompt ('50', '50.25' or 50), as it always
+        # was; post_deposit takes paise
+        try:
+            amount = parse_money(amount)
+            result = self.post_deposit(account_number, amount)
+            return "Deposited " + format_money(amount) + " successfully. New balance : " + format_money(result['balance'])
+        except BankError as e:
+            return str(e)
+        except Exception as e:
+            return "Error occurred during deposit: " + str(e)
+
+    def withdraw(self, account_number, amount):
+        # Rupees, as typed at the prompt ('50', '50.25' or 50), as it always
+        # was; post_withdrawal takes paise
+        try:
+            amount = parse_money(amount)
+            result = self.post_withdrawal(account_number, amount)
+            return "Withdrew " + format_money(amount) + " successfully. New balance : " + format_money(result['balance'])
+        except BankError as e:
+            return str(e)
+        except Exception as e:
+            return "Error occurred during withdrawal: " + str(e)
+
+    def check_balance(self, account_number):
+        try:
+            if account_number not in self.accounts:
+                return "Account does not exist"
+
+            return "Account Holder : " + self.accounts[account_number]['account_holder'] + "\nBalance : " + format_money(
+                self.accounts[account_number]['balance'])
+        except Exception as e:
+            return "Error occurred while checking balance: " + str(e)
+
+    def view_account_info(self, account_number):
+        try:
+            if account_number not in self.accounts:
+                return "Account does not exist"
+            
+            account_info = self.accounts[account_number]
+            account_holder = account_info['account_holder']
+            account_type = account_info['type']
+            balance = account_info['balance']
+            
+            info_str = f"Account Number: {account_number}\n"
+            info_str += f"Account Holder: {account_holder}\n"
+            info_str += f"Account Type: {account_type.capitalize()}\n"
+            info_str += f"Balance: {format_money(balance)}"
+            
+            return info_str
+        except Exception as e:
+            return "Error occurred while retrieving account info: " + str(e)
+
+    def view_transaction_history(self, account_number, limit=None, newest_first=False):
+        try:
+            if account_number not in self.transaction_history:
+                return "No transaction history available for this account"
+            if limit is None:
+                transactions = self.query_transactions(account_number, newest_first=newest_first)
+            else:
+                transactions = self.transaction_page(account_number, limit,
+                                                     newest_first=newest_first)['entries']
+            lines = ["Transaction History:\n"]
+            for transaction in transactions:
+                lines.append(f"Timestamp: {transaction['timestamp']}, Type: {transaction['type']}, Amount: {format_money(transaction['amount'])}\n")
+            return "".join(lines)
+        except Exception as e:
+            return "Error occurred while retrieving transaction history: " + str(e)
+
+    def view_portfolio(self, username):
+        try:
+            portfolio = self.portfolio(username)
+            if not portfolio['accounts']:
+                return "You have no accounts yet"
+            lines = []
+            for account in portfolio['accounts']:
+                lines.append(f"{account['account_number']}  {account['type']:<10} {account['account_holder']:<20} "
+                             f"{format_money(account['balance'])}\n")
+                for entry in account['recent']:
+                    lines.append(f"    {entry['timestamp']:%Y-%m-%d %H:%M}  {entry['type']:<20} "
+                                 f"{format_money(entry['amount'])}\n")
+            lines.append("Total balance: " + format_money(portfolio['total_balance']))
+            return "".join(lines)
+        except BankError as e:
+            return str(e)
+
+    def transfer_funds(self, username=None):
+        try:
+            from_account = input("Enter Your Account Number : ")
+            if from_account not in self.accounts:
+                return "Error: Sender account does not exist"
+            if username is not None and self.owner_error(username, from_account):
+                return "Error: " + self.owner_error(username, from_account)
+
+            to_account = input("Enter Recipient's Account Number : ")
+            amount = parse_money(input("Enter Amount to Transfer : "))
+            result = self.transfer(from_account, to_account, amount)
+            return (f"Transferred {format_money(amount)} successfully from account {from_account} to account {to_account}. "
+                    f"Sender's balance: {format_money(result['from_balance'])}, "
+                    f"Recipient's balance: {format_money(result['to_balance'])}")
+        except BankError as e:
+            return "Error: " + str(e)
+        except Exception as e:
+            return f"Error occurred during fund transfer: {e}"
+
+    def validate_operator(self, operator):
+        import billing
+        return billing.BILLERS.get(operator.lower(), {}).get('kind') == 'recharge'
+   
+    def validate_mobile_number(self, mobile_number):
+        return not validation.first_error('mobile_number', mobile_number)
+    
+    def validate_recharge_amount(self, amount):
+    
+        return amount > 0
+
+    def validate_transaction_account(self, transaction_account):
+       
+        return transaction_account in self.accounts
+
+    def recharge(self, username=None):
+        import billing
+        operators = [name for name, terms in billing.BILLERS.items() if terms['kind'] == 'recharge']
+        try:
+            operator = input(f"Enter operator ({', '.join(operators)}): ")
+            mobile_number = input("Enter mobile number: ")
+            amount = parse_money(input("Enter recharge amount: "))
+            transaction_account = input("Enter transaction account: ")
+            if username is not None and self.owner_error(username, transaction_account):
+                return self.owner_error(username, transaction_account)
+            self.recharge_mobile(operator, mobile_number, amount, transaction_account)
+
+            print("Recharge Details:")
+            print("Operator:", operator)
+            print("Mobile Number:", mobile_number)
+            print("Recharge Amount:", format_money(amount))
+            print("Transaction Account:", transaction_account)
+            return f"Recharged {operator} number {mobile_number} with {format_money(amount)} successfully."
+        except BankError as e:
+            return str(e)
+        except Exception as e:
+            return f"Error occurred during recharge: {e}"
+
+    def validate_customer_id(self, customer_id):
+        # # Check if customer ID length is exactly 8 characters
+        # if len(customer_id) != 8:
+        #     return "Customer ID must be exactly 8 characters long."
+
+        # Check if first 3 characters are alphabets and the rest are digits
+        message = validation.first_error('customer_id', customer_id)
+        return message or True
+
+    def pay_utility_bill(self, biller, username=None):
+        import billing
+        terms = billing.BILLERS[biller]
+        label = terms['label']
+        try:
+            reference = input(f"Enter {terms['prompt']}: ")
+            transaction_account = input("Enter transaction account: ")
+            if username is not None and self.owner_error(username, transaction_account):
+                return self.owner_error(username, transaction_account)
+            amount = parse_money(input(f"Enter {label.lower()} amount: "))
+            result = self.pay_biller(biller, reference, transaction_account, amount)
+            return f"{label} payment of {format_money(amount)} successful. New balance: {format_money(result['balance'])}"
+        except BankError as e:
+            return str(e)
+        except Exception as e:
+            return f"Error occurred during {label.lower()} payment: {e}"
+
+    def bill_payment(self, username=None):
+        import billing
+        # The menu lists every biller of kind 'bill' in billing.BILLERS
+        bills = [name for name, terms in billing.BILLERS.items() if terms['kind'] == 'bill']
+        print("\nChoose Bill Payment Option:")
+        print("1. Recharge")
+        for number, name in enumerate(bills, 2):
+            print(f"{number}. {billing.BILLERS[name]['label']}")
+
+        bill_choice = input(f"Enter your Choice (1 to {len(bills) + 1}): ")
+
+        if bill_choice == '1':
+            result = self.recharge(username)
+            print(result)
+        elif bill_choice.isdigit() and 2 <= int(bill_choice) <= len(bills) + 1:
+            result = self.pay_utility_bill(bills[int(bill_choice) - 2], username)
+            print(result)
+        else:
+            print("Invalid Choice. Please Try Again !!!")
+
+    def validate_station_name(self, station_name):
+        # Example validation: Ensure station name is not empty
+        if not station_name.strip():
+            return False
+        return True
+
+    def validate_travel_date(self, travel_date):
+        from datetime import datetime
+        try:
+            
+            travel_date_obj = datetime.strptime(travel_date, '%Y-%m-%d')
+            current_date = datetime.now()
+            if travel_date_obj < current_date:
+                return False
+            return True
+        except ValueError:
+            return False
+
+    def validate_travel_class(self, travel_class):
+  
+        valid_classes = ['1', '2', '3', '4']
+        return travel_class in valid_classes
+
+    def validate_quota(self, quota):
+       
+        valid_quotas = ['1', '2', '3', '4', '5']
+        return quota in valid_quotas
+
+    def book_train_ticket(self, account_number):
+        try:
+            if account_number not in self.accounts:
+                return "Account does not exist"
+
+            from_station = input("Enter the departure station: ")
+            to_station = input("Enter the destination station: ")
+            travel_date = input("Enter the travel date (YYYY-MM-DD): ")
+            travel_class = input("Enter the travel class (1. Sleeper, 2. First AC, 3. Second AC, 4. Third AC): ")
+            quota = input("(1. General, 2. Ladies, 3. Sr. Citizen, 4. Physically Handicapped, 5. Tatkal): ")
+            ticket = self.book_ticket(account_number, from_station, to_station, travel_date, travel_class, quota)
+            if ticket['seat'] is None:
+                return f"Train ticket waitlisted. PNR: {ticket['pnr']}"
+            return (f"Train ticket booked successfully. PNR: {ticket['pnr']}, Seat: {ticket['seat']}, "
+                    f"Fare: {format_money(ticket['fare'])}")
+        except BankError as e:
+            return str(e)
+        except Exception as e:
+            return f"Error occurred during train ticket booking: {e}"
+
+    def view_train_ticket_details(self, account_number):
+        try:
+            tickets = self.get_tickets(account_number)
+            if not tickets:
+                raise BankError("No train ticket booked for this account")
+            details_str = "Train Ticket Details:\n"
+            for ticket_details in tickets:
+                details_str += f"PNR: {ticket_details['pnr']}\n"
+                details_str += f"Status: {ticket_details['status']}\n"
+                if ticket_details['seat'] is not None:
+                    details_str += f"Seat: {ticket_details['seat']}\n"
+                details_str += f"From Station: {ticket_details['from_station']}\n"
+                details_str += f"To Station: {ticket_details['to_station']}\n"
+                details_str += f"Travel Date: {ticket_details['travel_date']}\n"
+                details_str += f"Travel Class: {ticket_details['travel_class']}\n"
+                details_str += f"Quota: {ticket_details['quota']}\n"
+                details_str += f"Fare: {format_money(ticket_details['fare'])}\n"
+            return details_str
+        except BankError as e:
+            return str(e)
+        except Exception as e:
+            return f"Error occurred while retrieving train ticket details: {e}"
+
+    def cancel_train_ticket(self, account_number):
+        try:
+            pnr = input("Enter PNR (leave blank for the latest ticket): ").strip()
+            self.cancel_ticket(account_number, pnr or None)
+            return "Train ticket canceled successfully"
+        except BankError as e:
+            return str(e)
+        except Exception as e:
+            return f"Error occurred during train ticket cancellation: {e}"
+
+    def perform_operations(self, session_token):
+        while True:
+            # A cheap session lookup, not another password check
+            try:
+                username = self.session_user(session_token)
+            except BankError as e:
+                print(e)
+                return
+            print("\n1. Create Account")
+            print("2. Deposit Money")
+            print("3. Withdraw Money")
+            print("4. Check Balance")
+            print("5. View Account Information")
+            print("6. View Transaction History")
+            print("7. Transfer Funds")
+            print("8. Bill Payment")
+            print("9. Train Ticket booking")
+            print("10. Logout")
+            print("11. Set MPIN")
+            print("12. My Accounts")
+            operation_choice = input("\nEnter your Choice (1 to 12): ")
+
+            if operation_choice == '1':
+                result = self.create_account(username)
+                print(result)
+
+            elif operation_choice == '2':
+                account_number = input("Enter Account Number : ")
+                amount = input("Enter Amount to Deposit : ")
+                result = self.owner_error(username, account_number) or self.deposit(account_number, amount)
+                print(result)
+
+            elif operation_choice == '3':
+                account_number = input("Enter Account Number : ")
+                amount = input("Enter Amount to Withdraw : ")
+                result = self.owner_error(username, account_number) or self.withdraw(account_number, amount)
+                print(result)
+
+            elif operation_choice == '4':
+                account_number = input("Enter Account Number : ")
+                result = self.owner_error(username, account_number) or self.check_balance(account_number)
+                print(result)
+
+            elif operation_choice == '5':
+                account_number = input("Enter Account Number: ")
+                result = self.owner_error(username, account_number) or self.view_account_info(account_number)
+                print(result)
+
+            elif operation_choice == '6':
+                account_number = input("Enter Account Number: ")
+                result = (self.owner_error(username, account_number)
+                          or self.view_transaction_history(account_number))
+                print(result)
+
+            elif operation_choice == '7':
+                result = self.transfer_funds(username)
+                print(result)
+
+            elif operation_choice == '8':
+                self.bill_payment(username)
+
+            elif operation_choice == '9':
+                while True:
+                    print("\nTrain Ticket Options:")
+                    print("1. Book Train Ticket")
+                    print("2. Cancel Train Ticket")
+                    print("3. View Details of Ticket")
+                    print("4. Exit")
+
+                    ticket_choice = input("Enter your Choice (1, 2, or 3): ")
+                    
+                    if ticket_choice == '1':
+                        account_number = input("Enter Account Number: ")
+                        result = (self.owner_error(username, account_number)
+                                  or self.book_train_ticket(account_number))
+                        print(result)
+                    elif ticket_choice == '2':
+                        account_number = input("Enter Account Number: ")
+                        result = (self.owner_error(username, account_number)
+                                  or self.cancel_train_ticket(account_number))
+                        print(result)
+                    elif ticket_choice == '3':
+                        account_number = input("Enter Account Number: ")
+                        result = (self.owner_error(username, account_number)
+                                  or self.view_train_ticket_details(account_number))
+                        print(result)
+                    elif ticket_choice == '4':
+                        print("Exiting train ticket operations.")
+                        break 
+                    else:
+                        print("Invalid Choice. Please Try Again !!!")
+
+            elif operation_choice == '10':
+                print("Logging out...")
+                self.logout(session_token)
+                break
+
+            elif operation_choice == '11':
+                mpin = input("Enter New 6-digit MPIN: ")
+                try:
+                    self.set_mpin(session_token, mpin)
+                    print("MPIN set successfully")
+                except BankError as e:
+                    print(e)
+
+            elif operation_choice == '12':
+                print(self.view_portfolio(username))
+
+            else:
+                print("Invalid Choice. Please Try Again !!!")
+
+
+def main():
+    bank = Bank(data_dir=os.environ.get("BANK_DATA_DIR", "bank_data"),
+                fare_rules=os.environ.get("BANK_FARE_RULES"),
+                risk_rules=os.environ.get("BANK_RISK_RULES"))  # This is a Bank object
+    print("============================================================================================")
+    print("                           \n****** Bank Management System ******                           ")
+    print("============================================================================================")
+
+    try:
+        while True:
+            print("\n1. Registration")
+            print("2. Login")
+            print("3. Exit")
+            choice = input("\nEnter your Choice (1 to 3): ")
+
+            if choice == '1':
+                result = bank.register()
+                print(result)
+
+            elif choice == '2':
+                print("1. Login with Username and Password")
+                print("2. Login with MPIN")
+                login_choice = input("Enter your Choice (1 or 2): ")
+
+                if login_choice == '1':
+                    username = input("Enter Username: ")
+                    password = input("Enter Password: ")
+                    token, result = bank.login_session(username, password=password)
+                    print(result)
+                    if token:
+                        bank.perform_operations(token)
+
+                elif login_choice == '2':
+                    username = input("Enter Username: ")
+                    mpin = input("Enter MPIN: ")
+                    token, result = bank.login_session(username, mpin=mpin)
+                    print(result)
+                    if token:
+                        bank.perform_operations(token)
+
+
+                else:
+                    print("Invalid Choice. Please Try Again !!!")
+
+            elif choice == '3':
+                print("Exiting the program.")
+                break
+
+            else:
+                print("Invalid Choice. Please Try Again !!!")
+
+    except Exception as e:
+        print("An error occurred:", e)
+    finally:
+        bank.close()
+
+
+if __name__ == "__main__":
+    main()
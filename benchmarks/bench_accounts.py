@@ -0,0 +1,97 @@
+"""Memory and speed of AccountTable against the old dict-per-account store.
+
+    python benchmarks/bench_accounts.py [--accounts 1000000]
+
+Builds the same accounts both ways and reports the memory each holds
+(tracemalloc), the time of a whole-bank balance scan, and the cost of a
+single-account read-modify-write as deposit does it.
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from accounts import AccountTable  # noqa: E402
+
+HOLDERS = ["Asha Rao", "Ravi Kumar", "Meera Shah", "John Mathew", "Priya Nair"]
+TYPES = ["savings", "checking", "investment"]
+
+
+def columns(count):
+    rng = random.Random(5)
+    numbers = [str(100000000 + i) for i in range(count)]
+    # Names as they would arrive from a file: equal, but separate objects
+    holders = [" ".join(rng.choice(HOLDERS).split()) for _ in range(count)]
+    types = [rng.choice(TYPES) for _ in range(count)]
+    balances = [rng.randint(10000, 10 ** 9) for _ in range(count)]
+    return numbers, holders, types, balances
+
+
+def build_dicts(numbers, holders, types, balances):
+    return {
+        account_number: {'account_holder': holder, 'balance': balance, 'type': account_type}
+        for account_number, holder, account_type, balance in zip(numbers, holders, types, balances)
+    }
+
+
+def build_table(numbers, holders, types, balances):
+    table = AccountTable()
+    table.extend(numbers, holders, types, balances)
+    return table
+
+
+def measure(build, count):
+    """Memory a store keeps once its input columns are dropped, keys and names included."""
+    tracemalloc.start()
+    data = columns(count)
+    store = build(*data)
+    del data
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return store, size
+
+
+def timed(fn, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--accounts", type=int, default=1000000)
+    args = parser.parse_args()
+
+    dicts, dict_bytes = measure(build_dicts, args.accounts)
+    table, table_bytes = measure(build_table, args.accounts)
+    print(f"memory: dicts {dict_bytes / args.accounts:6.0f} B/account   "
+          f"table {table_bytes / args.accounts:6.0f} B/account   "
+          f"{dict_bytes / table_bytes:.1f}x smaller")
+
+    dict_scan = timed(lambda: sum(account['balance'] for account in dicts.values()))
+    table_scan = timed(table.total_balance)
+    print(f"total balance scan: dicts {dict_scan * 1000:7.1f} ms   "
+          f"table {table_scan * 1000:7.1f} ms   {dict_scan / table_scan:.0f}x faster")
+
+    sample = random.Random(9).sample(list(table), min(100000, args.accounts))
+
+    def deposit_all(store):
+        for account_number in sample:
+            store[account_number]['balance'] += 100
+
+    dict_rmw = timed(lambda: deposit_all(dicts))
+    table_rmw = timed(lambda: deposit_all(table))
+    print(f"balance update: dicts {dict_rmw / len(sample) * 1e9:5.0f} ns   "
+          f"table {table_rmw / len(sample) * 1e9:5.0f} ns")
+
+
+if __name__ == "__main__":
+    main()
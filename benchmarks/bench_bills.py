@@ -0,0 +1,99 @@
+"""Bill payments one at a time against pay_bills batches, and settlement.
+
+    python benchmarks/bench_bills.py [--payments 20000] [--batch 500] [--data-dir DIR]
+
+Pays --payments random bills through Bank.pay_biller, then again through
+Bank.pay_bills in batches of --batch, and finally settles the queue into
+per-biller files. With --data-dir the bank keeps a durable ledger, so a
+single payment waits for its own fsync while a batch shares one.
+"""
+
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bank import Bank  # noqa: E402
+from billing import BILLERS  # noqa: E402
+
+ACCOUNTS = 1000
+
+
+def payments(count, rng):
+    references = {'customer_id': lambda: "CUS" + str(rng.randint(10000, 99999)),
+                  'mobile_number': lambda: str(rng.randint(6000000000, 9999999999))}
+    names = list(BILLERS)
+    result = []
+    for i in range(count):
+        name = rng.choice(names)
+        result.append({'biller': name,
+                       'reference': references[BILLERS[name]['reference']](),
+                       'transaction_account': str(100000000 + rng.randrange(ACCOUNTS)),
+                       'amount': rng.randint(100, 500000),
+                       'idempotency_key': f"pay-{i}"})
+    return result
+
+
+def new_bank(data_dir, name):
+    bank = Bank(data_dir=os.path.join(data_dir, name) if data_dir else None)
+    bank.open_accounts({
+        'account_number': [str(100000000 + i) for i in range(ACCOUNTS)],
+        'account_holder': ["Asha Rao"] * ACCOUNTS,
+        'account_type': ["savings"] * ACCOUNTS,
+        'initial_balance': [10 ** 12] * ACCOUNTS,
+    })
+    return bank
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--payments", type=int, default=20000)
+    parser.add_argument("--batch", type=int, default=500)
+    parser.add_argument("--data-dir")
+    args = parser.parse_args()
+
+    work = payments(args.payments, random.Random(11))
+    out_dir = tempfile.mkdtemp()
+    try:
+        bank = new_bank(args.data_dir, "single")
+        start = time.perf_counter()
+        for payment in work:
+            bank.pay_biller(**payment)
+        elapsed = time.perf_counter() - start
+        bank.close()
+        print(f"pay_biller      {len(work) / elapsed:>10,.0f} payments/s")
+
+        bank = new_bank(args.data_dir, "batched")
+        start = time.perf_counter()
+        for offset in range(0, len(work), args.batch):
+            bank.pay_bills(work[offset:offset + args.batch])
+        elapsed = time.perf_counter() - start
+        print(f"pay_bills/{args.batch:<5} {len(work) / elapsed:>10,.0f} payments/s")
+
+        # Every key again: all duplicates, nothing debited
+        start = time.perf_counter()
+        for offset in range(0, len(work), args.batch):
+            bank.pay_bills(work[offset:offset + args.batch])
+        elapsed = time.perf_counter() - start
+        print(f"retried batches {len(work) / elapsed:>10,.0f} payments/s")
+
+        start = time.perf_counter()
+        result = bank.settle_bills(out_dir)
+        elapsed = time.perf_counter() - start
+        bank.close()
+        print(f"settle_bills    {result['payments'] / elapsed:>10,.0f} payments/s  "
+              f"({len(result['billers'])} files)")
+    finally:
+        shutil.rmtree(out_dir)
+        if args.data_dir:
+            for name in ("single", "batched"):
+                shutil.rmtree(os.path.join(args.data_dir, name), ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
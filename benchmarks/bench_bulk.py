@@ -0,0 +1,87 @@
+"""Compare Bank.post_batch against calling post_deposit/post_withdrawal once per line.
+
+    python benchmarks/bench_bulk.py [--lines N] [--accounts N] [--data-dir DIR]
+
+With --data-dir both paths write to the ledger; the per-call loop then pays
+one fsync per line, so it is run on a smaller slice and scaled.
+"""
+
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bank import Bank, BankError  # noqa: E402
+
+
+def make_bank(num_accounts, data_dir=None):
+    bank = Bank(data_dir=data_dir, snapshot_every=0)
+    with bank.group_commit():
+        for i in range(num_accounts):
+            bank.open_account(str(100000000 + i), "Holder", "savings", 1000000)
+    return bank
+
+
+def make_lines(num_lines, num_accounts, seed=42):
+    rng = random.Random(seed)
+    lines = []
+    for _ in range(num_lines):
+        account_number = str(100000000 + rng.randrange(num_accounts))
+        kind = 'deposit' if rng.random() < 0.6 else 'withdrawal'
+        lines.append((account_number, rng.randint(1, 500), kind))
+    return lines
+
+
+def per_call(bank, lines):
+    start = time.perf_counter()
+    for account_number, amount, kind in lines:
+        try:
+            if kind == 'deposit':
+                bank.post_deposit(account_number, amount)
+            else:
+                bank.post_withdrawal(account_number, amount)
+        except BankError:
+            pass
+    return time.perf_counter() - start
+
+
+def bulk(bank, lines):
+    start = time.perf_counter()
+    bank.post_batch(lines)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--lines", type=int, default=200000)
+    parser.add_argument("--accounts", type=int, default=10000)
+    parser.add_argument("--data-dir", help="benchmark with the durable ledger in this directory")
+    args = parser.parse_args()
+
+    lines = make_lines(args.lines, args.accounts)
+    per_call_lines = lines
+    results = {}
+    for name, run in (("per-call", per_call), ("post_batch", bulk)):
+        data_dir = None
+        if args.data_dir:
+            data_dir = tempfile.mkdtemp(prefix=name + "-", dir=args.data_dir)
+            if name == "per-call":
+                per_call_lines = lines[:min(len(lines), 2000)]
+        bank = make_bank(args.accounts, data_dir)
+        batch = per_call_lines if name == "per-call" else lines
+        elapsed = run(bank, batch)
+        results[name] = len(batch) / elapsed
+        bank.close()
+        if data_dir:
+            shutil.rmtree(data_dir)
+        print(f"{name:>10}: {len(batch):>9} lines in {elapsed:8.3f}s  {results[name]:>12,.0f} lines/s")
+    print(f"   speedup: {results['post_batch'] / results['per-call']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""Time Bank.accrue_end_of_day over a large book.
+
+    python benchmarks/bench_eod.py [--accounts 1000000] [--days 2]
+
+Opens --accounts accounts of random type and balance, then runs a dry run
+and --days real accruals, reporting accounts/s for each. The first real
+day also creates a transaction history for every account, so later days
+are the steady state.
+"""
+
+import argparse
+import gc
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bank import Bank  # noqa: E402
+from money import format_money  # noqa: E402
+
+
+def build(count):
+    rng = random.Random(7)
+    bank = Bank()
+    gc.disable()
+    try:
+        bank.open_accounts({
+            'account_number': [str(100000000 + i) for i in range(count)],
+            'account_holder': ["Asha Rao"] * count,
+            'account_type': [rng.choice(("savings", "checking", "investment")) for _ in range(count)],
+            'initial_balance': [rng.randint(10000, 10 ** 8) for _ in range(count)],
+        })
+    finally:
+        gc.enable()
+    return bank
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--accounts", type=int, default=1000000)
+    parser.add_argument("--days", type=int, default=2)
+    args = parser.parse_args()
+
+    bank = build(args.accounts)
+    runs = [("dry run", True)] + [(f"day {day}", False) for day in range(1, args.days + 1)]
+    for label, dry_run in runs:
+        start = time.perf_counter()
+        result = bank.accrue_end_of_day(dry_run=dry_run)
+        elapsed = time.perf_counter() - start
+        print(f"{label:8} {elapsed:6.2f} s  {args.accounts / elapsed:>10,.0f} accounts/s  "
+              f"interest {format_money(result['interest'])}  fees {format_money(result['fees'])}")
+
+
+if __name__ == "__main__":
+    main()
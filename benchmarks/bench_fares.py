@@ -0,0 +1,61 @@
+"""Cost of a fare quote: cached FareEngine against resolving every time.
+
+    python benchmarks/bench_fares.py [--quotes 200000] [--rules fare_rules.json]
+
+Draws (route, class, quota, date) searches with a skew towards popular
+routes and dates, as a booking search page sees them, and times
+FareEngine.quote against FareTable.fare on the same searches, then
+prints the cache hit rate.
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from fares import FareEngine  # noqa: E402
+
+STATIONS = ["MUMBAI", "PUNE", "DELHI", "KOLKATA", "CHENNAI", "BENGALURU", "AHMEDABAD", "JAIPUR"]
+
+
+def searches(count, rng):
+    routes = [a + "-" + b for a in STATIONS for b in STATIONS if a != b]
+    dates = [f"2026-12-{day:02d}" for day in range(1, 32)]
+    # Weights 1/rank: a few routes and dates take most of the searches
+    route_weights = [1 / rank for rank in range(1, len(routes) + 1)]
+    date_weights = [1 / rank for rank in range(1, len(dates) + 1)]
+    return list(zip(rng.choices(routes, route_weights, k=count),
+                    rng.choices("1234", k=count),
+                    rng.choices("12345", k=count),
+                    rng.choices(dates, date_weights, k=count)))
+
+
+def timed(quote, work):
+    start = time.perf_counter()
+    for search in work:
+        quote(*search)
+    return (time.perf_counter() - start) / len(work)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--quotes", type=int, default=200000)
+    parser.add_argument("--rules", default=os.path.join(ROOT, "fare_rules.json"))
+    args = parser.parse_args()
+
+    work = searches(args.quotes, random.Random(4))
+    engine = FareEngine(args.rules)
+    resolved = timed(engine.table.fare, work)
+    cached = timed(engine.quote, work)
+    stats = engine.stats()
+    print(f"resolve every time {resolved * 1e9:6.0f} ns/quote")
+    print(f"cached quote       {cached * 1e9:6.0f} ns/quote   hit rate {stats['hit_rate']:.1%} "
+          f"({stats['cached']} fares cached)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""Time importer.import_accounts against opening the same accounts one by one.
+
+    python benchmarks/bench_import.py [--rows 1000000] [--bad 0.001] [--data-dir DIR]
+
+Writes a CSV of --rows accounts (with --bad of them invalid or duplicated)
+to a temporary directory, imports it, and opens a sample of the same rows
+through Bank.open_account for comparison.
+"""
+
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bank import Bank, BankError  # noqa: E402
+from importer import import_accounts  # noqa: E402
+
+
+def write_file(path, rows, bad, rng):
+    with open(path, "w") as f:
+        f.write("account_number,account_holder,account_type,initial_balance\n")
+        for i in range(rows):
+            account_number = str(100000000 + i)
+            if rng.random() < bad:
+                account_number = rng.choice((str(100000000 + max(i - 1, 0)), "12x"))
+            account_type = rng.choice(("savings", "checking", "investment"))
+            f.write(f"{account_number},Asha Rao,{account_type},{rng.randint(100, 100000)}\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--bad", type=float, default=0.001)
+    parser.add_argument("--sample", type=int, default=50000, help="rows opened one by one")
+    parser.add_argument("--data-dir")
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp()
+    try:
+        path = os.path.join(work_dir, "accounts.csv")
+        write_file(path, args.rows, args.bad, random.Random(3))
+
+        data_dir = os.path.join(args.data_dir, "import") if args.data_dir else None
+        bank = Bank(data_dir=data_dir)
+        start = time.perf_counter()
+        result = import_accounts(bank, path)
+        elapsed = time.perf_counter() - start
+        bank.close()
+        print(f"import_accounts  {args.rows / elapsed:>10,.0f} rows/s  "
+              f"imported={result['imported']} rejected={result['rejected']}")
+
+        bank = Bank()
+        with open(path) as f:
+            next(f)
+            lines = [next(f).rstrip("\n").split(",") for _ in range(min(args.sample, args.rows))]
+        start = time.perf_counter()
+        for account_number, holder, account_type, balance in lines:
+            try:
+                bank.open_account(account_number, holder, account_type, balance)
+            except BankError:
+                pass
+        elapsed = time.perf_counter() - start
+        print(f"open_account     {len(lines) / elapsed:>10,.0f} rows/s")
+    finally:
+        shutil.rmtree(work_dir)
+        if args.data_dir:
+            shutil.rmtree(os.path.join(args.data_dir, "import"), ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
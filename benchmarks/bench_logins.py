@@ -0,0 +1,54 @@
+"""Logins/sec at several scrypt cost settings, against session-token lookups.
+
+    python benchmarks/bench_logins.py [--seconds 2] [--costs 12,14,15]
+
+For each cost n = 2**k a user is registered with those parameters and
+logged in repeatedly for --seconds. The last line shows how many
+authenticated follow-up operations per second a session token allows,
+since a token lookup does no KDF work.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bank import Bank  # noqa: E402
+
+
+def logins_per_second(bank, seconds):
+    count = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        bank.authenticate("bench_user1", "Bench1234")
+        count += 1
+    return count / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=2.0)
+    parser.add_argument("--costs", default="12,14,15", help="comma-separated log2(n) values")
+    args = parser.parse_args()
+
+    for log_n in (int(cost) for cost in args.costs.split(",")):
+        params = {'n': 2 ** log_n, 'r': 8, 'p': 1}
+        bank = Bank(kdf_params=params)
+        bank.register_user("bench_user1", "bench1@example.com", "Bench1234")
+        rate = logins_per_second(bank, args.seconds)
+        memory = 128 * params['n'] * params['r'] / (1024 * 1024)
+        print(f"n=2**{log_n:<3} ({memory:>4.0f} MiB)  {rate:>8,.1f} logins/s  {1000 / rate:>7.1f} ms/login")
+
+    token = bank.authenticate("bench_user1", "Bench1234")
+    lookups = 200000
+    start = time.perf_counter()
+    for _ in range(lookups):
+        bank.session_user(token)
+    elapsed = time.perf_counter() - start
+    print(f"session lookups: {lookups / elapsed:,.0f}/s")
+
+
+if __name__ == "__main__":
+    main()
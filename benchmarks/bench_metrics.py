@@ -0,0 +1,59 @@
+"""Per-call cost of metrics.instrument().
+
+    python benchmarks/bench_metrics.py [--calls 200000]
+
+Times a wrapped no-op against the bare no-op (the instrumentation cost by
+itself), then post_deposit on a plain Bank and on an instrumented one, and
+prints a sample of the Prometheus output.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import metrics  # noqa: E402
+from bank import Bank  # noqa: E402
+
+
+def per_call(fn, calls, *args):
+    best = float("inf")
+    for _ in range(3):
+        start = time.perf_counter()
+        for _ in range(calls):
+            fn(*args)
+        best = min(best, time.perf_counter() - start)
+    return best / calls * 1e9
+
+
+def noop(value):
+    return value
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=200000)
+    args = parser.parse_args()
+
+    bare = per_call(noop, args.calls, 1)
+    wrapped = per_call(metrics.Metrics().wrap('noop', noop), args.calls, 1)
+    print(f"no-op: bare {bare:5.0f} ns   instrumented {wrapped:5.0f} ns   overhead {wrapped - bare:4.0f} ns")
+
+    bank = Bank()
+    bank.open_account("100000001", "Asha Rao", "savings", 10000)
+    plain = per_call(bank.post_deposit, args.calls, "100000001", 100)
+    recorder = metrics.instrument(bank)
+    timed = per_call(bank.post_deposit, args.calls, "100000001", 100)
+    metrics.uninstrument(bank)
+    again = per_call(bank.post_deposit, args.calls, "100000001", 100)
+    print(f"post_deposit: plain {plain:5.0f} ns   instrumented {timed:5.0f} ns   "
+          f"after uninstrument {again:5.0f} ns")
+    print(f"post_deposit p50/p99: {recorder.snapshot()['operations']['post_deposit']['p50_ns']} / "
+          f"{recorder.snapshot()['operations']['post_deposit']['p99_ns']} ns")
+    print("\n".join(recorder.prometheus().splitlines()[:6]))
+
+
+if __name__ == "__main__":
+    main()
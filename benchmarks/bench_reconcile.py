@@ -0,0 +1,61 @@
+"""Dashboard totals from the running aggregates against scanning, and the cost of reconcile().
+
+    python benchmarks/bench_reconcile.py [--accounts 200000] [--ops 200000]
+
+Builds a bank with benchmarks/workload.py and drives a stream of
+operations through it, then times Bank.treasury() against recomputing the
+same totals by scanning every account and history, and runs reconcile(),
+reporting how long writers were paused and how long the whole check took.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import aggregates  # noqa: E402
+import workload  # noqa: E402
+from bank import CREDIT_TYPES, BankError  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--accounts", type=int, default=200000)
+    parser.add_argument("--ops", type=int, default=200000)
+    args = parser.parse_args()
+
+    bank = workload.build_bank(args.users, args.accounts)
+    for _, method, call_args in workload.operations(args.accounts, args.ops):
+        try:
+            getattr(bank, method)(*call_args)
+        except BankError:
+            pass
+
+    start = time.perf_counter()
+    for _ in range(1000):
+        bank.treasury()
+    treasury = (time.perf_counter() - start) / 1000
+
+    start = time.perf_counter()
+    with bank.locks.hold_all():
+        view = aggregates.capture(bank)
+    aggregates.compute(view, CREDIT_TYPES)
+    scan = time.perf_counter() - start
+
+    start = time.perf_counter()
+    report = bank.reconcile()
+    elapsed = time.perf_counter() - start
+    print(f"{args.accounts} accounts, {report['entries']} history entries")
+    print(f"treasury() from aggregates  {treasury * 1e6:9.1f} us")
+    print(f"recomputed by scanning      {scan * 1e6:9.1f} us")
+    print(f"reconcile(): ok={report['ok']}  writers paused {report['paused_ms']:.1f} ms  "
+          f"total {elapsed * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""Cost of velocity screening on the debit path.
+
+    python benchmarks/bench_risk.py [--accounts 10000] [--debits 200000]
+
+Times RiskScreen.screen by itself (account limits, then account and user
+limits) and post_withdrawal spread over many accounts with screening off
+and with every window checked (risk.UNLIMITED: all checks run, none
+declines).
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import risk  # noqa: E402
+from bank import Bank  # noqa: E402
+
+
+def per_call(fn, calls):
+    best = float("inf")
+    for _ in range(3):
+        start = time.perf_counter()
+        for args in calls:
+            fn(*args)
+        best = min(best, time.perf_counter() - start)
+    return best / len(calls) * 1e9
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--accounts", type=int, default=10000)
+    parser.add_argument("--debits", type=int, default=200000)
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    numbers = [str(100000000 + index) for index in range(args.accounts)]
+    picks = [rng.choice(numbers) for _ in range(args.debits)]
+    now = time.time_ns() // 1000
+
+    screen = risk.RiskScreen(risk.UNLIMITED)
+    alone = per_call(screen.screen, [(number, 'savings', None, 100, now) for number in picks])
+    with_user = per_call(screen.screen, [(number, 'savings', 'user_1', 100, now) for number in picks])
+    print(f"screen(): account limits {alone:5.0f} ns   account and user limits {with_user:5.0f} ns")
+
+    for label, rules in (("off", {}), ("every window", risk.UNLIMITED)):
+        bank = Bank(risk_rules=rules)
+        bank.open_accounts({
+            'account_number': numbers,
+            'account_holder': ["Asha Rao"] * len(numbers),
+            'account_type': ["savings"] * len(numbers),
+            'initial_balance': [10 ** 12] * len(numbers),
+        })
+        cost = per_call(bank.post_withdrawal, [(number, 100) for number in picks])
+        print(f"post_withdrawal, screening {label:12} {cost:6.0f} ns")
+
+
+if __name__ == "__main__":
+    main()
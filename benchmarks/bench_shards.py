@@ -0,0 +1,81 @@
+"""Deposit/withdraw throughput of ShardedBank by shard count, and transfer latency.
+
+    python benchmarks/bench_shards.py [--max-shards N] [--ops 40000]
+        [--chunk 256] [--accounts 1000] [--data-dir DIR]
+
+For 1, 2, 4, ... shards (up to --max-shards, default the core count), a
+stream of deposits and withdrawals is sent in chunks through
+ShardedBank.execute_many, which runs each shard's part of a chunk in
+parallel. Then same-shard and cross-shard (two-phase) transfers are timed
+one at a time. Throughput only scales while there are free cores; with
+--data-dir every shard also has its own ledger and fsyncs.
+"""
+
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sharding import ShardedBank, shard_for  # noqa: E402
+
+
+def run(shards, args):
+    data_dir = tempfile.mkdtemp(dir=args.data_dir) if args.data_dir else None
+    bank = ShardedBank(data_dir, shards=shards)
+    accounts = [str(100000000 + i) for i in range(args.accounts)]
+    bank.execute_many([('open_account', (account_number, "Bench", "savings", 100000000))
+                       for account_number in accounts])
+
+    rng = random.Random(1)
+    calls = [(rng.choice(('post_deposit', 'post_withdrawal')), (rng.choice(accounts), rng.randint(1, 10000)))
+             for _ in range(args.ops)]
+    start = time.perf_counter()
+    for offset in range(0, len(calls), args.chunk):
+        bank.execute_many(calls[offset:offset + args.chunk])
+    elapsed = time.perf_counter() - start
+    line = f"shards={shards:>3}  {len(calls) / elapsed:>10,.0f} ops/s"
+
+    if shards > 1:
+        local, remote = [], []
+        for _ in range(args.transfers):
+            from_account, to_account = rng.sample(accounts, 2)
+            same = shard_for(from_account, shards) == shard_for(to_account, shards)
+            start = time.perf_counter()
+            bank.transfer(from_account, to_account, 100)
+            (local if same else remote).append(time.perf_counter() - start)
+        line += (f"  same-shard transfer {median(local) * 1e6:>7,.0f} us"
+                 f"  cross-shard transfer {median(remote) * 1e6:>7,.0f} us")
+    print(line)
+    bank.close()
+    if data_dir:
+        shutil.rmtree(data_dir)
+
+
+def median(values):
+    values = sorted(values)
+    return values[len(values) // 2] if values else float("nan")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--max-shards", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--ops", type=int, default=40000)
+    parser.add_argument("--chunk", type=int, default=256, help="calls per execute_many")
+    parser.add_argument("--accounts", type=int, default=1000)
+    parser.add_argument("--transfers", type=int, default=500)
+    parser.add_argument("--data-dir")
+    args = parser.parse_args()
+
+    shards = 1
+    while shards <= max(args.max_shards, 1):
+        run(shards, args)
+        shards *= 2
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""Startup from a binary snapshot against JSON and pickle ones.
+
+    python benchmarks/bench_snapshot.py [--accounts 100000,1000000] [--users 1000]
+                                        [--history 10] [--entries 5] [--formats binary,json,pickle]
+
+For each book size, builds a bank with benchmarks/workload.py (every
+--history'th account with --entries postings, one account per user owned
+by it) and writes its state as a binary snapshot (snapshot.py), a JSON
+snapshot (ledger.write_snapshot) and a pickle of Bank._dump_state(),
+reporting how long each took and its size. Then, in a fresh process per
+format, times opening the bank to its first check_balance() and
+view_account_info(), the mean of 10,000 random balance lookups after that,
+and the process's peak RSS. The binary snapshot is opened the way a
+restart opens it, Bank(data_dir=...); the pickle is loaded with
+Bank._load_state(), the same path as a JSON snapshot.
+
+Files are read back right after being written, so they are in the page
+cache: the numbers are for a warm restart.
+"""
+
+import argparse
+import gc
+import json
+import os
+import pickle
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import ledger  # noqa: E402
+import snapshot  # noqa: E402
+import workload  # noqa: E402
+from bank import Bank  # noqa: E402
+
+FORMATS = ('binary', 'json', 'pickle')
+LOOKUPS = 10000
+
+
+def build(users, accounts, history, entries):
+    bank = workload.build_bank(users, accounts)
+    for index in range(min(users, accounts)):
+        bank.assign_owner(workload.account_number(index), f"user_{index + 1}")
+    rng = random.Random(5)
+    numbers = [workload.account_number(index) for index in range(0, accounts, history)]
+    gc.disable()
+    try:
+        for entry in range(entries):
+            kind = 'deposit' if entry % 2 == 0 else 'withdrawal'
+            bank.post_batch({'account': numbers, 'amount': [rng.randint(100, 10000) for _ in numbers],
+                             'type': [kind] * len(numbers)})
+    finally:
+        gc.enable()
+    return bank
+
+
+def write(bank, directory, format):
+    """Write `bank` in `format` under directory; returns (seconds, bytes)."""
+    os.makedirs(directory)
+    started = time.perf_counter()
+    if format == 'binary':
+        path = os.path.join(directory, "snapshot.bin")
+        with bank.locks.hold_all():
+            snapshot.write(path, bank, 0)
+    elif format == 'json':
+        path = os.path.join(directory, "snapshot.json")
+        ledger.write_snapshot(path, bank._dump_state(), 0)
+    else:
+        path = os.path.join(directory, "state.pickle")
+        with open(path, "wb") as f:
+            pickle.dump(bank._dump_state(), f, pickle.HIGHEST_PROTOCOL)
+            f.flush()
+            os.fsync(f.fileno())
+    return time.perf_counter() - started, os.path.getsize(path)
+
+
+def open_and_time(directory, format, accounts):
+    """Run in the child process: open the bank and time its first reads."""
+    rng = random.Random(11)
+    started = time.perf_counter()
+    if format == 'pickle':
+        bank = Bank()
+        with open(os.path.join(directory, "state.pickle"), "rb") as f:
+            bank._load_state(pickle.load(f))
+    else:
+        bank = Bank(data_dir=directory)
+    opened = time.perf_counter()
+    account_number = workload.account_number(rng.randrange(accounts))
+    bank.check_balance(account_number)
+    bank.view_account_info(account_number)
+    first = time.perf_counter()
+    numbers = [workload.account_number(rng.randrange(accounts)) for _ in range(LOOKUPS)]
+    lookups_started = time.perf_counter()
+    for account_number in numbers:
+        bank.get_balance(account_number)
+    lookups = time.perf_counter() - lookups_started
+    print(json.dumps({'open': opened - started, 'first': first - started, 'lookup': lookups / LOOKUPS,
+                      'rss': peak_rss()}))
+
+
+def peak_rss():
+    # ru_maxrss would count the parent's pages from before the exec
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) * 1024
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--accounts", default="100000,1000000", help="comma-separated book sizes")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--history", type=int, default=10, help="every this many accounts has a history")
+    parser.add_argument("--entries", type=int, default=5, help="postings per account with a history")
+    parser.add_argument("--formats", default=",".join(FORMATS))
+    parser.add_argument("--open", nargs=2, metavar=("DIR", "FORMAT"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.open:
+        open_and_time(args.open[0], args.open[1], int(args.accounts))
+        return
+
+    formats = [format for format in args.formats.split(",") if format]
+    root = tempfile.mkdtemp(prefix="snapshots-")
+    try:
+        for count in (int(part) for part in args.accounts.split(",")):
+            bank = build(args.users, count, args.history, args.entries)
+            written = {}
+            for format in formats:
+                written[format] = write(bank, os.path.join(root, format), format)
+                gc.collect()
+            bank.close()
+            del bank
+            gc.collect()
+            for format in formats:
+                output = subprocess.run([sys.executable, os.path.abspath(__file__), "--accounts", str(count),
+                                         "--open", os.path.join(root, format), format],
+                                        check=True, capture_output=True, text=True).stdout
+                result = json.loads(output.splitlines()[-1])
+                seconds, size = written[format]
+                print(f"{count:>10,} accounts  {format:<6}  write {seconds:7.2f} s  {size / 2 ** 20:8.1f} MB  "
+                      f"open {result['open']:7.3f} s  first read {result['first']:7.3f} s  "
+                      f"lookup {result['lookup'] * 1e6:5.1f} us  peak RSS {result['rss'] / 2 ** 20:7.1f} MB")
+            shutil.rmtree(root)
+            os.makedirs(root)
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
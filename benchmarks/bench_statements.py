@@ -0,0 +1,85 @@
+"""Time Bank.write_statements over books of growing size.
+
+    python benchmarks/bench_statements.py [--accounts 25000,100000] [--entries 20]
+                                          [--processes 4] [--format csv]
+
+For each book size, opens the accounts and posts --entries deposits and
+withdrawals to each, then writes every statement with one process and
+with --processes workers, reporting statements/s and entries/s. A third
+pass runs in-process under tracemalloc and reports the peak memory the
+statements allocated on top of the book, which should not grow with it.
+"""
+
+import argparse
+import gc
+import os
+import random
+import shutil
+import sys
+import tempfile
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bank import Bank  # noqa: E402
+
+
+def build(count, entries):
+    rng = random.Random(7)
+    bank = Bank()
+    numbers = [str(100000000 + i) for i in range(count)]
+    gc.disable()
+    try:
+        bank.open_accounts({
+            'account_number': numbers,
+            'account_holder': ["Asha Rao"] * count,
+            'account_type': [rng.choice(("savings", "checking", "investment")) for _ in range(count)],
+            'initial_balance': [rng.randint(10 ** 6, 10 ** 8) for _ in range(count)],
+        })
+        for i in range(entries):
+            kind = 'deposit' if i % 2 == 0 else 'withdrawal'
+            bank.post_batch({'account': numbers, 'amount': [rng.randint(100, 10 ** 5) for _ in range(count)],
+                             'type': [kind] * count})
+    finally:
+        gc.enable()
+    return bank
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--accounts", default="25000,100000", help="comma-separated book sizes")
+    parser.add_argument("--entries", type=int, default=20, help="transactions per account")
+    parser.add_argument("--processes", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--format", choices=("csv", "jsonl"), default="csv")
+    args = parser.parse_args()
+
+    out_dir = tempfile.mkdtemp(prefix="statements-")
+    try:
+        for count in (int(part) for part in args.accounts.split(",")):
+            bank = build(count, args.entries)
+            for processes in sorted({1, args.processes}):
+                result = bank.write_statements(out_dir, format=args.format, processes=processes,
+                                               accounts_per_file=max(1000, count // (4 * processes)))
+                size = sum(os.path.getsize(summary['file']) for summary in result['files'])
+                # A run too quick to time has no rates, as in write_statements
+                entry_rate = result['entries'] / result['seconds'] if result['seconds'] else 0
+                print(f"{count:>9,} accounts  {processes} proc  {result['statements_per_second'] or 0:>10,.0f} statements/s  "
+                      f"{entry_rate:>11,.0f} entries/s  {size / 2 ** 20:7.1f} MB gzip")
+                shutil.rmtree(out_dir)
+
+            tracemalloc.start()
+            base, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            bank.write_statements(out_dir, format=args.format, processes=1)
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            shutil.rmtree(out_dir)
+            print(f"{count:>9,} accounts  peak memory while writing: {(peak - base) / 1024:,.0f} KB")
+            del bank
+            gc.collect()
+    finally:
+        shutil.rmtree(out_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""Simulate the Tatkal opening rush on one train and check nothing is oversold.
+
+    python benchmarks/bench_tatkal.py [--requests 20000] [--threads 32] [--trains 1] [--data-dir DIR]
+
+--threads workers book Tatkal seats at once, each from its own accounts,
+on --trains trains of the same date and class, all released at the same
+moment. Reports reservations/s and then checks the inventory: every
+confirmed ticket holds a distinct seat from the Tatkal pool, no more than
+the pool's size are confirmed, and the waitlist never exceeds its limit.
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import trains  # noqa: E402
+from bank import Bank, BankError  # noqa: E402
+
+TATKAL = '5'
+SLEEPER = '1'
+TRAVEL_DATE = "2099-01-01"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--trains", type=int, default=1)
+    parser.add_argument("--data-dir")
+    args = parser.parse_args()
+
+    data_dir = os.path.join(args.data_dir, "tatkal") if args.data_dir else None
+    bank = Bank(data_dir=data_dir)
+    accounts = [str(100000000 + i) for i in range(args.threads * 10)]
+    bank.open_accounts({
+        'account_number': accounts,
+        'account_holder': ["Asha Rao"] * len(accounts),
+        'account_type': ["savings"] * len(accounts),
+        'initial_balance': [10 ** 12] * len(accounts),
+    })
+    train_names = [f"12{index:03d}" for index in range(args.trains)]
+    per_thread = args.requests // args.threads
+    outcomes = {'CNF': 0, 'WL': 0, 'rejected': 0}
+    outcome_lock = threading.Lock()
+    gate = threading.Barrier(args.threads + 1)
+
+    def rush(worker):
+        mine = accounts[worker * 10:(worker + 1) * 10]
+        counts = {'CNF': 0, 'WL': 0, 'rejected': 0}
+        gate.wait()
+        for i in range(per_thread):
+            try:
+                ticket = bank.book_ticket(mine[i % 10], "Pune", "Delhi", TRAVEL_DATE, SLEEPER, TATKAL,
+                                          train=train_names[(worker + i) % len(train_names)])
+                counts[ticket['status']] += 1
+            except BankError:
+                counts['rejected'] += 1
+        with outcome_lock:
+            for status, count in counts.items():
+                outcomes[status] += count
+
+    workers = [threading.Thread(target=rush, args=(worker,)) for worker in range(args.threads)]
+    for worker in workers:
+        worker.start()
+    gate.wait()
+    start = time.perf_counter()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - start
+    total = per_thread * args.threads
+    print(f"{total} reservations by {args.threads} threads: {total / elapsed:,.0f}/s  "
+          f"confirmed={outcomes['CNF']} waitlisted={outcomes['WL']} rejected={outcomes['rejected']}")
+
+    pool = int(trains.CAPACITY[SLEEPER] * trains.QUOTA_SHARES[TATKAL])
+    for train in train_names:
+        confirmed = [ticket for ticket in bank.train_tickets.tickets.values()
+                     if ticket['train'] == train and ticket['status'] == 'CNF']
+        seats = [ticket['seat'] for ticket in confirmed]
+        inventory = bank.train_tickets.inventories[trains.inventory_key(train, TRAVEL_DATE, SLEEPER)]
+        assert len(seats) == len(set(seats)) <= pool, "seat sold twice"
+        assert len(seats) + len(inventory.free[TATKAL]) == pool, "seat lost"
+        assert len(inventory.waiting[TATKAL]) <= trains.WAITLIST_LIMIT, "waitlist overflow"
+    print(f"ok: {pool} Tatkal seats per train, none oversold")
+    bank.close()
+    if data_dir:
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""Compare validation.validate_many with the original per-field validators.
+
+    python benchmarks/bench_validation.py [--values 200000] [--invalid 0.05]
+
+The original validate_username/email/password and account number checks
+are reproduced below as they were before validation.py. For each field a
+column of ASCII values, mostly valid with --invalid of them broken, is
+checked both ways, and the first failure reported must agree. Note that
+validate_many lists every failure of a bad value, while the originals
+stop at the first.
+"""
+
+import argparse
+import gc
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import validation  # noqa: E402
+
+
+def old_username(username):
+    if not username[0].isalpha():
+        return "Username must be start with a letter"
+    if not any(char.isdigit() for char in username):
+        return "Username must contain at least one number"
+    if '_' not in username:
+        return "Username must contain an underscore"
+    if not 6 <= len(username) <= 20:
+        return "Username length must be between 6 and 20 characters"
+    return ""
+
+
+def old_email(email):
+    if '@' not in email:
+        return "Invalid email format. Email must be contain '@'"
+    if not email.endswith('.com'):
+        return "Invalid email format. Email must be end with '.com'"
+    if not any(char.isalpha() for char in email):
+        return "Email must contain at least one letter"
+    if not any(char.isdigit() for char in email):
+        return "Email must contain at least one digit"
+    if not any(char.islower() or char.isupper() for char in email):
+        return "Email must contain at least one upper or lower case letter"
+    return ""
+
+
+def old_password(password):
+    if not any(char.isupper() for char in password):
+        return "Password must contain at least one uppercase letter"
+    if not any(char.islower() for char in password):
+        return "Password must contain at least one lowercase letter"
+    if not any(char.isdigit() for char in password):
+        return "Password must contain at least one digit"
+    if not 8 <= len(password) <= 15:
+        return "Password length must be between 8 and 15 characters"
+    return ""
+
+
+def old_account_number(account_number):
+    if not account_number.isdigit():
+        return "Account number must contain only digits"
+    if len(account_number) < 9 or len(account_number) > 18:
+        return "Account number length must be between 9 and 18 digits"
+    return ""
+
+
+OLD = {
+    'username': old_username,
+    'email': old_email,
+    'password': old_password,
+    'account_number': old_account_number,
+}
+LETTERS = "abcdefghijklmnopqrstuvwxyz"
+DIGITS = "0123456789"
+
+
+def valid_value(field, rng):
+    word = "".join(rng.choice(LETTERS) for _ in range(rng.randint(3, 8)))
+    number = str(rng.randint(1, 99999))
+    if field == 'username':
+        return word + "_" + number
+    if field == 'email':
+        return word + number + "@example.com"
+    if field == 'password':
+        return word.capitalize() + number + "!"
+    return "".join(rng.choice(DIGITS) for _ in range(rng.randint(9, 18)))
+
+
+def make_values(field, count, invalid, rng):
+    """Mostly valid values, as in a real import; a share is broken at random."""
+    values = []
+    for _ in range(count):
+        value = valid_value(field, rng)
+        if rng.random() < invalid:
+            cut = rng.randrange(len(value))
+            value = value[:cut] + rng.choice(("", "x", "9", " ")) + value[cut + 2:]
+        values.append(value)
+    return values
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--values", type=int, default=200000)
+    parser.add_argument("--invalid", type=float, default=0.05, help="share of values to break")
+    args = parser.parse_args()
+    rng = random.Random(7)
+
+    for field, old in OLD.items():
+        values = make_values(field, args.values, args.invalid, rng)
+
+        gc.collect()
+        start = time.perf_counter()
+        old_results = [old(value) for value in values]
+        old_elapsed = time.perf_counter() - start
+
+        gc.collect()
+        start = time.perf_counter()
+        failures = validation.validate_many(field, values)
+        new_elapsed = time.perf_counter() - start
+
+        first = [""] * len(values)
+        for index, messages in failures:
+            first[index] = messages[0]
+        assert first == old_results, field + ": first failure differs"
+        print(f"{field:<15} old {len(values) / old_elapsed:>12,.0f}/s   "
+              f"validate_many {len(values) / new_elapsed:>12,.0f}/s   "
+              f"{old_elapsed / new_elapsed:4.1f}x   invalid={len(failures)}")
+
+
+if __name__ == "__main__":
+    main()
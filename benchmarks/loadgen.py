@@ -0,0 +1,153 @@
+"""Load generator for server.py: reports ops/sec and p50/p99 latency.
+
+    python benchmarks/loadgen.py [--inline] [--host H --port P | --unix PATH]
+        [--connections 8] [--window 32] [--requests 20000] [--binary]
+
+Each connection keeps up to --window requests in flight (pipelining), using
+a mix of deposits, withdrawals, transfers and balance reads. --inline starts
+a server in this process on an ephemeral port, so nothing else has to be
+running; it then shares the GIL with the clients.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import struct
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+FRAME_HEADER = struct.Struct(">I")
+ACCOUNTS = 1000
+
+
+class Connection:
+    def __init__(self, reader, writer, binary):
+        self.reader = reader
+        self.writer = writer
+        self.binary = binary
+        self.next_id = 0
+
+    def send(self, op, args):
+        self.next_id += 1
+        payload = json.dumps({'id': self.next_id, 'op': op, 'args': args}).encode()
+        if self.binary:
+            self.writer.write(FRAME_HEADER.pack(len(payload)) + payload)
+        else:
+            self.writer.write(payload + b"\n")
+        return self.next_id
+
+    async def receive(self):
+        if self.binary:
+            (length,) = FRAME_HEADER.unpack(await self.reader.readexactly(FRAME_HEADER.size))
+            return json.loads(await self.reader.readexactly(length))
+        return json.loads(await self.reader.readline())
+
+
+async def connect(args):
+    if args.unix:
+        reader, writer = await asyncio.open_unix_connection(args.unix)
+    else:
+        reader, writer = await asyncio.open_connection(args.host, args.port)
+    return Connection(reader, writer, args.binary)
+
+
+def random_request(rng):
+    account_number = str(100000000 + rng.randrange(ACCOUNTS))
+    roll = rng.random()
+    if roll < 0.3:
+        return 'deposit', {'account_number': account_number, 'amount': rng.randint(1, 10000)}
+    if roll < 0.5:
+        return 'withdraw', {'account_number': account_number, 'amount': rng.randint(1, 10000)}
+    if roll < 0.7:
+        to_account = str(100000000 + rng.randrange(ACCOUNTS))
+        return 'transfer', {'from_account': account_number, 'to_account': to_account,
+                            'amount': rng.randint(1, 10000)}
+    return 'balance', {'account_number': account_number}
+
+
+async def setup(args):
+    conn = await connect(args)
+    for i in range(ACCOUNTS):
+        conn.send('open_account', {'account_number': str(100000000 + i), 'account_holder': "Load Test",
+                                   'account_type': "savings", 'initial_balance': 100000000})
+    for _ in range(ACCOUNTS):
+        await conn.receive()
+    conn.writer.close()
+
+
+async def client(args, slot, count, latencies):
+    conn = await connect(args)
+    rng = random.Random(slot)
+    sent_at = {}
+    in_flight = asyncio.Semaphore(args.window)
+
+    async def reader():
+        for _ in range(count):
+            response = await conn.receive()
+            latencies.append(time.perf_counter() - sent_at.pop(response['id']))
+            in_flight.release()
+
+    receiving = asyncio.create_task(reader())
+    for _ in range(count):
+        await in_flight.acquire()
+        op, op_args = random_request(rng)
+        sent_at[conn.send(op, op_args)] = time.perf_counter()
+        if in_flight.locked():
+            await conn.writer.drain()
+    await conn.writer.drain()
+    await receiving
+    conn.writer.close()
+
+
+def percentile(sorted_values, fraction):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+async def run(args):
+    server = None
+    if args.inline:
+        from bank import Bank
+        from server import BankServer
+        bank = Bank(data_dir=args.data_dir)
+        server = await BankServer(bank).start(args.host, 0)
+        args.port = server.sockets[0].getsockname()[1]
+    await setup(args)
+
+    per_client = args.requests // args.connections
+    latencies = []
+    start = time.perf_counter()
+    await asyncio.gather(*(client(args, slot, per_client, latencies)
+                           for slot in range(args.connections)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    print(f"{len(latencies)} requests over {args.connections} connections, window {args.window}")
+    print(f"  {len(latencies) / elapsed:,.0f} ops/s")
+    print(f"  p50 {percentile(latencies, 0.50) * 1000:.3f} ms   "
+          f"p99 {percentile(latencies, 0.99) * 1000:.3f} ms   "
+          f"max {latencies[-1] * 1000:.3f} ms")
+    if server is not None:
+        server.close()
+        await server.wait_closed()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--unix")
+    parser.add_argument("--inline", action="store_true", help="run the server in this process")
+    parser.add_argument("--data-dir", help="with --inline, give the server a durable ledger")
+    parser.add_argument("--connections", type=int, default=8)
+    parser.add_argument("--window", type=int, default=32, help="pipelined requests per connection")
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--binary", action="store_true", help="use length-prefixed frames")
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
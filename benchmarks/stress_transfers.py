@@ -0,0 +1,107 @@
+"""Hammer Bank.transfer from many threads and check that no money is lost.
+
+    python benchmarks/stress_transfers.py [--threads 8] [--accounts 64]
+        [--transfers 5000] [--disjoint] [--data-dir DIR]
+
+Each thread makes random transfers. Afterwards the total must equal the
+opening total, no balance may be negative, and every account's balance must
+equal its opening balance plus its recorded movements. With --disjoint each
+thread only touches its own slice of accounts, which shows how throughput
+scales when threads do not contend. With --data-dir the ledger is on and
+threads share fsyncs through group commit.
+"""
+
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bank import CREDIT_TYPES, Bank, BankError  # noqa: E402
+
+OPENING_BALANCE = 1000000
+
+
+def run(num_threads, args):
+    data_dir = tempfile.mkdtemp(dir=args.data_dir) if args.data_dir else None
+    bank = Bank(data_dir=data_dir, snapshot_every=0)
+    accounts = [str(100000000 + i) for i in range(args.accounts)]
+    with bank.group_commit():
+        for account_number in accounts:
+            bank.open_account(account_number, "Holder", "savings", OPENING_BALANCE)
+
+    completed = [0] * num_threads
+    start_barrier = threading.Barrier(num_threads + 1)
+
+    def worker(slot):
+        rng = random.Random(slot)
+        if args.disjoint:
+            mine = accounts[slot::num_threads]
+        else:
+            mine = accounts
+        start_barrier.wait()
+        for _ in range(args.transfers):
+            from_account, to_account = rng.sample(mine, 2)
+            try:
+                bank.transfer(from_account, to_account, rng.randint(1, OPENING_BALANCE // 10))
+                completed[slot] += 1
+            except BankError:
+                pass
+
+    threads = [threading.Thread(target=worker, args=(slot,)) for slot in range(num_threads)]
+    for thread in threads:
+        thread.start()
+    start_barrier.wait()
+    start = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    check(bank, accounts, sum(completed))
+    attempts = num_threads * args.transfers
+    print(f"threads={num_threads:>3}  {attempts / elapsed:>10,.0f} transfers/s  "
+          f"completed={sum(completed)}")
+    bank.close()
+    if data_dir:
+        shutil.rmtree(data_dir)
+
+
+def check(bank, accounts, completed):
+    expected_total = OPENING_BALANCE * len(accounts)
+    assert bank.total_balance() == expected_total, "money was created or destroyed"
+    entries = 0
+    for account_number in accounts:
+        balance = bank.get_balance(account_number)
+        assert balance >= 0, account_number + " is overdrawn"
+        movement = 0
+        for transaction in bank.query_transactions(account_number):
+            sign = 1 if transaction['type'] in CREDIT_TYPES else -1
+            movement += sign * transaction['amount']
+            entries += 1
+        assert balance == OPENING_BALANCE + movement, account_number + " does not match its history"
+    assert entries == 2 * completed, "history does not match completed transfers"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--accounts", type=int, default=64)
+    parser.add_argument("--transfers", type=int, default=5000, help="transfers per thread")
+    parser.add_argument("--disjoint", action="store_true")
+    parser.add_argument("--data-dir")
+    args = parser.parse_args()
+
+    num_threads = 1
+    while num_threads <= args.threads:
+        run(num_threads, args)
+        num_threads *= 2
+    print("conservation checks passed")
+
+
+if __name__ == "__main__":
+    main()
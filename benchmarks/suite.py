@@ -0,0 +1,205 @@
+"""Benchmark suite: run a synthetic workload, save the results, check for regressions.
+
+    python benchmarks/suite.py run [--users 1000] [--accounts 10000] [--ops 100000]
+                                   [--mix deposit=35,withdraw=25,transfer=25,bill=10,ticket=5]
+                                   [--skew 1.1] [--seed 1] [--data-dir DIR] [--out results.json]
+    python benchmarks/suite.py compare baseline.json results.json [--threshold 0.10]
+
+`run` builds a bank with benchmarks/workload.py, drives the operation
+stream through the Bank API and reports throughput, latency percentiles
+per operation, peak RSS and the memory each operation leaves allocated.
+With --out the results (and the git commit they were taken at) are saved
+as JSON.
+
+`compare` exits with status 1 if the second file is worse than the first
+by more than --threshold on throughput, on p50/p99 latency of any
+operation, or on memory per operation.
+"""
+
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import workload  # noqa: E402
+from bank import BankError  # noqa: E402
+from metrics import Histogram  # noqa: E402
+
+# Sample of the stream replayed under tracemalloc for memory per operation
+MEMORY_SAMPLE = 5000
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        mix[name.strip()] = float(weight)
+    return mix
+
+
+def commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def drive(bank, stream):
+    """Run every operation; returns {name: [Histogram, ok, rejected]} and the wall time."""
+    stats = {}
+    clock = time.perf_counter_ns
+    start = time.perf_counter()
+    for name, method, args in stream:
+        entry = stats.get(name)
+        if entry is None:
+            entry = stats[name] = [Histogram(), 0, 0]
+        call = getattr(bank, method)
+        began = clock()
+        try:
+            call(*args)
+            entry[1] += 1
+        except BankError:
+            entry[2] += 1
+        entry[0].record(clock() - began)
+    return stats, time.perf_counter() - start
+
+
+def run(args):
+    mix = parse_mix(args.mix) if args.mix else workload.DEFAULT_MIX
+    data_dir = os.path.join(args.data_dir, "suite") if args.data_dir else None
+    build_start = time.perf_counter()
+    bank = workload.build_bank(args.users, args.accounts, args.seed, data_dir)
+    build_time = time.perf_counter() - build_start
+    stream = workload.operations(args.accounts, args.ops, mix, args.skew, args.seed)
+
+    stats, elapsed = drive(bank, stream)
+    peak_rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    # Memory an operation leaves behind (history entries, tickets, queued
+    # bills), measured on a fresh stretch of the same workload
+    sample = workload.operations(args.accounts, min(MEMORY_SAMPLE, args.ops), mix, args.skew, args.seed + 1)
+    blocks_before = sys.getallocatedblocks()
+    tracemalloc.start()
+    drive(bank, sample)
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    blocks_after = sys.getallocatedblocks()
+    bank.close()
+
+    results = {
+        'meta': {
+            'commit': commit(),
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'cpus': os.cpu_count(),
+            'time': time.strftime("%Y-%m-%dT%H:%M:%S"),
+            'params': {'users': args.users, 'accounts': args.accounts, 'ops': args.ops, 'mix': mix,
+                       'skew': args.skew, 'seed': args.seed, 'durable': data_dir is not None},
+        },
+        'build_seconds': round(build_time, 3),
+        'throughput_ops': round(len(stream) / elapsed, 1),
+        'peak_rss_mb': round(peak_rss_kb / 1024, 1),
+        'bytes_per_op': round(retained / len(sample), 1),
+        'blocks_per_op': round((blocks_after - blocks_before) / len(sample), 2),
+        'operations': {},
+    }
+    for name, (histogram, ok, rejected) in sorted(stats.items()):
+        results['operations'][name] = {
+            'count': ok + rejected,
+            'rejected': rejected,
+            'p50_us': histogram.percentile(0.50) / 1000,
+            'p90_us': histogram.percentile(0.90) / 1000,
+            'p99_us': histogram.percentile(0.99) / 1000,
+        }
+
+    print(f"{len(stream)} operations: {results['throughput_ops']:,.0f} ops/s  "
+          f"peak RSS {results['peak_rss_mb']} MB  {results['bytes_per_op']} B/op retained")
+    for name, summary in results['operations'].items():
+        print(f"  {name:9} {summary['count']:>8}  rejected {summary['rejected']:>6}  "
+              f"p50 {summary['p50_us']:8.1f} us  p90 {summary['p90_us']:8.1f} us  p99 {summary['p99_us']:8.1f} us")
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"saved {args.out}")
+    if data_dir:
+        import shutil
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+
+def regressions(baseline, current, threshold):
+    """Human-readable lines for every metric more than `threshold` worse."""
+    found = []
+
+    def check(label, old, new, higher_is_better):
+        if not old:
+            return
+        change = (new - old) / old
+        if (-change if higher_is_better else change) > threshold:
+            found.append(f"{label}: {old} -> {new} ({change:+.1%})")
+
+    check("throughput_ops", baseline['throughput_ops'], current['throughput_ops'], True)
+    check("bytes_per_op", baseline['bytes_per_op'], current['bytes_per_op'], False)
+    for name, old in baseline['operations'].items():
+        new = current['operations'].get(name)
+        if new is None:
+            continue
+        for key in ('p50_us', 'p99_us'):
+            check(f"{name} {key}", old[key], new[key], False)
+    return found
+
+
+def compare(args):
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+    if baseline['meta']['params'] != current['meta']['params']:
+        print("warning: the two runs used different parameters")
+    found = regressions(baseline, current, args.threshold)
+    print(f"{baseline['meta'].get('commit')} -> {current['meta'].get('commit')}: "
+          f"throughput {baseline['throughput_ops']:,.0f} -> {current['throughput_ops']:,.0f} ops/s")
+    for line in found:
+        print("REGRESSION " + line)
+    if not found:
+        print(f"no regressions beyond {args.threshold:.0%}")
+    return 1 if found else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run")
+    run_parser.add_argument("--users", type=int, default=1000)
+    run_parser.add_argument("--accounts", type=int, default=10000)
+    run_parser.add_argument("--ops", type=int, default=100000)
+    run_parser.add_argument("--mix", help="name=weight,... over deposit, withdraw, transfer, bill, ticket")
+    run_parser.add_argument("--skew", type=float, default=1.1, help="Zipf exponent of account popularity")
+    run_parser.add_argument("--seed", type=int, default=1)
+    run_parser.add_argument("--data-dir", help="run with a durable ledger under this directory")
+    run_parser.add_argument("--out", help="save the results as JSON")
+
+    compare_parser = commands.add_parser("compare")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--threshold", type=float, default=0.10)
+
+    args = parser.parse_args()
+    if args.command == "run":
+        run(args)
+    else:
+        sys.exit(compare(args))
+
+
+if __name__ == "__main__":
+    main()
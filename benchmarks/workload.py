@@ -0,0 +1,92 @@
+"""Synthetic banks and operation streams for the benchmark suite.
+
+Everything is drawn from one seeded random.Random, so the same arguments
+always produce the same bank and the same stream of operations.
+
+    bank = build_bank(users=1000, accounts=10000, seed=1)
+    ops = operations(10000, 100000, mix=DEFAULT_MIX, skew=1.1, seed=1)
+    for name, method, args in ops:
+        getattr(bank, method)(*args)
+
+Accounts are picked with Zipf-distributed popularity (weight 1/rank**skew),
+so a few accounts see most of the traffic, as in a real bank.
+"""
+
+import itertools
+import random
+
+from bank import Bank
+
+# Operation -> share of the stream
+DEFAULT_MIX = {'deposit': 35, 'withdraw': 25, 'transfer': 25, 'bill': 10, 'ticket': 5}
+ACCOUNT_TYPES = ('savings', 'checking', 'investment')
+# Cheap password hashing, so building a bank with many users is quick
+FAST_KDF = {'n': 2 ** 4, 'r': 1, 'p': 1}
+STATIONS = ("Mumbai", "Pune", "Delhi", "Kolkata", "Chennai", "Bengaluru")
+
+
+def account_number(index):
+    return str(100000000 + index)
+
+
+def build_bank(users, accounts, seed=1, data_dir=None):
+    """A Bank with `users` registered users and `accounts` funded accounts."""
+    rng = random.Random(seed)
+    bank = Bank(data_dir=data_dir, kdf_params=FAST_KDF)
+    for index in range(users):
+        bank.register_user(f"user_{index + 1}", f"user{index + 1}@example.com", "Bench1234")
+    bank.open_accounts({
+        'account_number': [account_number(index) for index in range(accounts)],
+        'account_holder': [f"Holder {chr(65 + index % 26)}" for index in range(accounts)],
+        'account_type': [rng.choice(ACCOUNT_TYPES) for _ in range(accounts)],
+        'initial_balance': [rng.randint(1000000, 100000000) for _ in range(accounts)],
+    })
+    return bank
+
+
+def zipf_picker(count, skew, rng):
+    """A function returning k account indexes drawn with weight 1/rank**skew."""
+    cumulative = list(itertools.accumulate(1 / rank ** skew for rank in range(1, count + 1)))
+    # Popularity rank is shuffled over the account numbers, so the hot
+    # accounts are not simply the first ones opened
+    order = list(range(count))
+    rng.shuffle(order)
+
+    def pick(k):
+        return rng.choices(order, cum_weights=cumulative, k=k)
+    return pick
+
+
+def operations(accounts, count, mix=None, skew=1.1, seed=1):
+    """`count` (name, method, args) tuples in the proportions of `mix`."""
+    rng = random.Random(seed)
+    mix = mix or DEFAULT_MIX
+    names = rng.choices(list(mix), weights=list(mix.values()), k=count)
+    pick = zipf_picker(accounts, skew, rng)
+    first = pick(count)
+    second = pick(count)
+    stream = []
+    for name, a, b in zip(names, first, second):
+        source = account_number(a)
+        if name == 'deposit':
+            stream.append((name, 'post_deposit', (source, rng.randint(100, 500000))))
+        elif name == 'withdraw':
+            stream.append((name, 'post_withdrawal', (source, rng.randint(100, 500000))))
+        elif name == 'transfer':
+            if a == b:
+                b = (b + 1) % accounts
+            stream.append((name, 'transfer', (source, account_number(b), rng.randint(100, 500000))))
+        elif name == 'bill':
+            stream.append((name, 'pay_biller', (rng.choice(('gas', 'electricity', 'cable_tv')),
+                                                 f"CUS{rng.randint(10000, 99999)}", source,
+                                                 rng.randint(10000, 300000))))
+        elif name == 'ticket':
+            if rng.random() < 0.7:
+                start, end = rng.sample(STATIONS, 2)
+                stream.append((name, 'book_ticket', (source, start, end, f"2099-01-{rng.randint(1, 28):02d}",
+                                                     rng.choice("1234"), rng.choice("15"))))
+            else:
+                stream.append((name, 'cancel_ticket', (source,)))
+        else:
+            raise ValueError("Unknown operation in mix: " + str(name))
+    return stream
@@ -0,0 +1,128 @@
+"""Biller registry, and settlement of bill payments in batch files.
+
+Every biller the bank pays is an entry in BILLERS: what the customer's
+reference is (a validation.py field), the transaction type the debit is
+recorded as, and the amounts it accepts. Bank.pay_biller debits the
+customer at once and queues the payment; Bank.settle_bills later writes
+everything queued as one CSV file per biller and marks it settled. Adding
+a biller is a register_biller() call; the payment methods, the API and the
+Bill Payment menu all read the registry.
+
+    register_biller('water', "Water Bill", 'customer_id', 'water_bill_payment')
+"""
+
+import csv
+import os
+import threading
+
+import validation
+
+# name -> terms; `kind` groups billers for the old pay_bill/recharge_mobile calls
+BILLERS = {}
+# Seconds an idempotency key is remembered after its payment
+KEY_RETENTION = 24 * 60 * 60
+
+
+def register_biller(name, label, reference, transaction_type, kind='bill',
+                    min_amount=1, max_amount=None, prompt=None, invalid_reference=None):
+    """Add a biller, or replace one of the same name.
+
+    `reference` is the validation.py field the customer's reference must
+    pass (e.g. 'customer_id' or 'mobile_number'). Amounts are paise.
+    """
+    if reference not in validation.RULES:
+        raise ValueError("Unknown reference field: " + str(reference))
+    BILLERS[name] = {
+        'label': label,
+        'kind': kind,
+        'reference': reference,
+        'prompt': prompt or reference.replace('_', ' '),
+        'transaction_type': transaction_type,
+        'min_amount': min_amount,
+        'max_amount': max_amount,
+        'invalid_reference': invalid_reference or "Invalid " + reference.replace('_', ' '),
+    }
+
+
+for _name, _label in (('gas', "Gas Bill"), ('electricity', "Electricity Bill"),
+                      ('cable_tv', "Cable-TV Bill")):
+    register_biller(_name, _label, 'customer_id', _name + '_bill_payment',
+                    prompt="customer ID", invalid_reference="Invalid Customer ID")
+for _name, _label in (('jio', "Jio Recharge"), ('bsnl', "BSNL Recharge"),
+                      ('idea', "Idea Recharge"), ('airtel', "Airtel Recharge")):
+    register_biller(_name, _label, 'mobile_number', 'recharge', kind='recharge',
+                    invalid_reference="Invalid mobile number")
+
+
+def biller_error(name, reference, amount):
+    """Why a payment to `name` would be refused, or "" if it would not."""
+    terms = BILLERS.get(name)
+    if terms is None:
+        return "Invalid biller"
+    if not isinstance(reference, str) or validation.first_error(terms['reference'], reference):
+        return terms['invalid_reference']
+    if amount < terms['min_amount']:
+        return "Amount must be at least " + _rupees(terms['min_amount'])
+    if terms['max_amount'] is not None and amount > terms['max_amount']:
+        return "Amount must be at most " + _rupees(terms['max_amount'])
+    return ""
+
+
+def _rupees(paise):
+    from money import format_money
+    return format_money(paise)
+
+
+SETTLEMENT_COLUMNS = ('payment_id', 'reference', 'amount', 'transaction_account', 'timestamp_us')
+
+
+def write_batches(out_dir, batch_id, payments):
+    """Write `payments` as one CSV file per biller; returns {biller: summary}.
+
+    Files are fsynced before returning. A crash after writing them but
+    before the batch is marked settled writes the same batch number again
+    on the next run, with the same payments and any newer ones; every row
+    carries its payment id so a biller can tell.
+    """
+    by_biller = {}
+    for payment in payments:
+        by_biller.setdefault(payment['biller'], []).append(payment)
+    os.makedirs(out_dir, exist_ok=True)
+    summary = {}
+    for name, rows in sorted(by_biller.items()):
+        path = os.path.join(out_dir, f"{name}-{batch_id:08d}.csv")
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(SETTLEMENT_COLUMNS)
+            writer.writerows([(payment['id'], payment['reference'], payment['amount'],
+                               payment['account'], payment['ts']) for payment in rows])
+            f.flush()
+            os.fsync(f.fileno())
+        summary[name] = {'file': path, 'payments': len(rows),
+                         'amount': sum(payment['amount'] for payment in rows)}
+    return summary
+
+
+class Settler:
+    """Settle a bank's queued bill payments every `interval` seconds on a daemon thread."""
+
+    def __init__(self, bank, out_dir, interval=60.0):
+        self.bank = bank
+        self.out_dir = out_dir
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop, settling whatever is still queued first."""
+        self._stop.set()
+        self._thread.join()
+        self.bank.settle_bills(self.out_dir)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.bank.settle_bills(self.out_dir)
@@ -0,0 +1,53 @@
+"""Striped per-account locks for running Bank behind a thread pool."""
+
+import threading
+
+
+class _Held:
+    __slots__ = ('stripes', 'indexes')
+
+    def __init__(self, stripes, indexes):
+        self.stripes = stripes
+        self.indexes = indexes
+
+    def __enter__(self):
+        self.stripes._acquire(self.indexes)
+        return self
+
+    def __exit__(self, *exc_info):
+        locks = self.stripes.locks
+        for index in reversed(self.indexes):
+            locks[index].release()
+        return False
+
+
+class StripedLocks:
+    """A fixed pool of locks; every key (an account number, a username) maps
+    to one stripe.
+
+    Operations lock every key they read or write through hold(*keys), which
+    takes the stripes in ascending index order, so two transfers in opposite
+    directions can never deadlock. Operations on keys in different stripes
+    run in parallel; only keys that share a stripe serialize.
+    """
+
+    def __init__(self, stripes=256):
+        self.locks = [threading.Lock() for _ in range(stripes)]
+
+    def stripe(self, key):
+        return hash(key) % len(self.locks)
+
+    def hold(self, *keys):
+        count = len(self.locks)
+        if len(keys) == 1:
+            return _Held(self, (hash(keys[0]) % count,))
+        return _Held(self, sorted({hash(key) % count for key in keys}))
+
+    def hold_all(self):
+        """Quiesce every writer, e.g. to take a consistent snapshot."""
+        return _Held(self, range(len(self.locks)))
+
+    def _acquire(self, indexes):
+        locks = self.locks
+        for index in indexes:
+            locks[index].acquire()
@@ -0,0 +1,106 @@
+"""Salted password/MPIN hashing and the session cache used after login."""
+
+import hashlib
+import hmac
+import os
+import secrets
+import threading
+import time
+from collections import OrderedDict
+
+# scrypt cost: n is the CPU/memory cost (a power of two), r the block size,
+# p the parallelism. Memory used is about 128 * n * r bytes (16 MiB here),
+# and one hash takes tens of milliseconds.
+DEFAULT_KDF_PARAMS = {'n': 2 ** 14, 'r': 8, 'p': 1}
+SALT_BYTES = 16
+HASH_BYTES = 32
+
+
+def _scrypt(secret, salt, n, r, p):
+    return hashlib.scrypt(secret.encode(), salt=salt, n=n, r=r, p=p,
+                          maxmem=2 * 128 * n * r + 1024 * 1024, dklen=HASH_BYTES)
+
+
+def hash_secret(secret, params=None):
+    """Hash a password or MPIN; the result stores its salt and parameters."""
+    params = params or DEFAULT_KDF_PARAMS
+    salt = os.urandom(SALT_BYTES)
+    return {
+        'kdf': 'scrypt',
+        'n': params['n'],
+        'r': params['r'],
+        'p': params['p'],
+        'salt': salt.hex(),
+        'hash': _scrypt(secret, salt, params['n'], params['r'], params['p']).hex()
+    }
+
+
+def verify_secret(secret, stored):
+    """Check a secret against a stored hash, in constant time."""
+    if stored is None:
+        return False
+    expected = bytes.fromhex(stored['hash'])
+    actual = _scrypt(secret, bytes.fromhex(stored['salt']), stored['n'], stored['r'], stored['p'])
+    return hmac.compare_digest(actual, expected)
+
+
+def needs_rehash(stored, params=None):
+    """True when a stored hash was made with other parameters than `params`."""
+    params = params or DEFAULT_KDF_PARAMS
+    return any(stored[key] != params[key] for key in ('n', 'r', 'p'))
+
+
+class SessionCache:
+    """Tokens for logged-in users, so follow-up operations skip the KDF.
+
+    A token is valid for `ttl` seconds from login. At most `max_sessions`
+    are kept; beyond that the oldest are evicted first, as are expired ones.
+    """
+
+    def __init__(self, ttl=900, max_sessions=10000):
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        # token -> (username, expiry); in expiry order, as every token gets the same ttl
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def create(self, username):
+        token = secrets.token_urlsafe(24)
+        now = time.monotonic()
+        with self._lock:
+            self._evict(now)
+            while len(self._sessions) >= self.max_sessions:
+                self._sessions.popitem(last=False)
+            self._sessions[token] = (username, now + self.ttl)
+        return token
+
+    def user(self, token):
+        """The username a token belongs to, or None if it is unknown or expired."""
+        session = self._sessions.get(token)
+        if session is None:
+            return None
+        if session[1] <= time.monotonic():
+            with self._lock:
+                self._sessions.pop(token, None)
+            return None
+        return session[0]
+
+    def revoke(self, token):
+        with self._lock:
+            self._sessions.pop(token, None)
+
+    def revoke_user(self, username):
+        with self._lock:
+            for token in [token for token, (owner, _) in self._sessions.items() if owner == username]:
+                del self._sessions[token]
+
+    def _evict(self, now):
+        sessions = self._sessions
+        while sessions:
+            token, (_, expiry) = next(iter(sessions.items()))
+            if expiry > now:
+                break
+            del sessions[token]
@@ -0,0 +1,127 @@
+"""Train fares from a rule table, resolved once and cached.
+
+A rule table (DEFAULT_RULES, or a JSON file of the same shape) gives:
+
+    paise_per_km         base fare per kilometre
+    default_distance_km  distance of a route not listed under "routes"
+    routes               {"PUNE-DELHI": 1450, ...}; either direction
+    class_percent        {travel class: percent of the base fare}
+    quota_surcharge      {quota: paise added on top}
+    surge                [{"from": "2026-12-20", "to": "2027-01-05",
+                           "percent": 120, "classes": ["2", "3"]}, ...]
+
+    fare = round(distance * paise_per_km * class_percent / 100)
+           * surge percent / 100 (rounded; the highest matching window)
+           + quota_surcharge
+
+Loading a table resolves every listed route, class and quota into a dict,
+so a quote is a dict lookup plus the date's surge. Quotes are also kept in
+an LRU cache keyed by (route, class, quota, date), whose hit rate stats()
+reports. reload() swaps in a new table and clears the cache. Dates are
+compared as zero-padded ISO strings: surge windows are padded on load, and
+Bank.fare_quote and book_ticket pass travel dates through trains.travel_day.
+"""
+
+import functools
+import threading
+
+# The fares the bank charged before rule files: 500/1500/1000/800 rupees
+# by class, plus 500 for Tatkal, on every route
+DEFAULT_RULES = {
+    'paise_per_km': 100,
+    'default_distance_km': 500,
+    'routes': {},
+    'class_percent': {'1': 100, '2': 300, '3': 200, '4': 160},
+    'quota_surcharge': {'5': 50000},
+    'surge': [],
+}
+
+
+def _scaled(amount, percent):
+    # Integer half-up rounding, so fares never depend on float formatting
+    return (amount * percent + 50) // 100
+
+
+def _day(text):
+    # Windows are compared as ISO strings, so "2027-1-2" is read as "2027-01-02"
+    from datetime import datetime
+    return datetime.strptime(text, '%Y-%m-%d').date().isoformat()
+
+
+class FareTable:
+    """One loaded rule table with every listed route's fares resolved."""
+
+    def __init__(self, rules):
+        self.paise_per_km = int(rules['paise_per_km'])
+        self.default_distance = int(rules['default_distance_km'])
+        self.class_percent = {str(travel_class): int(percent)
+                              for travel_class, percent in rules['class_percent'].items()}
+        self.quota_surcharge = {str(quota): int(paise) for quota, paise in rules.get('quota_surcharge', {}).items()}
+        self.surge = sorted((_day(window['from']), _day(window['to']), int(window['percent']),
+                             frozenset(window.get('classes') or self.class_percent))
+                            for window in rules.get('surge', ()))
+        self.distances = {}
+        for route, distance in rules.get('routes', {}).items():
+            start, _, end = route.upper().partition("-")
+            self.distances[route.upper()] = self.distances[end + "-" + start] = int(distance)
+        # (route, class) -> base fare, for every listed route
+        self.base_fares = {(route, travel_class): self._base(distance, percent)
+                           for route, distance in self.distances.items()
+                           for travel_class, percent in self.class_percent.items()}
+
+    def _base(self, distance, percent):
+        return _scaled(distance * self.paise_per_km, percent)
+
+    def fare(self, route, travel_class, quota, travel_date):
+        """Resolve one fare; raises KeyError for an unknown class."""
+        base = self.base_fares.get((route, travel_class))
+        if base is None:
+            base = self._base(self.distances.get(route, self.default_distance), self.class_percent[travel_class])
+        percent = 100
+        for start, end, surge_percent, classes in self.surge:
+            if start > travel_date:
+                break
+            if travel_date <= end and travel_class in classes and surge_percent > percent:
+                percent = surge_percent
+        if percent != 100:
+            base = _scaled(base, percent)
+        return base + self.quota_surcharge.get(quota, 0)
+
+
+def load_rules(path):
+    import json
+    with open(path) as f:
+        return json.load(f)
+
+
+class FareEngine:
+    """Quotes fares from the current FareTable through an LRU cache."""
+
+    def __init__(self, rules_path=None, cache_size=65536):
+        self.rules_path = rules_path
+        self.cache_size = cache_size
+        self._lock = threading.Lock()
+        self.reload()
+
+    def reload(self, rules_path=None):
+        """Load the rules again (from `rules_path` if given) and drop every cached quote."""
+        with self._lock:
+            if rules_path is not None:
+                self.rules_path = rules_path
+            rules = load_rules(self.rules_path) if self.rules_path else DEFAULT_RULES
+            table = FareTable(rules)
+            self.table = table
+            # A fresh cache bound to the new table, so no quote made from
+            # the old rules can be returned after this
+            self.quote = functools.lru_cache(self.cache_size)(table.fare)
+
+    def stats(self):
+        info = self.quote.cache_info()
+        lookups = info.hits + info.misses
+        return {
+            'hits': info.hits,
+            'misses': info.misses,
+            'hit_rate': info.hits / lookups if lookups else 0.0,
+            'cached': info.currsize,
+            'routes': len(self.table.distances),
+        }
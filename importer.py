@@ -0,0 +1,159 @@
+"""Streaming bulk import of accounts from CSV or JSON Lines files.
+
+    python importer.py accounts.csv [--rejects rejects.csv] [--data-dir bank_data]
+
+A CSV file has a header row naming the columns account_number,
+account_holder, account_type and initial_balance; a JSONL file has one
+object per line with those keys. Balances are rupees, as typed at the
+prompt ('2500' or '2500.75'); a JSON integer is taken as rupees too.
+
+The file is read chunk_size records at a time and each chunk goes through
+Bank.open_accounts, which validates whole columns at once, rejects
+account numbers already in the bank or repeated in the chunk, and opens
+the rest in one ledger record. Because every chunk is in the bank before
+the next one is read, a number repeated anywhere later in the file is
+caught as already existing, so only one chunk is held in memory at a time.
+Rejected rows are written to the reject file with the line number and
+every problem found. A CSV header without one of the columns is a
+ValueError naming the missing ones.
+"""
+
+import argparse
+import csv
+import gc
+import itertools
+import json
+import os
+
+from money import PAISE_PER_RUPEE, parse_money
+
+COLUMNS = ('account_number', 'account_holder', 'account_type', 'initial_balance')
+
+
+def _paise(text):
+    try:
+        return parse_money(text)
+    except ValueError:
+        return None
+
+
+def _balances(texts):
+    joined = "".join(texts)
+    if joined.isdigit() and joined.isascii() and all(texts):
+        # Whole rupees throughout, the usual case
+        return [rupees * PAISE_PER_RUPEE for rupees in map(int, texts)]
+    return [_paise(text) for text in texts]
+
+
+def _csv_rows(f):
+    reader = csv.reader(f)
+    header = next(reader, None)
+    if header is None:
+        return iter(())
+    if tuple(header) == COLUMNS:
+        return reader
+    missing = [column for column in COLUMNS if column not in header]
+    if missing:
+        raise ValueError("CSV header is missing column(s): " + ", ".join(missing))
+    positions = [header.index(column) for column in COLUMNS]
+    return ([row[position] if position < len(row) else "" for position in positions] for row in reader)
+
+
+def _fix_widths(chunk):
+    """Pad or cut malformed rows, so the chunk transposes into whole columns."""
+    width = len(COLUMNS)
+    if set(map(len, chunk)) != {width}:
+        for index, row in enumerate(chunk):
+            if len(row) != width:
+                chunk[index] = (row + [""] * width)[:width]
+
+
+def _jsonl_rows(f):
+    for line in f:
+        if not line.strip():
+            yield ["", "", "", ""]
+            continue
+        try:
+            record = json.loads(line)
+            yield [str(record.get(column, "")) for column in COLUMNS]
+        except (ValueError, AttributeError):
+            yield ["", "", "", ""]
+
+
+def import_accounts(bank, path, reject_path=None, chunk_size=100000):
+    """Import every account in `path` into `bank`; returns counts and the reject path."""
+    jsonl = path.endswith((".jsonl", ".ndjson", ".json"))
+    if reject_path is None:
+        root, extension = os.path.splitext(path)
+        reject_path = root + ".rejects" + extension
+    line_offset = 1 if jsonl else 2
+
+    # Millions of new rows and accounts would set off the cyclic garbage
+    # collector over and over, rescanning every account already imported.
+    # Nothing made here forms a cycle, so pause it for the import.
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        return _import(bank, path, jsonl, reject_path, chunk_size, line_offset)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+
+def _import(bank, path, jsonl, reject_path, chunk_size, line_offset):
+    imported = rejected = 0
+    with open(path, newline="", encoding="utf-8") as source, \
+            open(reject_path, "w", newline="", encoding="utf-8") as rejects:
+        rows = _jsonl_rows(source) if jsonl else _csv_rows(source)
+        writer = None if jsonl else csv.writer(rejects)
+        if writer is not None:
+            writer.writerow(('line',) + COLUMNS + ('errors',))
+        start = 0
+        while True:
+            chunk = list(itertools.islice(rows, chunk_size))
+            if not chunk:
+                break
+            _fix_widths(chunk)
+            numbers, holders, types, balance_texts = zip(*chunk)
+            result = bank.open_accounts({
+                'account_number': numbers,
+                'account_holder': holders,
+                'account_type': types,
+                'initial_balance': _balances(balance_texts),
+            })
+            imported += result['opened']
+            rejected += len(result['rejected'])
+            for index, _, messages in result['rejected']:
+                line = start + index + line_offset
+                if writer is not None:
+                    writer.writerow([line] + chunk[index] + ["; ".join(messages)])
+                else:
+                    record = dict(zip(COLUMNS, chunk[index]), line=line, errors=messages)
+                    rejects.write(json.dumps(record) + "\n")
+            start += len(chunk)
+
+    return {'imported': imported, 'rejected': rejected, 'reject_path': reject_path}
+
+
+def main():
+    from bank import Bank
+    parser = argparse.ArgumentParser(description="Bulk-import accounts from a CSV or JSONL file")
+    parser.add_argument("path")
+    parser.add_argument("--rejects", help="where to write rejected rows (default: <file>.rejects.<ext>)")
+    parser.add_argument("--data-dir", default=os.environ.get("BANK_DATA_DIR", "bank_data"))
+    parser.add_argument("--chunk-size", type=int, default=100000)
+    args = parser.parse_args()
+
+    bank = Bank(data_dir=args.data_dir)
+    try:
+        result = import_accounts(bank, args.path, args.rejects, args.chunk_size)
+    except ValueError as e:
+        parser.exit(1, f"Cannot import {args.path}: {e}\n")
+    finally:
+        bank.close()
+    print(f"Imported {result['imported']} accounts, rejected {result['rejected']} "
+          f"(see {result['reject_path']})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,337 @@
+"""Write-ahead ledger and snapshots that make Bank state survive a restart."""
+
+import json
+import os
+import struct
+import threading
+import zlib
+
+# Every record is framed as <payload length><crc32 of payload><payload>.
+HEADER = struct.Struct("<II")
+
+SYNC_MODES = ("group", "async")
+SNAPSHOT_FILES = {"binary": "snapshot.bin", "json": "snapshot.json"}
+
+
+class LedgerError(Exception):
+    pass
+
+
+def _fsync_dir(path):
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+class WriteAheadLog:
+    """Append-only, checksummed log with group commit.
+
+    append() only buffers a record and hands back its LSN. commit(lsn)
+    blocks until that LSN is on disk. The first thread that needs a flush
+    becomes the leader and writes + fsyncs everything buffered so far, so
+    every thread waiting behind it shares the same fsync.
+
+    If a write or fsync fails, what reached the file is unknown, so the
+    log is failed for good: the error is raised to every thread waiting
+    for a commit and to every later append or commit.
+    """
+
+    def __init__(self, path, sync_mode="group", flush_interval=0.005):
+        if sync_mode not in SYNC_MODES:
+            raise LedgerError("Unknown sync mode: " + str(sync_mode))
+        self.path = path
+        self.sync_mode = sync_mode
+        self.flush_interval = flush_interval
+        self.next_lsn = 1
+        self.durable_lsn = 0
+        self.fsync_count = 0
+        self._buffer = []
+        self._buffered_lsn = 0
+        self._flushing = False
+        self._cond = threading.Condition()
+        self._file = open(path, "ab")
+        self._closed = False
+        self._failed = None
+        self._flusher = None
+        if sync_mode == "async":
+            self._flusher = threading.Thread(target=self._flush_loop, daemon=True)
+            self._flusher.start()
+
+    def records(self):
+        """Yield every intact record; a torn or corrupt tail is cut off."""
+        good_offset = 0
+        with open(self.path, "rb") as f:
+            data = f.read()
+        offset = 0
+        while offset + HEADER.size <= len(data):
+            length, crc = HEADER.unpack_from(data, offset)
+            start = offset + HEADER.size
+            payload = data[start:start + length]
+            if len(payload) != length or zlib.crc32(payload) != crc:
+                break
+            record = json.loads(payload)
+            offset = start + length
+            good_offset = offset
+            self.next_lsn = max(self.next_lsn, record["lsn"] + 1)
+            yield record
+        if good_offset != len(data):
+            self._file.truncate(good_offset)
+        self.durable_lsn = self._buffered_lsn = self.next_lsn - 1
+
+    def append(self, record):
+        with self._cond:
+            if self._closed:
+                raise LedgerError("Ledger is closed")
+            if self._failed is not None:
+                raise self._failed
+            lsn = self.next_lsn
+            self.next_lsn += 1
+            record["lsn"] = lsn
+            payload = json.dumps(record, separators=(",", ":")).encode()
+            self._buffer.append(HEADER.pack(len(payload), zlib.crc32(payload)))
+            self._buffer.append(payload)
+            self._buffered_lsn = lsn
+            return lsn
+
+    def commit(self, lsn):
+        """Wait until every record up to `lsn` has been fsynced."""
+        if self.sync_mode == "async":
+            return
+        with self._cond:
+            while self.durable_lsn < lsn:
+                if self._failed is not None:
+                    raise self._failed
+                if self._flushing:
+                    self._cond.wait()
+                    continue
+                self._flush_locked()
+
+    def flush(self):
+        with self._cond:
+            while self._flushing:
+                self._cond.wait()
+            if self._failed is not None:
+                raise self._failed
+            if self._buffer:
+                self._flush_locked()
+
+    def _flush_locked(self):
+        # Called with the condition held; the write itself runs unlocked so
+        # other threads can keep appending into the next group.
+        chunks, self._buffer = self._buffer, []
+        target = self._buffered_lsn
+        self._flushing = True
+        self._cond.release()
+        error = None
+        try:
+            self._file.write(b"".join(chunks))
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self.fsync_count += 1
+        except OSError as e:
+            error = e
+        finally:
+            self._cond.acquire()
+            self._flushing = False
+            if error is None:
+                self.durable_lsn = max(self.durable_lsn, target)
+            elif self._failed is None:
+                self._failed = LedgerError("Ledger write failed: " + str(error))
+            self._cond.notify_all()
+        if self._failed is not None:
+            raise self._failed
+
+    def _flush_loop(self):
+        while True:
+            with self._cond:
+                self._cond.wait(self.flush_interval)
+                if self._closed:
+                    return
+                if self._buffer and not self._flushing and self._failed is None:
+                    try:
+                        self._flush_locked()
+                    except LedgerError:
+                        # Raised to the next append or commit instead
+                        return
+
+    def reset(self, upto_lsn):
+        """Drop records up to `upto_lsn`; they are covered by a snapshot."""
+        with self._cond:
+            while self._flushing:
+                self._cond.wait()
+            if self._failed is not None:
+                raise self._failed
+            if self._buffer:
+                self._flush_locked()
+            self._file.close()
+            with open(self.path, "rb") as f:
+                data = f.read()
+            keep = []
+            offset = 0
+            while offset + HEADER.size <= len(data):
+                length, _ = HEADER.unpack_from(data, offset)
+                end = offset + HEADER.size + length
+                if json.loads(data[offset + HEADER.size:end])["lsn"] > upto_lsn:
+                    keep.append(data[offset:end])
+                offset = end
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(b"".join(keep))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+            _fsync_dir(os.path.dirname(os.path.abspath(self.path)))
+            self._file = open(self.path, "ab")
+
+    def close(self):
+        try:
+            self.flush()
+        finally:
+            with self._cond:
+                self._closed = True
+                self._cond.notify_all()
+            if self._flusher is not None:
+                self._flusher.join()
+            self._file.close()
+
+
+def write_snapshot(path, state, lsn):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({"lsn": lsn, "state": state}, f, separators=(",", ":"))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    _fsync_dir(os.path.dirname(os.path.abspath(path)))
+
+
+def read_snapshot(path):
+    if not os.path.exists(path):
+        return None, 0
+    with open(path) as f:
+        data = json.load(f)
+    return data["state"], data["lsn"]
+
+
+class Journal:
+    """Ties a Bank to its on-disk log and snapshot inside `directory`.
+
+    Mutations are logged before they are applied. Every `snapshot_every`
+    records the whole state is snapshotted and the log is reset, so
+    recovery only has to replay the tail written since the last snapshot.
+
+    snapshot_format is "binary" (snapshot.bin, see snapshot.py), which
+    recovery serves from in place, or "json" (snapshot.json). Recovery
+    reads whichever is there, so a directory can switch formats.
+    """
+
+    def __init__(self, directory, sync_mode="group", snapshot_every=10000, snapshot_format="binary"):
+        if snapshot_format not in SNAPSHOT_FILES:
+            raise LedgerError("Unknown snapshot format: " + str(snapshot_format))
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.snapshot_format = snapshot_format
+        self.snapshot_path = os.path.join(directory, SNAPSHOT_FILES[snapshot_format])
+        self.wal = WriteAheadLog(os.path.join(directory, "wal.log"), sync_mode)
+        self.snapshot_every = snapshot_every
+        self.snapshot_lsn = 0
+        self.since_snapshot = 0
+        self._local = threading.local()
+        self._snapshot_lock = threading.Lock()
+
+    def recover(self, bank):
+        """Load the latest snapshot into `bank` and replay the log tail."""
+        paths = [os.path.join(self.directory, name) for name in SNAPSHOT_FILES.values()]
+        paths = [path for path in paths if os.path.exists(path)]
+        # Both only after a crash before snapshot() removed the older one
+        path = max(paths, key=os.path.getmtime, default=None)
+        self.snapshot_lsn = 0
+        if path is not None and path.endswith(".bin"):
+            self.snapshot_lsn = bank._open_snapshot(path)
+        elif path is not None:
+            state, self.snapshot_lsn = read_snapshot(path)
+            bank._load_state(state)
+        replayed = 0
+        for record in self.wal.records():
+            # Records at or below the snapshot LSN survived a crash between
+            # writing the snapshot and resetting the log; they are already
+            # part of the snapshot.
+            if record["lsn"] <= self.snapshot_lsn:
+                continue
+            bank._replay(record)
+            replayed += 1
+        self.wal.next_lsn = max(self.wal.next_lsn, self.snapshot_lsn + 1)
+        self.since_snapshot = replayed
+        return replayed
+
+    def log(self, op, fields):
+        """Append a record without waiting for it; settle() makes it durable.
+
+        Callers apply the change and release their locks before settling, so
+        other operations are not held up behind the fsync. That is safe
+        because the log becomes durable strictly in LSN order.
+        """
+        fields["op"] = op
+        wal = self.wal
+        # Callers hold different stripe locks, so count under the lock
+        # that already orders appends
+        with wal._cond:
+            lsn = wal.append(fields)
+            self.since_snapshot += 1
+        self._local.pending_lsn = lsn
+        return lsn
+
+    def settle(self):
+        """Wait until this thread's logged records are durable (deferred in a batch)."""
+        local = self._local
+        if getattr(local, "batch_depth", 0):
+            return
+        lsn = getattr(local, "pending_lsn", 0)
+        if lsn:
+            local.pending_lsn = 0
+            self.wal.commit(lsn)
+
+    def begin_batch(self):
+        self._local.batch_depth = getattr(self._local, "batch_depth", 0) + 1
+
+    def end_batch(self):
+        self._local.batch_depth -= 1
+        self.settle()
+
+    def should_snapshot(self):
+        return (self.snapshot_every and self.since_snapshot >= self.snapshot_every
+                and not getattr(self._local, "batch_depth", 0))
+
+    def snapshot(self, bank):
+        # The caller quiesces writers first, so every appended record has
+        # also been applied. Only one thread snapshots at a time.
+        if not self._snapshot_lock.acquire(blocking=False):
+            return
+        try:
+            self.wal.flush()
+            lsn = self.wal.next_lsn - 1
+            if self.snapshot_format == "binary":
+                import snapshot
+                snapshot.write(self.snapshot_path, bank, lsn)
+            else:
+                write_snapshot(self.snapshot_path, bank._dump_state(), lsn)
+            for name in SNAPSHOT_FILES.values():
+                path = os.path.join(self.directory, name)
+                if path != self.snapshot_path and os.path.exists(path):
+                    os.remove(path)
+            self.snapshot_lsn = lsn
+            self.wal.reset(lsn)
+            with self.wal._cond:
+                self.since_snapshot = 0
+        finally:
+            self._snapshot_lock.release()
+
+    def close(self):
+        self.wal.close()
@@ -0,0 +1,234 @@
+"""Per-operation counters, latency histograms, error counts and lock waits.
+
+    recorder = metrics.instrument(bank)      # start measuring
+    recorder.snapshot()                      # JSON-able dict
+    recorder.prometheus()                    # Prometheus text format
+    metrics.uninstrument(bank)               # stop; back to zero overhead
+
+instrument() wraps each method named in OPERATIONS with an instance
+attribute that times the call, so an uninstrumented Bank runs exactly the
+code it always did. Latencies go into log-linear histograms in the style
+of HdrHistogram: SUB_BUCKETS buckets per power of two nanoseconds, which
+keeps every bucket within 1/SUB_BUCKETS of its value and makes recording
+a bit_length, a shift and one list increment. Only bucket counts are
+kept, so sums, means and maxima are estimated from the buckets. Every
+call is timed, whether it returns or raises. Errors are counted by
+operation and BankError message, or by exception type for any other
+exception.
+
+Lock waits are measured by timing only the acquisitions that find their
+stripe busy; an uncontended acquisition is one extra non-blocking try.
+
+Counts are plain integer increments without a lock of their own, so under
+heavy thread contention an occasional increment can be lost; the numbers
+are for watching, not for accounting.
+"""
+
+import time
+
+SUB_BITS = 3  # Metrics.wrap inlines this value
+SUB_BUCKETS = 1 << SUB_BITS
+# Enough buckets for any 64-bit nanosecond count, so recording needs no bounds check
+BUCKETS = 64 * SUB_BUCKETS
+
+# The API methods and the interactive methods built on them
+OPERATIONS = (
+    'post_deposit', 'post_withdrawal', 'post_transaction', 'transfer', 'post_batch',
+    'deposit', 'withdraw', 'transfer_funds',
+    'record_transaction', 'get_transactions', 'transaction_page', 'view_transaction_history',
+    'pay_biller', 'pay_bills', 'pay_bill', 'recharge_mobile', 'settle_bills',
+    'pay_utility_bill', 'recharge',
+    'book_ticket', 'cancel_ticket', 'get_ticket', 'get_tickets', 'fare_quote',
+    'book_train_ticket', 'cancel_train_ticket', 'view_train_ticket_details',
+)
+
+
+def bucket_index(value):
+    # Values below 2 * SUB_BUCKETS get shift 0 and a bucket of their own
+    shift = (value | (2 * SUB_BUCKETS - 1)).bit_length() - SUB_BITS - 1
+    return (shift << SUB_BITS) + (value >> shift)
+
+
+def bucket_upper(index):
+    """The smallest value above every value counted in bucket `index`."""
+    if index < 2 * SUB_BUCKETS:
+        return index + 1
+    shift = index // SUB_BUCKETS - 1
+    return ((index - shift * SUB_BUCKETS) + 1) << shift
+
+
+def bucket_lower(index):
+    return bucket_upper(index - 1) if index else 0
+
+
+class Histogram:
+    __slots__ = ('counts',)
+
+    def __init__(self):
+        self.counts = [0] * BUCKETS
+
+    def record(self, value):
+        self.counts[bucket_index(value)] += 1
+
+    def count(self):
+        return sum(self.counts)
+
+    def total(self):
+        """Sum of the recorded values, taking each at its bucket's midpoint."""
+        return sum((bucket_lower(index) + bucket_upper(index)) * count // 2
+                   for index, count in enumerate(self.counts) if count)
+
+    def percentile(self, fraction):
+        """Upper bound of the bucket holding the `fraction` quantile."""
+        target = fraction * self.count()
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if count and seen >= target:
+                return bucket_upper(index)
+        return 0
+
+    def summary(self):
+        count = self.count()
+        total = self.total()
+        return {
+            'count': count,
+            'sum_ns': total,
+            'mean_ns': total // count if count else 0,
+            'p50_ns': self.percentile(0.50),
+            'p90_ns': self.percentile(0.90),
+            'p99_ns': self.percentile(0.99),
+            'max_ns': self.percentile(1.0),
+        }
+
+
+class Metrics:
+    def __init__(self):
+        self.latency = {}
+        self.errors = {}
+        self.lock_wait = Histogram()
+        self.contended = 0
+
+    def wrap(self, name, method):
+        from bank import BankError
+        histogram = self.latency.setdefault(name, Histogram())
+        counts = histogram.counts
+        errors = self.errors.setdefault(name, {})
+        clock = time.perf_counter_ns
+
+        def timed(*args, **kwargs):
+            start = clock()
+            try:
+                return method(*args, **kwargs)
+            except Exception as e:
+                # A BankError's message says why; anything else is a bug, counted by type
+                message = str(e) if isinstance(e, BankError) else type(e).__name__
+                errors[message] = errors.get(message, 0) + 1
+                raise
+            finally:
+                # bucket_index, inlined (with SUB_BITS = 3) to keep the cost per call down
+                elapsed = clock() - start
+                shift = (elapsed | 15).bit_length() - 4
+                counts[(shift << 3) + (elapsed >> shift)] += 1
+
+        timed.__wrapped__ = method
+        return timed
+
+    def timed_acquire(self, stripes):
+        """A StripedLocks._acquire that records how long busy stripes were waited for."""
+        locks = stripes.locks
+        plain = type(stripes)._acquire.__get__(stripes)
+        clock = time.perf_counter_ns
+        record = self.lock_wait.record
+
+        def acquire(indexes):
+            taken = 0
+            for index in indexes:
+                if not locks[index].acquire(False):
+                    break
+                taken += 1
+            else:
+                return
+            for index in reversed(indexes[:taken]):
+                locks[index].release()
+            self.contended += 1
+            start = clock()
+            plain(indexes)
+            record(clock() - start)
+
+        return acquire
+
+    def snapshot(self):
+        return {
+            'operations': {name: dict(histogram.summary(), errors=sum(self.errors[name].values()))
+                           for name, histogram in self.latency.items() if any(histogram.counts)},
+            'errors': {name: dict(messages) for name, messages in self.errors.items() if messages},
+            'lock_wait': dict(self.lock_wait.summary(), contended=self.contended),
+        }
+
+    def prometheus(self):
+        lines = [
+            "# HELP bank_operation_seconds Latency of Bank operations.",
+            "# TYPE bank_operation_seconds histogram",
+        ]
+        for name, histogram in self.latency.items():
+            if any(histogram.counts):
+                lines.extend(_histogram_lines("bank_operation_seconds", f'operation="{name}"', histogram))
+        lines += [
+            "# HELP bank_operation_errors_total Failed Bank operations by BankError message or exception type.",
+            "# TYPE bank_operation_errors_total counter",
+        ]
+        for name, messages in self.errors.items():
+            for message, count in messages.items():
+                lines.append(f'bank_operation_errors_total{{operation="{name}",message="{_escape(message)}"}} '
+                             f'{count}')
+        lines += [
+            "# HELP bank_lock_wait_seconds Time spent waiting for busy account lock stripes.",
+            "# TYPE bank_lock_wait_seconds histogram",
+        ]
+        lines.extend(_histogram_lines("bank_lock_wait_seconds", "", self.lock_wait))
+        return "\n".join(lines) + "\n"
+
+
+def _escape(text):
+    return text.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _histogram_lines(metric, labels, histogram):
+    separator = "," if labels else ""
+    lines = []
+    cumulative = 0
+    for index, count in enumerate(histogram.counts):
+        if count:
+            cumulative += count
+            lines.append(f'{metric}_bucket{{{labels}{separator}le="{bucket_upper(index) / 1e9:.9g}"}} {cumulative}')
+    lines.append(f'{metric}_bucket{{{labels}{separator}le="+Inf"}} {cumulative}')
+    suffix = f"{{{labels}}}" if labels else ""
+    lines.append(f"{metric}_sum{suffix} {histogram.total() / 1e9:.9g}")
+    lines.append(f"{metric}_count{suffix} {cumulative}")
+    return lines
+
+
+def instrument(bank, operations=OPERATIONS):
+    """Start timing `bank`'s operations and lock waits; returns the Metrics."""
+    if getattr(bank, 'metrics', None) is not None:
+        return bank.metrics
+    recorder = Metrics()
+    for name in operations:
+        method = getattr(bank, name, None)
+        if method is not None:
+            setattr(bank, name, recorder.wrap(name, method))
+    bank.locks._acquire = recorder.timed_acquire(bank.locks)
+    bank.metrics = recorder
+    return recorder
+
+
+def uninstrument(bank):
+    """Remove the wrappers; the Bank's methods are its own again."""
+    recorder = getattr(bank, 'metrics', None)
+    if recorder is None:
+        return
+    for name in recorder.latency:
+        bank.__dict__.pop(name, None)
+    bank.locks.__dict__.pop('_acquire', None)
+    bank.metrics = None
@@ -0,0 +1,36 @@
+"""Money as integer paise: exact parsing and formatting at the edges."""
+
+PAISE_PER_RUPEE = 100
+
+
+def parse_money(text):
+    """Parse a rupee amount such as '1250', '12.5' or '-0.75' into paise.
+
+    Parsing is exact string arithmetic, so no float rounding is involved;
+    more than two decimal places is an error rather than silently rounded.
+    """
+    text = str(text).strip().replace(",", "")
+    negative = text.startswith("-")
+    if negative or text.startswith("+"):
+        text = text[1:]
+    rupees, dot, paise = text.partition(".")
+    if not rupees and not paise:
+        raise ValueError("Invalid amount")
+    if (rupees and not rupees.isdigit()) or (dot and paise and not paise.isdigit()):
+        raise ValueError("Invalid amount")
+    if len(paise) > 2:
+        raise ValueError("Amount can have at most 2 decimal places")
+    value = int(rupees or "0") * PAISE_PER_RUPEE + int(paise.ljust(2, "0") or "0")
+    return -value if negative else value
+
+
+def format_money(paise):
+    """Format paise as rupees with exactly two decimals, e.g. 125050 -> '1250.50'."""
+    sign = "-" if paise < 0 else ""
+    rupees, paise = divmod(abs(paise), PAISE_PER_RUPEE)
+    return f"{sign}{rupees}.{paise:02d}"
+
+
+def is_money(value):
+    """True for an integer paise amount (bools are not money)."""
+    return isinstance(value, int) and not isinstance(value, bool)
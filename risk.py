@@ -0,0 +1,354 @@
+"""Velocity limits screened in front of every debit.
+
+A rule table (DEFAULT_RULES, or a JSON file of the same shape) limits how
+many debits, and how much money, may leave an account in the last minute,
+hour and day, by account type, and the same for all the accounts of one
+user together:
+
+    {"accounts": {"savings": {"minute": {"count": 5, "amount": 5000000},
+                              "hour": {...}, "day": {...}},
+                  "*": {...}},            # account types not listed
+     "user": {"day": {"amount": 50000000}}}
+
+A missing window, count or amount is not limited. Amounts are paise.
+Screening is opt-in: without a rule table nothing is limited or counted.
+DEFAULT_RULES (or "default" wherever a rule file path is taken) is a
+starting point.
+
+Each account and user that debits gets a Velocity: for every period a
+ring of buckets (PERIODS gives how many) of debit counts and amounts, and
+their running sums. A debit within the current TICK_SECONDS only adds to
+two pending counters; the rings are touched when the tick changes, and
+then at most once per bucket. A check compares a few sums, so it costs the
+same however long the history is, and never reads it. A window slides a
+bucket at a time, so a limit covers the last period give or take one
+bucket.
+
+Counters live in memory only: after a restart the windows start empty.
+Keys whose windows have all emptied are dropped about every SWEEP_EVERY
+debits, so memory is bounded by the accounts and users active in the
+last day.
+"""
+
+import json
+import threading
+from array import array
+
+from money import format_money
+
+# Counters move on in ticks of TICK_SECONDS; every period is a whole number of ticks
+TICK_SECONDS = 10
+_TICK_US = TICK_SECONDS * 1000000
+# period -> (seconds, buckets in its ring); each bucket is a whole number of ticks
+PERIODS = {'minute': (60, 6), 'hour': (3600, 12), 'day': (86400, 24)}
+_PERIOD_INDEX = {period: index for index, period in enumerate(PERIODS)}
+# (ticks per bucket, buckets, first slot in the shared ring arrays) of each period, in PERIODS order
+_RINGS = []
+_RING_SLOTS = 0
+for _seconds, _buckets in PERIODS.values():
+    _RINGS.append((_seconds // _buckets // TICK_SECONDS, _buckets, _RING_SLOTS))
+    _RING_SLOTS += _buckets
+_RINGS = tuple(_RINGS)
+del _seconds, _buckets
+SWEEP_EVERY = 100000
+
+DEFAULT_RULES = {
+    'accounts': {
+        'savings': {
+            'minute': {'count': 5},
+            'hour': {'count': 30, 'amount': 20000000},
+            'day': {'count': 100, 'amount': 50000000},
+        },
+        'checking': {
+            'minute': {'count': 20},
+            'hour': {'count': 200, 'amount': 100000000},
+            'day': {'count': 1000, 'amount': 500000000},
+        },
+        'investment': {
+            'minute': {'count': 5},
+            'hour': {'count': 20, 'amount': 50000000},
+            'day': {'count': 50, 'amount': 200000000},
+        },
+    },
+    'user': {
+        'minute': {'count': 20},
+        'day': {'count': 2000, 'amount': 1000000000},
+    },
+}
+
+# A rule table that limits nothing but still runs every check
+UNLIMITED = {'accounts': {'*': {period: {} for period in PERIODS}},
+             'user': {period: {} for period in PERIODS}}
+
+_NO_LIMIT = 1 << 62
+
+
+class Velocity:
+    """Debit counts and amounts of one account or user over every period.
+
+    Debits of the current tick are only added to `pending`; when the tick
+    changes they are moved into the bucket of each period's ring and the
+    buckets that fell out of a window are subtracted from its sums. A
+    period's total is then its sum plus the pending debits. The rings of
+    all periods share two arrays, allocated on the first tick change.
+
+    room_count and room_amount are what the tightest of `rules` leaves
+    for the current tick, so a check within a tick is two comparisons.
+    """
+
+    __slots__ = ('tick', 'pending_count', 'pending_amount', 'counts', 'amounts', 'ring_counts', 'ring_amounts',
+                 'rules', 'room_count', 'room_amount')
+
+    def __init__(self, tick):
+        self.tick = tick
+        self.pending_count = 0
+        self.pending_amount = 0
+        # Per period: debits in its window before the current tick
+        self.counts = [0] * len(_RINGS)
+        self.amounts = [0] * len(_RINGS)
+        self.ring_counts = None
+        self.ring_amounts = None
+        self.rules = None
+        self.room_count = 0
+        self.room_amount = 0
+
+    def hold_to(self, rules):
+        """Work out the room `rules` leave before the current tick."""
+        counts = self.counts
+        amounts = self.amounts
+        self.rules = rules
+        self.room_count = min([max_count - counts[index] for index, _, max_count, _ in rules], default=_NO_LIMIT)
+        self.room_amount = min([max_amount - amounts[index] for index, _, _, max_amount in rules],
+                               default=_NO_LIMIT)
+
+    def advance(self, tick):
+        """Move on to `tick`; at most every bucket of each ring is touched."""
+        old = self.tick
+        if tick <= old:
+            # A clock that stepped back: keep counting in the current tick
+            return
+        self.tick = tick
+        counts = self.counts
+        amounts = self.amounts
+        pending_count = self.pending_count
+        if not pending_count and not any(counts):
+            return
+        pending_amount = self.pending_amount
+        self.pending_count = 0
+        self.pending_amount = 0
+        ring_counts = self.ring_counts
+        if ring_counts is None:
+            ring_counts = self.ring_counts = array('I', bytes(4 * _RING_SLOTS))
+            self.ring_amounts = array('q', bytes(8 * _RING_SLOTS))
+        ring_amounts = self.ring_amounts
+        for index, (ticks, buckets, offset) in enumerate(_RINGS):
+            bucket = old // ticks
+            if pending_count:
+                slot = offset + bucket % buckets
+                ring_counts[slot] += pending_count
+                ring_amounts[slot] += pending_amount
+                counts[index] += pending_count
+                amounts[index] += pending_amount
+            new_bucket = tick // ticks
+            if new_bucket - bucket >= buckets:
+                if counts[index]:
+                    for slot in range(offset, offset + buckets):
+                        ring_counts[slot] = 0
+                        ring_amounts[slot] = 0
+                    counts[index] = 0
+                    amounts[index] = 0
+                continue
+            for position in range(bucket + 1, new_bucket + 1):
+                slot = offset + position % buckets
+                if ring_counts[slot]:
+                    counts[index] -= ring_counts[slot]
+                    amounts[index] -= ring_amounts[slot]
+                    ring_counts[slot] = 0
+                    ring_amounts[slot] = 0
+
+    def totals(self):
+        return [(count + self.pending_count, amount + self.pending_amount)
+                for count, amount in zip(self.counts, self.amounts)]
+
+
+def _compile(limits):
+    """[(period index, period name, max count, max amount)] for one rule set."""
+    compiled = []
+    for period, limit in limits.items():
+        if period not in PERIODS:
+            raise ValueError("Unknown period: " + str(period))
+        count = limit.get('count')
+        amount = limit.get('amount')
+        compiled.append((_PERIOD_INDEX[period], period,
+                         _NO_LIMIT if count is None else int(count),
+                         _NO_LIMIT if amount is None else int(amount)))
+    return compiled
+
+
+class RiskScreen:
+    """Sliding-window debit counters per account and per user, and the rules they are held to."""
+
+    def __init__(self, rules=None):
+        self.accounts = {}
+        self.users = {}
+        # Updated under _lock
+        self.screened = 0
+        self.declined = 0
+        self.sweep_due = False
+        self._lock = threading.Lock()
+        self.load(rules)
+
+    def load(self, rules=None):
+        """Use a rule table: a dict, a JSON file path, "default" for DEFAULT_RULES, or None for no limits.
+
+        Counters are kept; only the limits change.
+        """
+        if rules is None:
+            rules = {}
+        elif rules == "default":
+            rules = DEFAULT_RULES
+        elif isinstance(rules, str):
+            with open(rules) as f:
+                rules = json.load(f)
+        by_type = {account_type: _compile(limits) for account_type, limits in rules.get('accounts', {}).items()}
+        default = by_type.pop('*', [])
+        with self._lock:
+            self.rules = rules
+            self.by_type = by_type
+            self.default = default
+            self.user = _compile(rules.get('user', {}))
+
+    def screen(self, account_number, account_type, username, amount, now):
+        """"" if a debit of `amount` is within every limit (and is then counted), else why not.
+
+        `username` is the account's owner, or None; `now` is epoch
+        microseconds. The caller holds the account's lock, which guards
+        its counters; a user's counters are shared by their accounts and
+        guarded here.
+        """
+        account_rules = self.by_type.get(account_type, self.default)
+        user_rules = self.user if username is not None else None
+        if not account_rules and not user_rules:
+            return ""
+        tick = now // _TICK_US
+        if account_rules:
+            account = self.accounts.get(account_number)
+            if account is None or account.tick != tick or account.rules is not account_rules:
+                account = _refresh(self.accounts, account_number, account_rules, tick)
+            if account.pending_count >= account.room_count or \
+                    account.pending_amount + amount > account.room_amount:
+                with self._lock:
+                    self._count(declined=True)
+                return _over(account, account_rules, amount, "this account")
+        self._lock.acquire()
+        try:
+            self._count()
+            if user_rules:
+                user = self.users.get(username)
+                if user is None or user.tick != tick or user.rules is not user_rules:
+                    user = _refresh(self.users, username, user_rules, tick)
+                if user.pending_count >= user.room_count or user.pending_amount + amount > user.room_amount:
+                    self.declined += 1
+                    return _over(user, user_rules, amount, "your accounts")
+                user.pending_count += 1
+                user.pending_amount += amount
+        finally:
+            self._lock.release()
+        if account_rules:
+            account.pending_count += 1
+            account.pending_amount += amount
+        return ""
+
+    def release(self, account_number, account_type, username, amount, now):
+        """Take back a debit screen() passed at `now` that was not posted after all.
+
+        For an atomic batch that is rejected as a whole; the caller still
+        holds the locks it screened under, so the debit is in the counters'
+        current tick.
+        """
+        account_rules = self.by_type.get(account_type, self.default)
+        user_rules = self.user if username is not None else None
+        if not account_rules and not user_rules:
+            return
+        tick = now // _TICK_US
+        if account_rules:
+            _uncount(self.accounts.get(account_number), tick, amount)
+        with self._lock:
+            self.screened -= 1
+            if user_rules:
+                _uncount(self.users.get(username), tick, amount)
+
+    def _count(self, declined=False):
+        # Called with _lock held
+        self.screened += 1
+        if declined:
+            self.declined += 1
+        if self.screened % SWEEP_EVERY == 0:
+            self.sweep_due = True
+
+    def sweep(self, now=None):
+        """Drop the counters of keys with nothing left in any window.
+
+        Call with every account lock held; screen() sets sweep_due every
+        SWEEP_EVERY debits.
+        """
+        tick = (now if now is not None else _now()) // _TICK_US
+        with self._lock:
+            for counters in (self.accounts, self.users):
+                idle = []
+                for key, velocity in counters.items():
+                    velocity.advance(tick)
+                    if not (velocity.pending_count or any(velocity.counts)):
+                        idle.append(key)
+                for key in idle:
+                    del counters[key]
+            self.sweep_due = False
+
+    def usage(self, account_number=None, username=None):
+        """Current count and amount in each window of an account (under its lock) or a user."""
+        with self._lock:
+            velocity = self.accounts.get(account_number) if username is None else self.users.get(username)
+            if velocity is None:
+                return {period: {'count': 0, 'amount': 0} for period in PERIODS}
+            velocity.advance(_now() // _TICK_US)
+            return {period: {'count': count, 'amount': amount}
+                    for period, (count, amount) in zip(PERIODS, velocity.totals())}
+
+    def stats(self):
+        return {
+            'screened': self.screened,
+            'declined': self.declined,
+            'accounts_tracked': len(self.accounts),
+            'users_tracked': len(self.users),
+        }
+
+
+def _refresh(counters, key, rules, tick):
+    velocity = counters.get(key)
+    if velocity is None:
+        velocity = counters[key] = Velocity(tick)
+    else:
+        velocity.advance(tick)
+    velocity.hold_to(rules)
+    return velocity
+
+
+def _uncount(velocity, tick, amount):
+    if velocity is not None and velocity.tick == tick and velocity.pending_count:
+        velocity.pending_count -= 1
+        velocity.pending_amount -= amount
+
+
+def _over(velocity, rules, amount, whose):
+    """Why a debit of `amount` breaks one of `rules`."""
+    for index, period, max_count, max_amount in rules:
+        if velocity.counts[index] + velocity.pending_count >= max_count:
+            return f"Debit limit reached: {max_count} debits per {period} from {whose}"
+        if velocity.amounts[index] + velocity.pending_amount + amount > max_amount:
+            return f"Debit limit reached: at most {format_money(max_amount)} per {period} from {whose}"
+    return ""
+
+
+def _now():
+    import time
+    return time.time_ns() // 1000
@@ -0,0 +1,260 @@
+"""asyncio front-end that serves Bank operations over TCP or a Unix socket.
+
+Protocol: every request is a JSON object {"id": ..., "op": ..., "args": {...}}
+and gets back {"id": ..., "ok": true, "result": ...} or
+{"id": ..., "ok": false, "error": "..."}. A connection either sends one
+request per line (newline JSON) or frames each request as a 4-byte
+big-endian length followed by the JSON payload. The first byte of the
+connection that is not whitespace decides which: '{' means lines,
+anything else means frames (a frame's length starts with a zero byte).
+A line, like a frame, may be at most MAX_FRAME bytes; a longer one closes
+the connection.
+
+Clients may pipeline: requests are read without waiting for earlier
+responses, and responses come back in request order. Whatever requests are
+already buffered on a connection are run as one batch on a worker thread
+inside Bank.group_commit(), so they share one fsync. Batches from different
+connections share fsyncs too, through the ledger's group commit. Only one
+batch per connection is in flight, and responses are drained before the
+next read, so a client that stops reading stops being served
+(backpressure).
+
+The server does no authentication: every operation is an admin
+operation, run for whoever can reach the socket, so it belongs on a
+trusted network or a Unix socket with restricted permissions. That
+includes the ones that move money or change ownership without a login
+(deposit, withdraw, transfer, batch, pay_bill(s), pay_biller,
+book_ticket, cancel_ticket, open_account, assign_owner).
+
+    python server.py [--host 127.0.0.1] [--port 8765] [--unix PATH] [--data-dir DIR]
+"""
+
+import argparse
+import asyncio
+import json
+import struct
+
+from bank import Bank, BankError
+
+FRAME_HEADER = struct.Struct(">I")
+READ_SIZE = 65536
+MAX_BATCH = 1024
+MAX_FRAME = 16 * 1024 * 1024
+
+
+def _history(bank, account_number, limit=50, cursor=None, newest_first=True):
+    page = bank.transaction_page(account_number, limit, cursor, newest_first=newest_first)
+    page['entries'] = [dict(entry, timestamp=entry['timestamp'].isoformat())
+                       for entry in page['entries']]
+    return page
+
+
+def _portfolio(bank, username, recent=5):
+    portfolio = bank.portfolio(username, recent)
+    for account in portfolio['accounts']:
+        account['recent'] = [dict(entry, timestamp=entry['timestamp'].isoformat())
+                             for entry in account['recent']]
+    return portfolio
+
+
+def _metrics(bank, format="json"):
+    if bank.metrics is None:
+        raise BankError("Metrics are not enabled (start the server with --metrics)")
+    return bank.metrics.prometheus() if format == "prometheus" else bank.metrics.snapshot()
+
+
+# op name -> callable(bank, **args)
+OPERATIONS = {
+    'register': Bank.register_user,
+    'open_account': Bank.open_account,
+    'account': Bank.get_account,
+    'assign_owner': Bank.assign_owner,
+    'portfolio': _portfolio,
+    'balance': Bank.get_balance,
+    'deposit': Bank.post_deposit,
+    'withdraw': Bank.post_withdrawal,
+    'transfer': Bank.transfer,
+    'batch': Bank.post_batch,
+    'history': _history,
+    'recharge': Bank.recharge_mobile,
+    'pay_bill': Bank.pay_bill,
+    'pay_biller': Bank.pay_biller,
+    'pay_bills': Bank.pay_bills,
+    'book_ticket': Bank.book_ticket,
+    'ticket': Bank.get_ticket,
+    'tickets': Bank.get_tickets,
+    'fare': Bank.fare_quote,
+    'fare_stats': Bank.fare_cache_stats,
+    'treasury': Bank.treasury,
+    'risk_usage': Bank.risk_usage,
+    'risk_stats': Bank.risk_stats,
+    'reconcile': Bank.reconcile,
+    'metrics': _metrics,
+    'cancel_ticket': Bank.cancel_ticket,
+}
+
+
+def execute(bank, request):
+    request_id = request.get('id') if isinstance(request, dict) else None
+    try:
+        operation = OPERATIONS.get(request['op'])
+        if operation is None:
+            raise BankError("Unknown operation: " + str(request['op']))
+        # An operation timed by metrics.instrument() is an instance attribute
+        timed = bank.__dict__.get(operation.__name__) if bank.metrics is not None else None
+        if timed is not None:
+            result = timed(**request.get('args', {}))
+        else:
+            result = operation(bank, **request.get('args', {}))
+        return {'id': request_id, 'ok': True, 'result': result}
+    except (BankError, KeyError, TypeError, ValueError) as e:
+        return {'id': request_id, 'ok': False, 'error': str(e) or type(e).__name__}
+    except Exception as e:
+        # One failing request must not lose the responses of the rest of its batch
+        return {'id': request_id, 'ok': False, 'error': f"Internal error ({type(e).__name__}): {e}"}
+
+
+def execute_batch(bank, payloads):
+    """Run one connection's buffered requests, sharing a single fsync."""
+    responses = []
+    with bank.group_commit():
+        for payload in payloads:
+            try:
+                request = json.loads(payload)
+            except ValueError:
+                responses.append({'id': None, 'ok': False, 'error': "Malformed request"})
+                continue
+            responses.append(execute(bank, request))
+    return [json.dumps(response, separators=(",", ":")).encode() for response in responses]
+
+
+class BankServer:
+    def __init__(self, bank):
+        self.bank = bank
+        self.requests = 0
+        self.batches = 0
+
+    async def handle(self, reader, writer):
+        loop = asyncio.get_running_loop()
+        buffer = b""
+        framed = None
+        try:
+            while True:
+                data = await reader.read(READ_SIZE)
+                if not data:
+                    break
+                buffer += data
+                if framed is None:
+                    # A newline client may start with blank lines or spaces
+                    buffer = buffer.lstrip()
+                    if not buffer:
+                        continue
+                    framed = not buffer.startswith(b"{")
+                while True:
+                    payloads, buffer = (self._split_frames(buffer) if framed
+                                        else self._split_lines(buffer))
+                    if not payloads:
+                        break
+                    self.requests += len(payloads)
+                    self.batches += 1
+                    responses = await loop.run_in_executor(
+                        None, execute_batch, self.bank, payloads)
+                    if framed:
+                        writer.write(b"".join(FRAME_HEADER.pack(len(r)) + r for r in responses))
+                    else:
+                        writer.write(b"\n".join(responses) + b"\n")
+                    await writer.drain()
+        except (ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    def _split_lines(buffer):
+        end = buffer.rfind(b"\n")
+        if len(buffer) - end - 1 > MAX_FRAME:
+            raise ValueError("Line too long")
+        if end < 0:
+            return [], buffer
+        lines = buffer[:end].split(b"\n")
+        if end > MAX_FRAME and max(map(len, lines)) > MAX_FRAME:
+            raise ValueError("Line too long")
+        if len(lines) > MAX_BATCH:
+            # Leave the rest buffered for the next batch
+            rest = b"\n".join(lines[MAX_BATCH:]) + buffer[end:]
+            lines = lines[:MAX_BATCH]
+        else:
+            rest = buffer[end + 1:]
+        return [line for line in lines if line.strip()], rest
+
+    @staticmethod
+    def _split_frames(buffer):
+        payloads = []
+        offset = 0
+        while len(payloads) < MAX_BATCH and offset + FRAME_HEADER.size <= len(buffer):
+            (length,) = FRAME_HEADER.unpack_from(buffer, offset)
+            if length > MAX_FRAME:
+                raise ValueError("Frame too large")
+            end = offset + FRAME_HEADER.size + length
+            if end > len(buffer):
+                break
+            payloads.append(buffer[offset + FRAME_HEADER.size:end])
+            offset = end
+        return payloads, buffer[offset:]
+
+    async def start(self, host="127.0.0.1", port=8765, unix_path=None):
+        if unix_path:
+            return await asyncio.start_unix_server(self.handle, path=unix_path)
+        return await asyncio.start_server(self.handle, host, port)
+
+
+async def serve(bank, host="127.0.0.1", port=8765, unix_path=None):
+    server = await BankServer(bank).start(host, port, unix_path)
+    where = unix_path or f"{host}:{port}"
+    print(f"Serving Bank operations on {where}")
+    async with server:
+        await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve Bank operations over a socket")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--unix", help="listen on this Unix socket path instead of TCP")
+    parser.add_argument("--data-dir", help="keep a durable ledger in this directory")
+    parser.add_argument("--settle-dir", help="settle bill payments into batch files here")
+    parser.add_argument("--settle-interval", type=float, default=60.0, help="seconds between settlements")
+    parser.add_argument("--risk-rules", help="JSON file of velocity limits, or 'default' for risk.DEFAULT_RULES (no limits without one)")
+    parser.add_argument("--metrics", action="store_true", help="time every operation (see the 'metrics' op)")
+    parser.add_argument("--reconcile-interval", type=float,
+                        help="check the running totals and balances every this many seconds")
+    args = parser.parse_args()
+
+    bank = Bank(data_dir=args.data_dir, risk_rules=args.risk_rules)
+    if args.metrics:
+        import metrics
+        metrics.instrument(bank)
+    settler = None
+    if args.settle_dir:
+        from billing import Settler
+        settler = Settler(bank, args.settle_dir, args.settle_interval).start()
+    reconciler = None
+    if args.reconcile_interval:
+        from aggregates import Reconciler
+        reconciler = Reconciler(bank, args.reconcile_interval,
+                                on_problem=lambda report: print("reconciliation failed:", report['problems'],
+                                                                flush=True)).start()
+    try:
+        asyncio.run(serve(bank, args.host, args.port, args.unix))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if settler is not None:
+            settler.stop()
+        if reconciler is not None:
+            reconciler.stop()
+        bank.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,394 @@
+"""Sharded Bank: accounts partitioned across worker processes.
+
+One Bank is bound to one core by the GIL. ShardedBank runs `shards` worker
+processes, each owning a Bank (and, with a data_dir, its own ledger under
+data_dir/shard-NN). Operations on one account go to the shard that owns it.
+A transfer between two shards is a two-phase commit driven from the
+calling process:
+
+1. the intent (txid, accounts, amount) is appended to the coordinator log,
+   for diagnosis only: it is not fsynced and recovery does not read it;
+2. both shards prepare their leg: the debit is reserved and each prepare is
+   durable before the shard votes;
+3. if both voted yes, the commit decision is made durable in the coordinator
+   log, otherwise the transfer is aborted;
+4. both shards resolve their leg and the transfer is marked done.
+
+The protocol is presumed abort. Only the commit decision is forced to
+disk, before any shard is told to commit. On restart the shards, not the
+coordinator log, say which transfers are in doubt (each prepare is
+durable on its shard), and each is committed if a commit decision was
+logged and aborted otherwise, whether or not its intent or an abort
+decision survived. Once every in-doubt transfer is resolved the
+coordinator log is reset, as nothing in it is needed any more. While
+running, it is also reset whenever no transfer is in flight and it holds
+COORDINATOR_LOG_RECORDS records or more, so it does not grow with every
+transfer; a transfer whose resolve failed keeps it until the next restart.
+
+Each shard screens its own debits against the velocity limits (risk.py),
+so a user's limits are counted per shard, not across the whole bank.
+
+    bank = ShardedBank("bank_data", shards=4)
+    bank.open_account("100000001", "Asha", "savings", 500000)
+"""
+
+import multiprocessing
+import os
+import threading
+import uuid
+import zlib
+
+from bank import Bank, BankError
+
+# Records the coordinator log may gather before it is reset between transfers
+COORDINATOR_LOG_RECORDS = 3000
+
+
+def shard_for(key, shards):
+    """The shard owning an account number (or any other string key)."""
+    if key.isdigit():
+        return int(key) % shards
+    return zlib.crc32(key.encode()) % shards
+
+
+def _serve_shard(conn, data_dir, sync_mode, snapshot_every, risk_rules):
+    bank = Bank(data_dir=data_dir, sync_mode=sync_mode, snapshot_every=snapshot_every, risk_rules=risk_rules)
+    try:
+        while True:
+            message = conn.recv()
+            if message is None:
+                break
+            method, args = message
+            try:
+                if method == 'many':
+                    # Pipelined calls share one fsync, like a server batch
+                    results = []
+                    with bank.group_commit():
+                        for name, call_args in args:
+                            try:
+                                results.append(getattr(bank, name)(*call_args))
+                            except Exception as e:
+                                # The calls before it are applied already, so
+                                # their results must still go back
+                                results.append(e)
+                    conn.send((True, results))
+                else:
+                    conn.send((True, getattr(bank, method)(*args)))
+            except Exception as e:
+                conn.send((False, e))
+    finally:
+        bank.close()
+        conn.close()
+
+
+class _Shard:
+    def __init__(self, context, data_dir, sync_mode, snapshot_every, risk_rules):
+        self.conn, child = context.Pipe()
+        self.process = context.Process(target=_serve_shard,
+                                       args=(child, data_dir, sync_mode, snapshot_every, risk_rules),
+                                       daemon=True)
+        self.process.start()
+        child.close()
+        # One request in flight per pipe
+        self.lock = threading.Lock()
+
+    def send(self, method, args):
+        self.conn.send((method, args))
+
+    def receive(self):
+        ok, result = self.conn.recv()
+        if not ok:
+            raise result
+        return result
+
+    def call(self, method, *args):
+        with self.lock:
+            self.send(method, args)
+            return self.receive()
+
+    def close(self):
+        with self.lock:
+            self.conn.send(None)
+        self.process.join()
+        self.conn.close()
+
+
+class ShardedBank:
+    def __init__(self, data_dir=None, shards=None, sync_mode="group", snapshot_every=10000, risk_rules=None):
+        shards = shards or os.cpu_count() or 1
+        self.coordinator_log = None
+        # Cross-shard transfers between their intent and done records; the
+        # log is only reset when there are none and none was left unresolved
+        self._flight_lock = threading.Lock()
+        self._in_flight = 0
+        self._unresolved = False
+        self._log_start = 0
+        if data_dir is not None:
+            shards = self._check_layout(data_dir, shards)
+        context = multiprocessing.get_context("spawn")
+        self.shards = []
+        for index in range(shards):
+            shard_dir = os.path.join(data_dir, f"shard-{index:02d}") if data_dir else None
+            self.shards.append(_Shard(context, shard_dir, sync_mode, snapshot_every, risk_rules))
+        if data_dir is not None:
+            from ledger import WriteAheadLog
+            self.coordinator_log = WriteAheadLog(os.path.join(data_dir, "coordinator.log"))
+            self._recover()
+
+    @staticmethod
+    def _check_layout(data_dir, shards):
+        # Accounts are placed by shard count, so it cannot change under existing data
+        os.makedirs(data_dir, exist_ok=True)
+        layout_path = os.path.join(data_dir, "shards")
+        if os.path.exists(layout_path):
+            with open(layout_path) as f:
+                existing = int(f.read())
+            if existing != shards:
+                raise BankError(f"{data_dir} holds {existing} shards, not {shards}")
+        else:
+            with open(layout_path, "w") as f:
+                f.write(str(shards))
+        return shards
+
+    def close(self):
+        for shard in self.shards:
+            shard.close()
+        if self.coordinator_log is not None:
+            self.coordinator_log.close()
+            self.coordinator_log = None
+
+    def shard(self, key):
+        return self.shards[shard_for(key, len(self.shards))]
+
+    # ------------------------------------------------------------------
+    # Cross-shard transfers
+    # ------------------------------------------------------------------
+
+    def _log(self, record, durable):
+        if self.coordinator_log is not None:
+            lsn = self.coordinator_log.append(record)
+            if durable:
+                self.coordinator_log.commit(lsn)
+
+    def _recover(self):
+        """Resolve every transfer a shard still holds as prepared."""
+        committed = set()
+        for record in self.coordinator_log.records():
+            if record['op'] == 'decide' and record['commit']:
+                committed.add(record['txid'])
+        for shard in self.shards:
+            for txid in shard.call('in_doubt'):
+                shard.call('resolve_transfer', txid, txid in committed)
+        # Nothing is in doubt any more, so the log can start afresh
+        self._reset_log()
+
+    def _reset_log(self):
+        self._log_start = self.coordinator_log.next_lsn - 1
+        self.coordinator_log.reset(self._log_start)
+
+    def _begin_transfer(self):
+        with self._flight_lock:
+            self._in_flight += 1
+
+    def _end_transfer(self, resolved):
+        """Count a transfer out; the last one out resets a long enough log."""
+        with self._flight_lock:
+            self._in_flight -= 1
+            if not resolved:
+                # Its commit decision may be needed on restart
+                self._unresolved = True
+            log = self.coordinator_log
+            if log is not None and not self._in_flight and not self._unresolved \
+                    and log.next_lsn - 1 - self._log_start >= COORDINATOR_LOG_RECORDS:
+                self._reset_log()
+
+    def _both(self, first, second, method, first_args, second_args):
+        """Call two shards concurrently; returns (result or exception) per shard."""
+        # Locks in shard order, so two coordinators cannot deadlock
+        ordered = sorted((first, second), key=self.shards.index)
+        for shard in ordered:
+            shard.lock.acquire()
+        try:
+            first.send(method, first_args)
+            second.send(method, second_args)
+            outcomes = []
+            for shard in (first, second):
+                try:
+                    outcomes.append(shard.receive())
+                except Exception as e:
+                    outcomes.append(e)
+            return outcomes
+        finally:
+            for shard in reversed(ordered):
+                shard.lock.release()
+
+    def transfer(self, from_account, to_account, amount):
+        source = self.shard(from_account)
+        target = self.shard(to_account)
+        if source is target:
+            return source.call('transfer', from_account, to_account, amount)
+
+        txid = uuid.uuid4().hex
+        resolved = False
+        self._begin_transfer()
+        try:
+            self._log({'op': 'intent', 'txid': txid, 'src': from_account,
+                       'dst': to_account, 'amount': amount}, durable=False)
+            votes = self._both(source, target, 'prepare_transfer',
+                               (txid, from_account, amount, 'debit'),
+                               (txid, to_account, amount, 'credit'))
+            commit = not any(isinstance(vote, Exception) for vote in votes)
+            # Only a commit has to be durable before it is acted on; a missing
+            # decision is read as abort on recovery.
+            self._log({'op': 'decide', 'txid': txid, 'commit': commit}, durable=commit)
+            outcomes = self._both(source, target, 'resolve_transfer', (txid, commit), (txid, commit))
+            self._log({'op': 'done', 'txid': txid}, durable=False)
+            resolved = not any(isinstance(outcome, Exception) for outcome in outcomes)
+        finally:
+            self._end_transfer(resolved)
+        for outcome in votes + outcomes:
+            if isinstance(outcome, Exception):
+                raise outcome
+        return {
+            'from_account': from_account,
+            'to_account': to_account,
+            'amount': amount,
+            'from_balance': outcomes[0]['balance'],
+            'to_balance': outcomes[1]['balance']
+        }
+
+    # ------------------------------------------------------------------
+    # Routed operations
+    # ------------------------------------------------------------------
+
+    def register_user(self, username, email, password, mpin=None):
+        return self.shard(username).call('register_user', username, email, password, mpin)
+
+    def open_account(self, account_number, account_holder, account_type, initial_balance):
+        return self.shard(account_number).call('open_account', account_number, account_holder,
+                                               account_type, initial_balance)
+
+    def get_account(self, account_number):
+        return self.shard(account_number).call('get_account', account_number)
+
+    def get_balance(self, account_number):
+        return self.shard(account_number).call('get_balance', account_number)
+
+    def total_balance(self):
+        """Sum of every shard's balances; debits of in-flight transfers are reserved, so excluded."""
+        return sum(shard.call('total_balance') for shard in self.shards)
+
+    def reconcile(self):
+        """Each shard's reconciliation report; a shard checks its own accounts."""
+        return [shard.call('reconcile') for shard in self.shards]
+
+    def get_transactions(self, account_number):
+        return self.shard(account_number).call('get_transactions', account_number)
+
+    def transaction_page(self, account_number, limit=50, cursor=None):
+        return self.shard(account_number).call('transaction_page', account_number, limit, cursor)
+
+    def post_deposit(self, account_number, amount):
+        return self.shard(account_number).call('post_deposit', account_number, amount)
+
+    def post_withdrawal(self, account_number, amount):
+        return self.shard(account_number).call('post_withdrawal', account_number, amount)
+
+    def recharge_mobile(self, operator, mobile_number, amount, transaction_account, idempotency_key=None):
+        return self.shard(transaction_account).call('recharge_mobile', operator, mobile_number,
+                                                    amount, transaction_account, idempotency_key)
+
+    def pay_bill(self, bill_type, customer_id, transaction_account, amount, idempotency_key=None):
+        return self.shard(transaction_account).call('pay_bill', bill_type, customer_id,
+                                                    transaction_account, amount, idempotency_key)
+
+    def pay_biller(self, biller, reference, transaction_account, amount, idempotency_key=None):
+        # Idempotency keys are remembered by the shard of the paying account
+        return self.shard(transaction_account).call('pay_biller', biller, reference,
+                                                    transaction_account, amount, idempotency_key)
+
+    def settle_bills(self, out_dir):
+        """Settle every shard's queued bill payments into out_dir/shard-NN."""
+        return [shard.call('settle_bills', os.path.join(out_dir, f"shard-{index:02d}"))
+                for index, shard in enumerate(self.shards)]
+
+    def write_statements(self, out_dir, start=None, end=None, format="csv", accounts_per_file=None):
+        """Write every shard's statements into out_dir/shard-NN, all shards at once.
+
+        The shards are the worker processes: each writes its own accounts
+        in-process. Returns each shard's summary.
+        """
+        for shard in self.shards:
+            shard.lock.acquire()
+        try:
+            for index, shard in enumerate(self.shards):
+                shard.send('write_statements', (os.path.join(out_dir, f"shard-{index:02d}"), start, end, format, 1,
+                                                accounts_per_file))
+            results = []
+            failure = None
+            for shard in self.shards:
+                try:
+                    results.append(shard.receive())
+                except Exception as e:
+                    failure = failure or e
+        finally:
+            for shard in reversed(self.shards):
+                shard.lock.release()
+        if failure is not None:
+            raise failure
+        return results
+
+    # Seat inventories live in each shard's Bank, next to the accounts that
+    # pay for them, so every shard sells its own seats of a train. A
+    # deployment that needs one inventory per train runs bookings on an
+    # unsharded Bank.
+
+    def book_ticket(self, account_number, from_station, to_station, travel_date, travel_class, quota,
+                    train=None):
+        return self.shard(account_number).call('book_ticket', account_number, from_station,
+                                               to_station, travel_date, travel_class, quota, train)
+
+    def get_tickets(self, account_number):
+        return self.shard(account_number).call('get_tickets', account_number)
+
+    def get_ticket(self, account_number, pnr=None):
+        return self.shard(account_number).call('get_ticket', account_number, pnr)
+
+    def cancel_ticket(self, account_number, pnr=None):
+        return self.shard(account_number).call('cancel_ticket', account_number, pnr)
+
+    def execute_many(self, calls):
+        """Run (method, args) calls whose first argument is an account number.
+
+        Calls are grouped per shard and every shard runs its group at the
+        same time, inside one group commit. Results come back in call order;
+        a call that failed has the exception it raised in its slot.
+        """
+        groups = {}
+        for index, (method, args) in enumerate(calls):
+            groups.setdefault(shard_for(args[0], len(self.shards)), []).append((index, method, args))
+        results = [None] * len(calls)
+        shards = [self.shards[index] for index in sorted(groups)]
+        for shard in shards:
+            shard.lock.acquire()
+        try:
+            for shard_index in sorted(groups):
+                self.shards[shard_index].send('many', [(method, args)
+                                                       for _, method, args in groups[shard_index]])
+            failure = None
+            for shard_index in sorted(groups):
+                # Read every shard's reply even after a failure, so no pipe
+                # is left with an unread response
+                try:
+                    outcomes = self.shards[shard_index].receive()
+                except Exception as e:
+                    failure = failure or e
+                    continue
+                for (index, _, _), outcome in zip(groups[shard_index], outcomes):
+                    results[index] = outcome
+        finally:
+            for shard in reversed(shards):
+                shard.lock.release()
+        if failure is not None:
+            raise failure
+        return results
@@ -0,0 +1,596 @@
+"""Binary snapshots that a restarted Bank serves from in place, through mmap.
+
+A JSON snapshot has to be parsed and turned back into objects account by
+account before the first request. A binary snapshot is laid out the way
+the bank holds its state, so opening one reads only its header and a
+small JSON section; everything else is read where it lies in the file,
+and the OS faults pages in as they are first touched.
+
+Layout (little-endian), version FORMAT_VERSION:
+
+    header     MAGIC, version u32, section count u32, directory offset u64, lsn u64
+    sections   each starting on an 8-byte boundary
+    directory  per section: name (32 bytes, NUL-padded), offset u64, length u64
+
+Sections:
+
+    state                        JSON: tickets, prepared transfers, bills,
+                                 running totals and the type names
+    accounts.<column>            the AccountTable columns, one fixed-width
+                                 record per row (ACCOUNT_COLUMNS), each on
+                                 its own PAGE-aligned pages
+    accounts.sorted_ids/_rows    account ids in ascending order and the row
+                                 of each, so a row is found by bisecting
+    holders, owners              holder names and owner usernames by code,
+                                 as string tables, with .order: their codes
+                                 in name order (owner code 0 is not stored)
+    owner_rows                   the rows of each owner code, grouped
+    history.ids                  ids of the accounts with a history, ascending
+    history                      their entries, grouped, in the
+                                 HISTORY_COLUMNS
+    users.names, users.records   usernames in ascending order and each
+                                 user's JSON record, as string tables
+
+A grouped section has an .offsets column (int64, one more than groups)
+saying where each group starts in its value columns; a string table is the
+same with the UTF-8 bytes in .data.
+
+The account columns are mapped copy-on-write and used as the table's
+columns directly: a balance update writes to this process's copy of one
+page and never to the file. Lookups bisect the sorted sections, and a row,
+name, user or history is only turned into Python objects when it is
+touched. A history or user that is written to is copied out of the file;
+until then reads see it in place. Adding accounts first copies the
+account columns into arrays (AccountTable.materialize).
+
+write() merges: whatever was never touched is copied across from the
+file the bank was opened from, so a snapshot costs little more than the
+bytes written. That file stays mapped, and on disk while mapped, until the
+process exits, even after a newer snapshot replaces it. Tickets and the
+other small parts are in the JSON section and are loaded eagerly.
+"""
+
+import json
+import mmap
+import os
+import struct
+from array import array
+from bisect import bisect_left
+from collections.abc import Mapping
+from itertools import repeat
+from operator import add
+
+from accounts import AccountTable, account_key
+from ledger import LedgerError, _fsync_dir
+from txstore import AccountHistory, TransactionStore
+
+MAGIC = b"BANKSNAP"
+FORMAT_VERSION = 1
+HEADER = struct.Struct("<8sIIQQ")
+ENTRY = struct.Struct("<32sQQ")
+ALIGN = 8
+# Account columns are mapped on their own; mmap offsets must be a multiple
+# of the allocation granularity, which is at most 64 KiB
+PAGE = 65536
+ACCOUNT_COLUMNS = (('ids', 'q'), ('holders', 'I'), ('types', 'B'), ('balances', 'q'), ('openings', 'q'),
+                   ('owners', 'I'))
+HISTORY_COLUMNS = (('timestamps', 'q'), ('types', 'B'), ('amounts', 'q'))
+
+
+class Snapshot:
+    """An open snapshot file: its sections as memoryviews, and its state."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, version, count, directory, self.lsn = HEADER.unpack_from(self.map, 0)
+            if magic != MAGIC:
+                raise LedgerError("Not a bank snapshot: " + path)
+            if version != FORMAT_VERSION:
+                raise LedgerError(f"Unsupported snapshot version {version}: {path}")
+            self.sections = {}
+            for index in range(count):
+                name, offset, length = ENTRY.unpack_from(self.map, directory + index * ENTRY.size)
+                self.sections[name.rstrip(b"\0").decode()] = (offset, length)
+            # Mapped copy-on-write so the bank can update them in place
+            self.account_columns = {}
+            for name, typecode in ACCOUNT_COLUMNS:
+                offset, length = self.sections["accounts." + name]
+                if length:
+                    column = memoryview(mmap.mmap(f.fileno(), length, access=mmap.ACCESS_COPY, offset=offset))
+                else:
+                    column = memoryview(bytearray())
+                self.account_columns[name] = column.cast(typecode)
+        self.state = json.loads(bytes(self.section("state")))
+
+    def section(self, name):
+        offset, length = self.sections[name]
+        return memoryview(self.map)[offset:offset + length]
+
+    def column(self, name, typecode):
+        return self.section(name).cast(typecode)
+
+    def strings(self, name, lead=()):
+        return StringTable(self.column(name + ".offsets", 'q'), self.section(name + ".data"), lead)
+
+
+class StringTable:
+    """Strings by code: those stored in a snapshot, then any added since.
+
+    `lead` holds the codes before the stored ones (the None of owner
+    code 0).
+    """
+
+    __slots__ = ('lead', 'offsets', 'data', 'stored', 'added')
+
+    def __init__(self, offsets, data, lead=()):
+        self.lead = list(lead)
+        self.offsets = offsets
+        self.data = data
+        self.stored = len(offsets) - 1
+        self.added = []
+
+    def __len__(self):
+        return len(self.lead) + self.stored + len(self.added)
+
+    def __getitem__(self, code):
+        if isinstance(code, slice):
+            return [self[i] for i in range(*code.indices(len(self)))]
+        index = code - len(self.lead)
+        if index < 0:
+            return self.lead[code]
+        if index < self.stored:
+            offsets = self.offsets
+            return str(self.data[offsets[index]:offsets[index + 1]], "utf-8")
+        return self.added[index - self.stored]
+
+    def __iter__(self):
+        for code in range(len(self)):
+            yield self[code]
+
+    def append(self, name):
+        self.added.append(name)
+
+    def raw(self, index):
+        """The UTF-8 bytes of stored string `index` (not counting `lead`)."""
+        offsets = self.offsets
+        return bytes(self.data[offsets[index]:offsets[index + 1]])
+
+    def find(self, encoded, order=None):
+        """The stored index of `encoded`, or None.
+
+        `order` lists stored indexes in name order; by default the table
+        itself is in name order.
+        """
+        if order is None:
+            order = range(self.stored)
+        position, found = _position(order, encoded, self.raw)
+        return order[position] if found else None
+
+
+class NameCodes(dict):
+    """name -> code of a StringTable, found in the snapshot's name order and then cached."""
+
+    def __init__(self, names, order):
+        super().__init__()
+        self.names = names
+        self.order = order
+
+    def get(self, name, default=None):
+        code = dict.get(self, name)
+        if code is None and isinstance(name, str):
+            index = self.names.find(name.encode(), self.order)
+            if index is not None:
+                code = self[name] = index + len(self.names.lead)
+        return default if code is None else code
+
+
+class SortedIndex(dict):
+    """account id -> row, found by bisecting the snapshot's sorted ids and then cached.
+
+    Rows added since the snapshot are ordinary entries.
+    """
+
+    def __init__(self, sorted_ids, rows):
+        super().__init__()
+        self.sorted_ids = sorted_ids
+        self.rows = rows
+
+    def _find(self, key):
+        if key is None:
+            return None
+        ids = self.sorted_ids
+        position = bisect_left(ids, key)
+        if position < len(ids) and ids[position] == key:
+            row = self[key] = self.rows[position]
+            return row
+        return None
+
+    def __missing__(self, key):
+        row = self._find(key)
+        if row is None:
+            raise KeyError(key)
+        return row
+
+    def get(self, key, default=None):
+        row = dict.get(self, key)
+        if row is None:
+            row = self._find(key)
+        return default if row is None else row
+
+    def __contains__(self, key):
+        return dict.__contains__(self, key) or self._find(key) is not None
+
+
+class RowGroups(dict):
+    """owner code -> array of rows, copied out of the snapshot the first time a code is used."""
+
+    def __init__(self, offsets, rows):
+        super().__init__()
+        self.offsets = offsets
+        self.rows = rows
+
+    def _load(self, code):
+        offsets = self.offsets
+        if 0 <= code < len(offsets) - 1 and offsets[code] < offsets[code + 1]:
+            group = array('I')
+            group.frombytes(self.rows[offsets[code]:offsets[code + 1]].cast('B'))
+            # Two threads may load the same code; both keep the first
+            return dict.setdefault(self, code, group)
+        return None
+
+    def __missing__(self, code):
+        group = self._load(code)
+        if group is None:
+            raise KeyError(code)
+        return group
+
+    def get(self, code, default=None):
+        group = dict.get(self, code)
+        if group is None:
+            group = self._load(code)
+        return default if group is None else group
+
+    def setdefault(self, code, default=None):
+        group = self.get(code)
+        return dict.setdefault(self, code, default) if group is None else group
+
+
+class StoredHistories:
+    """The transaction histories in a snapshot, found by bisecting their account ids."""
+
+    def __init__(self, snapshot):
+        self.ids = snapshot.column("history.ids", 'q')
+        self.offsets = snapshot.column("history.offsets", 'q')
+        self.columns = [snapshot.column("history." + name, typecode) for name, typecode in HISTORY_COLUMNS]
+
+    def find(self, account_number):
+        key = account_key(account_number)
+        if key is None:
+            return None
+        ids = self.ids
+        position = bisect_left(ids, key)
+        if position < len(ids) and ids[position] == key:
+            return position
+        return None
+
+    def view(self, store, position):
+        """The history at `position`, read in place (so read-only)."""
+        start, end = self.offsets[position], self.offsets[position + 1]
+        history = AccountHistory(store)
+        history.timestamps, history.types, history.amounts = [column[start:end] for column in self.columns]
+        return history
+
+    def copy(self, store, position):
+        """The history at `position` as arrays, to append to."""
+        start, end = self.offsets[position], self.offsets[position + 1]
+        history = AccountHistory(store)
+        for column, stored in zip((history.timestamps, history.types, history.amounts), self.columns):
+            column.frombytes(stored[start:end].cast('B'))
+        return history
+
+    def numbers(self):
+        for key in self.ids:
+            yield str(key)[1:]
+
+
+class StoredUsers(Mapping):
+    """Bank.users read from a snapshot: a user's record is decoded when first looked up.
+
+    Looked-up and new users live in `loaded`, which is what is changed
+    and what write() re-encodes.
+    """
+
+    def __init__(self, snapshot):
+        self.names = snapshot.strings("users.names")
+        self.records = snapshot.strings("users.records")
+        self.loaded = {}
+        # Stored users that are also in `loaded`
+        self.overlap = 0
+
+    def _find(self, username):
+        if not isinstance(username, str):
+            return None
+        return self.names.find(username.encode())
+
+    def __getitem__(self, username):
+        user = self.loaded.get(username)
+        if user is None:
+            index = self._find(username)
+            if index is None:
+                raise KeyError(username)
+            user = json.loads(self.records.raw(index))
+            if self.loaded.setdefault(username, user) is user:
+                self.overlap += 1
+            user = self.loaded[username]
+        return user
+
+    def __setitem__(self, username, user):
+        if username not in self.loaded and self._find(username) is not None:
+            self.overlap += 1
+        self.loaded[username] = user
+
+    def __contains__(self, username):
+        return username in self.loaded or self._find(username) is not None
+
+    def __iter__(self):
+        yield from list(self.loaded)
+        loaded = self.loaded
+        for index in range(self.names.stored):
+            username = self.names[index]
+            if username not in loaded:
+                yield username
+
+    def __len__(self):
+        return self.names.stored + len(self.loaded) - self.overlap
+
+
+def account_table(snapshot):
+    """An AccountTable whose columns and indexes are read from `snapshot`."""
+    table = AccountTable()
+    for name, _ in ACCOUNT_COLUMNS:
+        setattr(table, name, snapshot.account_columns[name])
+    table.index = SortedIndex(snapshot.column("accounts.sorted_ids", 'q'),
+                              snapshot.column("accounts.sorted_rows", 'I'))
+    table.holder_names = snapshot.strings("holders")
+    table.holder_codes = NameCodes(table.holder_names, snapshot.column("holders.order", 'I'))
+    table.owner_names = snapshot.strings("owners", lead=[None])
+    table.owner_codes = NameCodes(table.owner_names, snapshot.column("owners.order", 'I'))
+    table.owner_rows = RowGroups(snapshot.column("owner_rows.offsets", 'q'), snapshot.column("owner_rows.rows", 'I'))
+    for name in snapshot.state['account_types']:
+        table.type_code(name)
+    return table
+
+
+def transaction_store(snapshot):
+    """A TransactionStore that reads its histories from `snapshot`."""
+    store = TransactionStore()
+    for name in snapshot.state['transaction_types']:
+        store.type_code(name)
+    store.stored = StoredHistories(snapshot)
+    return store
+
+
+class _Writer:
+    def __init__(self, f):
+        self.f = f
+        self.offset = HEADER.size
+        self.sections = []
+        f.write(bytes(HEADER.size))
+
+    def begin(self, name, align=ALIGN):
+        padding = -self.offset % align
+        if padding:
+            self.f.write(bytes(padding))
+            self.offset += padding
+        self.sections.append([name, self.offset, 0])
+
+    def write(self, data):
+        size = memoryview(data).nbytes
+        if size:
+            self.f.write(data)
+            self.offset += size
+            self.sections[-1][2] += size
+
+    def section(self, name, data, align=ALIGN):
+        self.begin(name, align)
+        self.write(data)
+
+    def finish(self, lsn):
+        padding = -self.offset % ALIGN
+        self.f.write(bytes(padding))
+        directory = self.offset + padding
+        for name, offset, length in self.sections:
+            self.f.write(ENTRY.pack(name.encode(), offset, length))
+        self.f.seek(0)
+        self.f.write(HEADER.pack(MAGIC, FORMAT_VERSION, len(self.sections), directory, lsn))
+
+
+def _plan(count, find, keys, payloads):
+    """How to merge changed entries into `count` sorted stored ones.
+
+    `keys` are sorted and `find(key)` gives (position, stored) in the
+    stored order. Returns steps: ('copy', start, end) for a run of stored
+    entries, or ('put', keys, payloads) for changed ones, which replace
+    any stored entry of the same key.
+    """
+    if not count:
+        return [('put', keys, payloads)] if keys else []
+    steps = []
+    start = 0
+    run_keys = []
+    run_payloads = []
+    for key, payload in zip(keys, payloads):
+        position, stored = find(key)
+        if position > start:
+            if run_keys:
+                steps.append(('put', run_keys, run_payloads))
+                run_keys, run_payloads = [], []
+            steps.append(('copy', start, position))
+        run_keys.append(key)
+        run_payloads.append(payload)
+        start = position + 1 if stored else position
+    if run_keys:
+        steps.append(('put', run_keys, run_payloads))
+    if start < count:
+        steps.append(('copy', start, count))
+    return steps
+
+
+def _write_column(writer, name, typecode, plan, stored, part):
+    """One fixed-width section: stored runs and, per put, its keys (part 1) or payloads (part 2)."""
+    writer.begin(name)
+    for step in plan:
+        if step[0] == 'copy':
+            writer.write(stored[step[1]:step[2]])
+        else:
+            writer.write(array(typecode, step[part]))
+
+
+def _write_groups(writer, prefix, plan, offsets, columns):
+    """The .offsets and value sections of grouped entries.
+
+    `columns` is (section name, stored values, payload index) per value
+    column; a put's payloads are tuples of one buffer per column.
+    """
+    lengths_from = columns[0][2]
+    writer.begin(prefix + ".offsets")
+    position = 0
+    for step in plan:
+        if step[0] == 'copy':
+            start, end = offsets[step[1]], offsets[step[2]]
+            run = offsets[step[1]:step[2]]
+            writer.write(run if position == start else array('q', map(add, run, repeat(position - start))))
+            position += end - start
+        else:
+            starts = array('q')
+            for payload in step[2]:
+                starts.append(position)
+                position += len(payload[lengths_from])
+            writer.write(starts)
+    writer.write(array('q', [position]))
+    for name, stored, index in columns:
+        writer.begin(name)
+        for step in plan:
+            if step[0] == 'copy':
+                writer.write(stored[offsets[step[1]]:offsets[step[2]]])
+            else:
+                for payload in step[2]:
+                    writer.write(payload[index])
+
+
+def _write_strings(writer, name, names, codes, lead=0):
+    """A code-ordered string table and its name order, appending names added since the snapshot."""
+    if isinstance(names, StringTable):
+        stored = names.stored
+        added = [name.encode() for name in names.added]
+        offsets, data, order = names.offsets, names.data, codes.order
+    else:
+        stored = 0
+        added = [name.encode() for name in names[lead:]]
+        offsets = data = order = None
+    plan = ([('copy', 0, stored)] if stored else []) + ([('put', None, [(name,) for name in added])]
+                                                        if added else [])
+    _write_groups(writer, name, plan, offsets, [(name + ".data", data, 0)])
+    new = sorted(range(stored, stored + len(added)), key=lambda index: added[index - stored])
+    plan = _plan(stored, lambda index: _position(order, added[index - stored], names.raw), new, new)
+    _write_column(writer, name + ".order", 'I', plan, order, 2)
+
+
+def _position(order, key, raw=None):
+    """Where `key` is in `order`, and whether it is there; `raw` maps an element to its key."""
+    position = bisect_left(order, key, key=raw)
+    if position == len(order):
+        return position, False
+    return position, (order[position] if raw is None else raw(order[position])) == key
+
+
+def _write_accounts(writer, table):
+    for name, _ in ACCOUNT_COLUMNS:
+        writer.begin("accounts." + name, PAGE)
+        writer.write(getattr(table, name))
+    ids = table.ids
+    index = table.index
+    if isinstance(index, SortedIndex):
+        sorted_ids, sorted_rows = index.sorted_ids, index.rows
+    else:
+        sorted_ids = sorted_rows = array('q')
+    new = sorted(range(len(sorted_rows), len(ids)), key=ids.__getitem__)
+    keys = [ids[row] for row in new]
+    plan = _plan(len(sorted_rows), lambda key: _position(sorted_ids, key), keys, new)
+    _write_column(writer, "accounts.sorted_ids", 'q', plan, sorted_ids, 1)
+    _write_column(writer, "accounts.sorted_rows", 'I', plan, sorted_rows, 2)
+
+    _write_strings(writer, "holders", table.holder_names, table.holder_codes)
+    _write_strings(writer, "owners", table.owner_names, table.owner_codes, lead=1)
+
+    groups = table.owner_rows
+    if isinstance(groups, RowGroups):
+        offsets, rows = groups.offsets, groups.rows
+        stored = len(offsets) - 1
+    else:
+        offsets = rows = None
+        stored = 0
+    codes = sorted(set(dict.keys(groups)) | set(range(stored, len(table.owner_names))))
+    empty = array('I')
+    plan = _plan(stored, lambda code: (min(code, stored), code < stored), codes,
+                 [(dict.get(groups, code, empty),) for code in codes])
+    _write_groups(writer, "owner_rows", plan, offsets, [("owner_rows.rows", rows, 0)])
+
+
+def _write_histories(writer, store):
+    stored = store.stored
+    histories = sorted((account_key(account_number), history) for account_number, history in store.histories.items())
+    keys = [key for key, _ in histories]
+    payloads = [(history.timestamps, history.types, history.amounts) for _, history in histories]
+    if stored is not None:
+        ids, offsets, columns = stored.ids, stored.offsets, stored.columns
+        plan = _plan(len(ids), lambda key: _position(ids, key), keys, payloads)
+    else:
+        ids = offsets = None
+        columns = [None] * len(HISTORY_COLUMNS)
+        plan = _plan(0, None, keys, payloads)
+    _write_column(writer, "history.ids", 'q', plan, ids, 1)
+    _write_groups(writer, "history", plan, offsets,
+                  [("history." + name, column, index)
+                   for index, ((name, _), column) in enumerate(zip(HISTORY_COLUMNS, columns))])
+
+
+def _write_users(writer, users):
+    if isinstance(users, StoredUsers):
+        names, records = users.names, users.records
+        entries = users.loaded
+    else:
+        names = records = StringTable(array('q', [0]), b"")
+        entries = users
+    entries = sorted((username.encode(), json.dumps(user, separators=(",", ":")).encode())
+                     for username, user in entries.items())
+    plan = _plan(names.stored, lambda name: _position(range(names.stored), name, names.raw),
+                 [name for name, _ in entries], entries)
+    _write_groups(writer, "users.names", plan, names.offsets, [("users.names.data", names.data, 0)])
+    _write_groups(writer, "users.records", plan, records.offsets, [("users.records.data", records.data, 1)])
+
+
+def write(path, bank, lsn):
+    """Write `bank` as a binary snapshot at `path`, replacing it atomically.
+
+    Call with every account lock held.
+    """
+    table = bank.accounts
+    store = bank.transaction_history
+    state = bank._dump_state(columns=False)
+    state['account_types'] = table.type_names
+    state['transaction_types'] = store.type_names
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        writer = _Writer(f)
+        writer.section("state", json.dumps(state, separators=(",", ":")).encode())
+        _write_accounts(writer, table)
+        _write_histories(writer, store)
+        _write_users(writer, bank.users)
+        writer.finish(lsn)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    _fsync_dir(os.path.dirname(os.path.abspath(path)))
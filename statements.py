@@ -0,0 +1,298 @@
+"""Statements for every account, streamed to compressed files.
+
+    python statements.py --data-dir bank_data --out statements [--start 2024-05-01] [--end 2024-06-01]
+                         [--format csv|jsonl] [--processes N]
+
+A statement is one account's transactions in the period [start, end), each
+with the balance after it, between an opening_balance and a
+closing_balance record. The opening balance is the account's opening
+balance plus every transaction before `start`. A debit reserved by a
+prepared cross-shard transfer is not in the history yet, so it shows up
+on the statement that has its transfer_out.
+
+The book is split into ranges of accounts_per_file rows, and each range is
+written to its own gzip file (statements-00000.csv.gz, ...). With more
+than one process, a pool of spawned workers writes them: the calling
+process works out each account's balance at the start of the period,
+copies it, the account numbers and only the period's slice of each
+history into bytes, and sends them with the task a few ranges ahead of
+the workers, so a worker shares nothing with the bank or with any other
+write() running at the same time. With one process the
+statements are read from the bank's columns directly. Every statement is
+a generator over the period's entries and every record is written as it
+is made, so memory grows neither with the book nor with the length of a
+history.
+
+Each history is read up to the entries that existed when it was reached:
+histories are append-only, so a statement is consistent with itself even
+while the bank takes writes. For a period that has ended, every statement
+is final. Amounts and balances are paise; timestamps are ISO-8601.
+"""
+
+import argparse
+import csv
+import gzip
+import json
+import multiprocessing
+import os
+import time
+from array import array
+from bisect import bisect_left
+from collections import deque
+from datetime import datetime
+from functools import lru_cache
+from itertools import compress, islice
+
+from txstore import to_timestamp_us
+
+COLUMNS = ('account_number', 'timestamp', 'type', 'amount', 'balance')
+ACCOUNTS_PER_FILE = 50000
+COMPRESS_LEVEL = 6
+MINUTE_CACHE = 65536
+# Account numbers are looked up this many rows at a time
+NUMBERS_CHUNK = 1024
+
+# Ranges sent to the workers ahead of the ones being written, per worker
+PARTS_AHEAD = 2
+
+# A worker's settings (format, period, type names), set by _start_worker
+_book = None
+
+
+def statement(opening, entries, names, credit, start=None, end=None):
+    """Yield the (timestamp_us, type, amount, balance) records of one account.
+
+    `opening` is its balance at `start` and `entries` its (timestamp_us,
+    type code, amount) transactions in [start, end), oldest first (see
+    _period). The first record is the opening_balance and the last the
+    closing_balance (amount None, timestamp the period bound or None).
+    `names[code]` is a type code's name, and `credit[code]` is True for
+    the credit types.
+    """
+    balance = opening
+    yield start, 'opening_balance', None, balance
+    for timestamp, code, amount in entries:
+        balance += amount if credit[code] else -amount
+        yield timestamp, names[code], amount, balance
+    yield end, 'closing_balance', None, balance
+
+
+def _period(opening, history, credit, start, end):
+    """(balance at start, low, high): an account's entries in [start, end) are rows [low, high).
+
+    `opening` is the account's opening balance and `history` its
+    (timestamps, types, amounts) columns, or None.
+    """
+    if history is None:
+        return opening, 0, 0
+    timestamps, types, amounts = history
+    # A concurrent append may have reached only some of the columns
+    length = min(len(timestamps), len(types), len(amounts))
+    low = 0 if start is None else bisect_left(timestamps, start, 0, length)
+    high = length if end is None else bisect_left(timestamps, end, low, length)
+    if low:
+        credits = sum(compress(islice(amounts, low), map(credit.__getitem__, islice(types, low))))
+        opening += 2 * credits - sum(islice(amounts, low))
+    return opening, low, high
+
+
+@lru_cache(maxsize=MINUTE_CACHE)
+def _minute(minute):
+    # Local UTC offsets are whole minutes, so the rest is the same in every zone
+    return datetime.fromtimestamp(minute * 60).isoformat()[:17]
+
+
+def _iso(timestamp):
+    """to_datetime(timestamp).isoformat(), formatting each local minute once."""
+    if timestamp is None:
+        return ""
+    minute, micros = divmod(timestamp, 60000000)
+    prefix = _minute(minute)
+    seconds, micros = divmod(micros, 1000000)
+    return f"{prefix}{seconds:02d}.{micros:06d}" if micros else f"{prefix}{seconds:02d}"
+
+
+def _write_csv(f, account_number, records):
+    writerow = csv.writer(f).writerow
+    count = 0
+    for timestamp, name, amount, balance in records:
+        writerow((account_number, _iso(timestamp), name, "" if amount is None else amount, balance))
+        count += 1
+    return count
+
+
+def _write_jsonl(f, account_number, records):
+    count = 0
+    for timestamp, name, amount, balance in records:
+        record = {'account_number': account_number, 'timestamp': _iso(timestamp) or None, 'type': name,
+                  'amount': amount, 'balance': balance}
+        f.write(json.dumps(record, separators=(",", ":")))
+        f.write("\n")
+        count += 1
+    return count
+
+
+WRITERS = {'csv': _write_csv, 'jsonl': _write_jsonl}
+
+
+def _columns(history):
+    """An account's history as (timestamps, types, amounts), or None."""
+    if history is None:
+        return None
+    return history.timestamps, history.types, history.amounts
+
+
+def _accounts(table, store, low, high):
+    """Yield (account_number, opening balance, history columns) of rows [low, high)."""
+    openings = table.openings
+    for chunk in range(low, high, NUMBERS_CHUNK):
+        rows = range(chunk, min(chunk + NUMBERS_CHUNK, high))
+        for row, account_number in zip(rows, table.numbers(rows)):
+            yield account_number, openings[row], _columns(store.get(account_number))
+
+
+def _in_period(book, accounts):
+    """Yield (account_number, balance at start, entries in the period) of _accounts() triples."""
+    credit = book['credit']
+    start = book['start']
+    end = book['end']
+    for account_number, opening, history in accounts:
+        opening, low, high = _period(opening, history, credit, start, end)
+        yield account_number, opening, zip(*(islice(column, low, high) for column in history)) if high > low else ()
+
+
+def _cut(book, table, store, index, low, high):
+    """Rows [low, high) copied into bytes: the task a worker writes one file from.
+
+    Only each account's balance at the start of the period and its
+    entries in the period are copied, however long its history is.
+    """
+    credit = book['credit']
+    start = book['start']
+    end = book['end']
+    numbers = []
+    openings = array('q')
+    periods = []
+    for account_number, opening, history in _accounts(table, store, low, high):
+        opening, first, last = _period(opening, history, credit, start, end)
+        numbers.append(account_number)
+        openings.append(opening)
+        # Slices are copies, so a writer appending meanwhile is not held up
+        periods.append(tuple(column[first:last].tobytes() for column in history) if last > first else None)
+    return index, numbers, openings.tobytes(), periods
+
+
+def _start_worker(book):
+    global _book
+    _book = book
+
+
+def _write_cut(part):
+    """Write one range made by _cut(); runs in a worker process."""
+    index, numbers, openings, periods = part
+    entries = [() if period is None else
+               zip(memoryview(period[0]).cast('q'), period[1], memoryview(period[2]).cast('q'))
+               for period in periods]
+    return _write_file(_book, index, zip(numbers, memoryview(openings).cast('q'), entries))
+
+
+def _write_file(book, index, accounts):
+    """Write the statements of (account_number, balance at start, entries) triples to one file."""
+    credit = book['credit']
+    names = book['names']
+    write = WRITERS[book['format']]
+    path = os.path.join(book['out_dir'], f"statements-{index:05d}.{book['format']}.gz")
+    records = statements = 0
+    with open(path, "wb") as raw:
+        # Closing the gzip stream writes its trailer, which the fsync must cover
+        with gzip.open(raw, "wt", compresslevel=COMPRESS_LEVEL, newline="") as f:
+            if book['format'] == 'csv':
+                csv.writer(f).writerow(COLUMNS)
+            for account_number, opening, entries in accounts:
+                records += write(f, account_number,
+                                 statement(opening, entries, names, credit, book['start'], book['end']))
+                statements += 1
+        raw.flush()
+        os.fsync(raw.fileno())
+    return {'file': path, 'statements': statements, 'entries': records - 2 * statements}
+
+
+def write(bank, out_dir, start=None, end=None, format="csv", processes=None, accounts_per_file=None):
+    """Write a statement for every account of `bank` under out_dir; see Bank.write_statements."""
+    from bank import CREDIT_TYPES
+    if format not in WRITERS:
+        raise ValueError("Unknown statement format: " + str(format))
+    accounts_per_file = accounts_per_file or ACCOUNTS_PER_FILE
+    table = bank.accounts
+    store = bank.transaction_history
+    os.makedirs(out_dir, exist_ok=True)
+    rows = len(table)
+    parts = [(index, low, min(low + accounts_per_file, rows))
+             for index, low in enumerate(range(0, rows, accounts_per_file))]
+    if processes is None:
+        processes = os.cpu_count() or 1
+    processes = max(1, min(processes, len(parts)))
+    started = time.perf_counter()
+    names = list(store.type_names)
+    credit = [name in CREDIT_TYPES for name in names]
+    book = {
+        'names': names,
+        'credit': credit + [False] * (256 - len(credit)),
+        'format': format,
+        'out_dir': out_dir,
+        'start': None if start is None else _timestamp_us(start),
+        'end': None if end is None else _timestamp_us(end),
+    }
+    if processes > 1:
+        files = []
+        with multiprocessing.get_context("spawn").Pool(processes, _start_worker, (book,)) as pool:
+            pending = deque()
+            for part in parts:
+                pending.append(pool.apply_async(_write_cut, (_cut(book, table, store, *part),)))
+                if len(pending) >= PARTS_AHEAD * processes:
+                    files.append(pending.popleft().get())
+            files.extend(result.get() for result in pending)
+    else:
+        files = [_write_file(book, index, _in_period(book, _accounts(table, store, low, high)))
+                 for index, low, high in parts]
+    elapsed = time.perf_counter() - started
+    files.sort(key=lambda summary: summary['file'])
+    return {
+        'statements': rows,
+        'entries': sum(summary['entries'] for summary in files),
+        'files': files,
+        'processes': processes,
+        'seconds': round(elapsed, 3),
+        'statements_per_second': round(rows / elapsed, 1) if elapsed else None,
+    }
+
+
+def _timestamp_us(value):
+    return value if isinstance(value, int) else to_timestamp_us(value)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write a statement for every account")
+    parser.add_argument("--data-dir", required=True, help="the bank's ledger directory")
+    parser.add_argument("--out", required=True, help="directory to write the statement files to")
+    parser.add_argument("--start", help="first day of the period (ISO date), inclusive")
+    parser.add_argument("--end", help="day after the period (ISO date), exclusive")
+    parser.add_argument("--format", choices=sorted(WRITERS), default="csv")
+    parser.add_argument("--processes", type=int, help="worker processes (default: one per CPU)")
+    parser.add_argument("--accounts-per-file", type=int, default=ACCOUNTS_PER_FILE)
+    args = parser.parse_args()
+
+    from bank import Bank
+    bank = Bank(data_dir=args.data_dir)
+    try:
+        result = bank.write_statements(args.out, args.start, args.end, args.format, args.processes,
+                                       args.accounts_per_file)
+    finally:
+        bank.close()
+    rate = result['statements_per_second']
+    print(f"{result['statements']} statements, {result['entries']} entries in {len(result['files'])} files: "
+          f"{result['seconds']} s" + (f", {rate:,.0f} statements/s" if rate is not None else ""))
+
+
+if __name__ == "__main__":
+    main()
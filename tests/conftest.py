@@ -0,0 +1,28 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bank import Bank  # noqa: E402
+
+# Cheap scrypt parameters: the tests exercise storage, not hashing cost
+FAST_KDF = {'n': 16, 'r': 1, 'p': 1}
+
+
+@pytest.fixture
+def open_bank(tmp_path):
+    """Open (or reopen) a bank journalled under tmp_path; closes them all afterwards."""
+    banks = []
+
+    def open_bank(**options):
+        options.setdefault('snapshot_every', 0)
+        options.setdefault('kdf_params', FAST_KDF)
+        bank = Bank(data_dir=str(tmp_path), **options)
+        banks.append(bank)
+        return bank
+
+    yield open_bank
+    for bank in banks:
+        bank.close()
@@ -0,0 +1,44 @@
+import pytest
+
+from accounts import AccountTable, account_key
+
+
+def table_of(*accounts):
+    table = AccountTable()
+    for account_number, holder, account_type, balance in accounts:
+        table[account_number] = {'account_holder': holder, 'type': account_type, 'balance': balance}
+    return table
+
+
+def test_rows_read_and_write_like_dicts():
+    table = table_of(("100000001", "Asha Rao", "savings", 50000), ("100000002", "Ravi Iyer", "checking", 100))
+    account = table["100000001"]
+    account['balance'] += 2500
+    assert table["100000001"] == {'account_holder': "Asha Rao", 'type': "savings", 'balance': 52500}
+    assert table.get("999999999") is None and "999999999" not in table
+    with pytest.raises(KeyError):
+        table["999999999"]
+    assert list(table) == ["100000001", "100000002"]
+    assert [account['balance'] for account in table.values()] == [52500, 100]
+    assert table.total_balance() == 52600
+    # Names and types are interned, one code each
+    table["100000003"] = {'account_holder': "Asha Rao", 'type': "savings", 'balance': 0}
+    assert table.holder_names == ["Asha Rao", "Ravi Iyer"] and table.type_names == ["savings", "checking"]
+
+
+def test_leading_zeros_stay_distinct():
+    assert account_key("000123456789") != account_key("123456789")
+    assert account_key("12a") is None and account_key("1" * 19) is None
+    table = table_of(("000123456789", "Asha Rao", "savings", 1), ("123456789", "Ravi Iyer", "savings", 2))
+    assert (table["000123456789"]['balance'], table["123456789"]['balance']) == (1, 2)
+    assert list(table) == ["000123456789", "123456789"]
+    with pytest.raises(ValueError):
+        table["12a"] = {'account_holder': "Asha Rao", 'type': "savings", 'balance': 0}
+
+
+def test_dump_and_load_round_trip():
+    table = table_of(("100000001", "Asha Rao", "savings", 50000), ("100000002", "Ravi Iyer", "checking", 100))
+    table.extend(["100000003", "100000004"], ["Mira Das", "Asha Rao"], ["investment", "savings"], [7, 8])
+    loaded = AccountTable.load(table.dump())
+    assert dict(loaded.items()) == dict(table.items())
+    assert loaded.row("100000004") == 3
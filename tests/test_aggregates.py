@@ -0,0 +1,66 @@
+from datetime import datetime, timezone
+
+import pytest
+
+from bank import Bank
+from conftest import FAST_KDF
+
+
+@pytest.fixture
+def bank():
+    bank = Bank(kdf_params=FAST_KDF)
+    bank.open_account("100000001", "Asha Rao", "savings", 50000)
+    bank.open_account("100000002", "Ravi Iyer", "checking", 20000)
+    bank.open_account("100000003", "Mira Das", "savings", 30000)
+    bank.post_deposit("100000001", 1000)
+    bank.post_withdrawal("100000002", 500)
+    bank.transfer("100000003", "100000002", 2000)
+    bank.post_batch([("100000001", 300, 'deposit'), ("100000003", 100, 'withdrawal')])
+    bank.pay_bill('gas', "ABC12345", "100000001", 700)
+    return bank
+
+
+def test_treasury_keeps_running_totals(bank):
+    treasury = bank.treasury()
+    assert treasury['total_balance'] == bank.total_balance() == 100000 + 1000 - 500 + 300 - 100 - 700
+    assert treasury['by_account_type'] == {'savings': {'accounts': 2, 'balance': 78500},
+                                           'checking': {'accounts': 1, 'balance': 21500}}
+    assert treasury['day'] == datetime.now(timezone.utc).date().isoformat()
+    assert treasury['flows']['deposit'] == {'count': 2, 'amount': 1300}
+    assert treasury['flows']['transfer_in'] == {'count': 1, 'amount': 2000}
+    assert treasury['inflow'] == 1000 + 300 + 2000
+    assert treasury['outflow'] == 500 + 100 + 2000 + 700
+    assert bank.treasury("2000-01-01")['flows'] == {}
+
+
+def test_reconcile_agrees_with_the_book(bank):
+    report = bank.reconcile()
+    assert report['ok'] and report['problems'] == []
+    assert (report['accounts'], report['entries']) == (3, 7)
+
+
+def test_reconcile_reports_what_disagrees(bank):
+    bank.accounts["100000002"]['balance'] += 1
+    bank.aggregates.totals['deposit'][1] += 5
+    report = bank.reconcile()
+    assert not report['ok']
+    assert report['mismatched_accounts'] == 1
+    checks = {problem['check']: problem for problem in report['problems']}
+    assert checks['balance'] == {'check': 'balance', 'key': "100000002", 'balance': 21501, 'expected': 21500}
+    assert checks['totals']['key'] == 'deposit'
+    assert checks['totals']['aggregate'][1] - checks['totals']['recomputed'][1] == 5
+
+
+def test_totals_survive_a_restart(open_bank):
+    bank = open_bank()
+    bank.open_account("100000001", "Asha Rao", "savings", 50000)
+    bank.post_deposit("100000001", 1000)
+    before = bank.treasury()
+    bank.close()
+    bank = open_bank(snapshot_every=1)
+    assert bank.treasury() == before
+    bank.post_withdrawal("100000001", 200)
+    bank.close()
+    bank = open_bank()
+    assert bank.treasury()['total_balance'] == 50800
+    assert bank.reconcile()['ok']
@@ -0,0 +1,59 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from bank import Bank, BankError
+from conftest import FAST_KDF
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def bank():
+    bank = Bank(kdf_params=FAST_KDF)
+    bank.register_user("asha_1", "asha1@example.com", "Secret123")
+    bank.open_account("100000001", "Asha Rao", "savings", 50000, owner="asha_1")
+    bank.open_account("100000002", "Ravi Iyer", "checking", 20000)
+    return bank
+
+
+def test_operations_return_results(bank):
+    assert bank.post_deposit("100000001", 2500) == {'account_number': "100000001", 'amount': 2500,
+                                                     'balance': 52500}
+    assert bank.post_withdrawal("100000001", 500)['balance'] == 52000
+    result = bank.transfer("100000001", "100000002", 2000)
+    assert (result['from_balance'], result['to_balance']) == (50000, 22000)
+    assert [entry['type'] for entry in bank.get_transactions("100000001")] == \
+        ['deposit', 'withdrawal', 'transfer_out']
+    assert bank.get_account("100000002") == {'account_number': "100000002", 'account_holder': "Ravi Iyer",
+                                             'type': 'checking', 'balance': 22000}
+
+
+@pytest.mark.parametrize("call, message", [
+    (lambda bank: bank.post_deposit("999999999", 100), "Account does not exist"),
+    (lambda bank: bank.post_deposit("100000001", 0), "Amount to deposit must be positive"),
+    (lambda bank: bank.post_withdrawal("100000002", 30000), "Insufficient balance."),
+    (lambda bank: bank.transfer("100000001", "999999999", 100), "Recipient account does not exist"),
+    (lambda bank: bank.open_account("100000001", "Asha Rao", "savings", 50000), "Account number already exists"),
+    (lambda bank: bank.open_account("100000003", "Asha Rao", "current", 50000), "Invalid account type"),
+    (lambda bank: bank.register_user("asha_1", "x1@example.com", "Secret123"), "Username already exists"),
+])
+def test_rejections_raise_bank_error(bank, call, message):
+    total = bank.total_balance()
+    with pytest.raises(BankError) as error:
+        call(bank)
+    assert str(error.value) == message
+    assert bank.total_balance() == total
+
+
+def test_importing_bank_has_no_side_effects(tmp_path):
+    # Run in a clean interpreter so modules loaded by other tests do not count
+    code = ("import sys, bank; "
+            "print(sorted(name for name in ('datetime', 'ledger', 're', 'json', 'accounts') "
+            "if name in sys.modules))")
+    output = subprocess.run([sys.executable, "-c", code], cwd=tmp_path, capture_output=True, text=True,
+                            env={'PYTHONPATH': ROOT}, check=True)
+    assert output.stdout.strip() == "[]"
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,63 @@
+import pytest
+
+from bank import Bank, BatchRejected
+
+
+@pytest.fixture
+def bank():
+    bank = Bank()
+    bank.open_account("100000001", "Asha Rao", "savings", 50000)
+    bank.open_account("100000002", "Ravi Iyer", "checking", 20000)
+    return bank
+
+
+def test_lines_are_checked_against_running_balances(bank):
+    result = bank.post_batch([("100000002", 15000, 'withdrawal'),
+                              ("100000002", 10000, 'deposit'),
+                              ("100000002", 15000, 'withdrawal')])
+    assert result == {'posted': 3, 'rejected': []}
+    assert bank.get_balance("100000002") == 0
+    assert [entry['amount'] for entry in bank.get_transactions("100000002")] == [15000, 10000, 15000]
+
+
+def test_columnar_batch(bank):
+    result = bank.post_batch({'account': ["100000001", "100000002"], 'amount': [100, 200],
+                              'type': ['deposit', 'withdrawal']})
+    assert result['posted'] == 2
+    assert (bank.get_balance("100000001"), bank.get_balance("100000002")) == (50100, 19800)
+
+
+BAD_LINES = [("999999999", 100, 'deposit'),
+             ("100000001", 0, 'deposit'),
+             ("100000001", 1.5, 'deposit'),
+             ("100000002", 90000, 'withdrawal'),
+             ("100000001", 100, 'refund')]
+
+
+def test_atomic_batch_rolls_back_every_line(bank):
+    with pytest.raises(BatchRejected) as error:
+        bank.post_batch([("100000001", 5000, 'deposit')] + BAD_LINES)
+    assert [index for index, _, _ in error.value.rejects] == [1, 2, 3, 4, 5]
+    assert [message for _, _, message in error.value.rejects] == [
+        "Account does not exist", "Amount must be positive", "Amount must be a whole number of paise",
+        "Insufficient balance.", "Invalid transaction type"]
+    assert bank.get_balance("100000001") == 50000
+    assert bank.get_transactions("100000001") == []
+    assert bank.get_balance("100000002") == 20000
+
+
+def test_non_atomic_batch_posts_the_good_lines(bank):
+    result = bank.post_batch([("100000001", 5000, 'deposit')] + BAD_LINES, atomic=False)
+    assert result['posted'] == 1
+    assert len(result['rejected']) == 5
+    assert bank.get_balance("100000001") == 55000
+
+
+def test_batch_is_replayed_from_the_ledger(open_bank):
+    bank = open_bank()
+    bank.open_account("100000001", "Asha Rao", "savings", 50000)
+    bank.post_batch([("100000001", 700, 'deposit'), ("100000001", 200, 'withdrawal')])
+    bank.close()
+    bank = open_bank()
+    assert bank.get_balance("100000001") == 50500
+    assert [entry['type'] for entry in bank.get_transactions("100000001")] == ['deposit', 'withdrawal']
@@ -0,0 +1,94 @@
+import csv
+
+import pytest
+
+import billing
+from bank import Bank, BankError
+
+
+@pytest.fixture
+def bank():
+    bank = Bank()
+    bank.open_account("100000001", "Asha Rao", "savings", 100000)
+    return bank
+
+
+def test_idempotency_key_pays_once(bank):
+    first = bank.pay_bill('electricity', "ABC12345", "100000001", 25000, idempotency_key="k1")
+    again = bank.pay_bill('electricity', "ABC12345", "100000001", 25000, idempotency_key="k1")
+    assert not first['duplicate'] and again['duplicate']
+    assert again['payment_id'] == first['payment_id']
+    assert bank.get_balance("100000001") == 75000
+    assert len(bank.bill_queue) == 1
+    assert bank.pay_bill('electricity', "ABC12345", "100000001", 25000)['payment_id'] != first['payment_id']
+
+
+def test_rejected_payments_debit_nothing(bank):
+    for call, message in [
+        (lambda: bank.pay_biller('water', "ABC12345", "100000001", 100), "Invalid biller"),
+        (lambda: bank.pay_bill('gas', "AB12345", "100000001", 100), "Invalid Customer ID"),
+        (lambda: bank.recharge_mobile('jio', "12345", 100, "100000001"), "Invalid mobile number"),
+        (lambda: bank.pay_bill('gas', "ABC12345", "999999999", 100), "Invalid transaction account"),
+        (lambda: bank.pay_bill('gas', "ABC12345", "100000001", 200000),
+         "Insufficient balance in transaction account"),
+    ]:
+        with pytest.raises(BankError) as error:
+            call()
+        assert str(error.value) == message
+    assert bank.get_balance("100000001") == 100000 and bank.bill_queue == []
+
+
+def test_batch_of_payments(bank):
+    result = bank.pay_bills([
+        {'biller': 'gas', 'reference': "ABC12345", 'transaction_account': "100000001", 'amount': 60000,
+         'idempotency_key': "a"},
+        {'biller': 'gas', 'reference': "ABC12345", 'transaction_account': "100000001", 'amount': 60000},
+        {'biller': 'jio', 'reference': "9876543210", 'transaction_account': "100000001", 'amount': 100},
+        {'biller': 'gas', 'reference': "ABC12345", 'transaction_account': "100000001", 'amount': 60000,
+         'idempotency_key': "a"},
+        {'biller': 'gas'},
+    ])
+    assert [payment['duplicate'] for payment in result['paid']] == [False, False, True]
+    assert result['rejected'] == [(1, "Insufficient balance in transaction account"),
+                                  (4, "Missing or invalid field")]
+    assert bank.get_balance("100000001") == 100000 - 60100
+
+
+def test_settlement_writes_one_file_per_biller(bank, tmp_path):
+    bank.pay_bill('gas', "ABC12345", "100000001", 1000)
+    bank.pay_bill('gas', "XYZ99999", "100000001", 2000)
+    bank.recharge_mobile('Jio', "9876543210", 500, "100000001")
+    result = bank.settle_bills(str(tmp_path))
+    assert result['batch'] == 1 and result['payments'] == 3
+    assert {name: summary['amount'] for name, summary in result['billers'].items()} == {'gas': 3000, 'jio': 500}
+    with open(result['billers']['gas']['file'], newline="") as f:
+        rows = list(csv.reader(f))
+    assert rows[0] == list(billing.SETTLEMENT_COLUMNS)
+    assert [row[1:3] for row in rows[1:]] == [["ABC12345", "1000"], ["XYZ99999", "2000"]]
+    assert bank.bill_queue == []
+    assert bank.settle_bills(str(tmp_path))['batch'] is None
+
+
+def test_queue_and_keys_survive_a_restart(open_bank, tmp_path):
+    bank = open_bank()
+    bank.open_account("100000001", "Asha Rao", "savings", 100000)
+    bank.pay_bill('gas', "ABC12345", "100000001", 1000, idempotency_key="k1")
+    bank.close()
+    bank = open_bank()
+    assert len(bank.bill_queue) == 1
+    assert bank.pay_bill('gas', "ABC12345", "100000001", 1000, idempotency_key="k1")['duplicate']
+    assert bank.settle_bills(str(tmp_path / "out"))['payments'] == 1
+    bank.close()
+    bank = open_bank()
+    assert bank.bill_queue == [] and bank.bill_batches == 1
+
+
+def test_registered_biller_is_payable(bank):
+    billing.register_biller('water', "Water Bill", 'customer_id', 'water_bill_payment', min_amount=500)
+    try:
+        with pytest.raises(BankError, match="Amount must be at least"):
+            bank.pay_biller('water', "ABC12345", "100000001", 100)
+        assert bank.pay_biller('water', "ABC12345", "100000001", 500)['balance'] == 99500
+        assert bank.get_transactions("100000001")[-1]['type'] == 'water_bill_payment'
+    finally:
+        del billing.BILLERS['water']
@@ -0,0 +1,75 @@
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from bank import Bank, BankError
+from concurrency import StripedLocks
+
+ACCOUNTS = ["1000000%02d" % i for i in range(8)]
+
+
+@pytest.fixture(autouse=True)
+def frequent_switches():
+    """Switch threads far more often than usual, so races show up."""
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    yield
+    sys.setswitchinterval(interval)
+
+
+def test_hold_takes_stripes_in_order_once():
+    locks = StripedLocks(4)
+    held = locks.hold("b", "a", "b")
+    assert list(held.indexes) == sorted({locks.stripe("a"), locks.stripe("b")})
+    with held:
+        assert all(locks.locks[index].locked() for index in held.indexes)
+    assert not any(lock.locked() for lock in locks.locks)
+
+
+def test_concurrent_transfers_keep_every_paisa():
+    bank = Bank(lock_stripes=4)
+    for account_number in ACCOUNTS:
+        bank.open_account(account_number, "Asha Rao", "savings", 100000)
+    start = threading.Barrier(8)
+
+    def worker(seed):
+        start.wait()
+        done = 0
+        for i in range(400):
+            source = ACCOUNTS[(seed + i) % len(ACCOUNTS)]
+            target = ACCOUNTS[(seed * 3 + i * 5 + 1) % len(ACCOUNTS)]
+            if source == target:
+                continue
+            try:
+                bank.transfer(source, target, 700 + i)
+                done += 1
+            except BankError:
+                pass
+        return done
+
+    with ThreadPoolExecutor(8) as pool:
+        done = sum(pool.map(worker, range(8)))
+    assert done > 0
+    assert bank.total_balance() == 100000 * len(ACCOUNTS)
+    assert sum(bank.get_balance(account_number) for account_number in ACCOUNTS) == 100000 * len(ACCOUNTS)
+    assert all(bank.get_balance(account_number) >= 0 for account_number in ACCOUNTS)
+    assert sum(len(bank.get_transactions(account_number)) for account_number in ACCOUNTS) == 2 * done
+
+
+def test_concurrent_withdrawals_never_overdraw():
+    bank = Bank()
+    bank.open_account("100000001", "Asha Rao", "savings", 100000)
+
+    def withdraw(_):
+        try:
+            bank.post_withdrawal("100000001", 3000)
+            return 1
+        except BankError:
+            return 0
+
+    with ThreadPoolExecutor(8) as pool:
+        done = sum(pool.map(withdraw, range(100)))
+    assert done == 33
+    assert bank.get_balance("100000001") == 100000 - 33 * 3000
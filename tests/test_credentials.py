@@ -0,0 +1,66 @@
+import time
+
+import pytest
+
+from bank import BankError
+from conftest import FAST_KDF
+from credentials import SessionCache, hash_secret, needs_rehash, verify_secret
+
+
+def test_hashes_are_salted_and_verify():
+    first = hash_secret("Secret123", FAST_KDF)
+    second = hash_secret("Secret123", FAST_KDF)
+    assert first['salt'] != second['salt'] and first['hash'] != second['hash']
+    assert "Secret123" not in str(first)
+    assert verify_secret("Secret123", first)
+    assert not verify_secret("Secret124", first)
+    assert not verify_secret("Secret123", None)
+    assert not needs_rehash(first, FAST_KDF)
+    assert needs_rehash(first, dict(FAST_KDF, n=32))
+
+
+def test_sessions_expire_and_are_evicted(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(time, 'monotonic', lambda: now[0])
+    sessions = SessionCache(ttl=60, max_sessions=2)
+    first = sessions.create("asha_1")
+    second = sessions.create("ravi_2")
+    third = sessions.create("mira_3")
+    assert sessions.user(first) is None
+    assert (sessions.user(second), sessions.user(third)) == ("ravi_2", "mira_3")
+    now[0] += 60
+    assert sessions.user(second) is None
+    sessions.revoke_user("mira_3")
+    assert len(sessions) == 0
+
+
+def test_credentials_are_stored_hashed_and_rehashed(open_bank):
+    bank = open_bank()
+    bank.register_user("asha_1", "asha1@example.com", "Secret123", mpin="123456")
+    stored = bank.users["asha_1"]
+    assert stored['password']['n'] == FAST_KDF['n'] and "Secret123" not in str(stored)
+    bank.close()
+
+    # A login under new parameters upgrades the stored hash, durably
+    bank = open_bank(kdf_params=dict(FAST_KDF, n=32))
+    bank.authenticate("asha_1", "Secret123")
+    bank.authenticate_mpin("asha_1", "123456")
+    assert (bank.users["asha_1"]['password']['n'], bank.users["asha_1"]['mpin']['n']) == (32, 32)
+    bank.close()
+    bank = open_bank(kdf_params=dict(FAST_KDF, n=32))
+    assert bank.users["asha_1"]['password']['n'] == 32
+    with pytest.raises(BankError, match="Incorrect MPIN"):
+        bank.authenticate_mpin("asha_1", "654321")
+
+
+def test_session_login(open_bank):
+    bank = open_bank()
+    bank.register_user("asha_1", "asha1@example.com", "Secret123")
+    token, message = bank.login_session("asha_1", password="Secret123")
+    assert bank.session_user(token) == "asha_1"
+    assert bank.login_session("asha_1", password="Wrong1234")[0] is None
+    with pytest.raises(BankError, match="No MPIN set"):
+        bank.authenticate_mpin("asha_1", "123456")
+    bank.logout(token)
+    with pytest.raises(BankError, match="Session expired"):
+        bank.session_user(token)
@@ -0,0 +1,55 @@
+from bank import Bank
+
+SCHEDULE = {
+    'savings': {'interest_bps': 365, 'fee': 0, 'fee_waiver': 0},
+    'checking': {'interest_bps': 0, 'fee': 500, 'fee_waiver': 1000000},
+}
+
+
+def open_book(bank):
+    bank.open_account("100000001", "Asha Rao", "savings", 1000000)
+    bank.open_account("100000002", "Ravi Iyer", "savings", 15000)
+    bank.open_account("100000003", "Mira Das", "checking", 20000)
+    bank.open_account("100000004", "Dev Shah", "checking", 1000000)
+    bank.open_account("100000005", "Lata Pai", "investment", 50000)
+
+
+def test_interest_and_fees_per_account_type():
+    bank = Bank()
+    open_book(bank)
+    result = bank.accrue_end_of_day(SCHEDULE)
+    # 365 bps a year is 1 bp a day; 15000 paise earn 1.5, which rounds half up to 2
+    assert [bank.get_balance("10000000%d" % i) for i in range(1, 6)] == [1000100, 15002, 19500, 1000000, 50000]
+    assert (result['interest'], result['fees']) == (102, 500)
+    assert result['by_type']['checking'] == {'accounts': 2, 'interest': 0, 'fees': 500}
+    assert result['by_type']['investment'] == {'accounts': 1, 'interest': 0, 'fees': 0}
+    assert [entry['type'] for entry in bank.get_transactions("100000003")] == ['maintenance_fee']
+    assert bank.get_transactions("100000004") == []
+
+
+def test_a_fee_never_overdraws():
+    bank = Bank()
+    bank.open_account("100000001", "Asha Rao", "checking", 10000)
+    bank.post_withdrawal("100000001", 9700)
+    bank.accrue_end_of_day(SCHEDULE)
+    assert bank.get_balance("100000001") == 0
+
+
+def test_dry_run_changes_nothing():
+    bank = Bank()
+    open_book(bank)
+    result = bank.accrue_end_of_day(SCHEDULE, dry_run=True)
+    assert result['dry_run'] and result['interest'] == 102
+    assert bank.get_balance("100000001") == 1000000
+    assert bank.get_transactions("100000001") == []
+
+
+def test_accrual_is_replayed_from_the_ledger(open_bank):
+    bank = open_bank()
+    open_book(bank)
+    bank.accrue_end_of_day(SCHEDULE)
+    balances = [bank.get_balance("10000000%d" % i) for i in range(1, 6)]
+    bank.close()
+    bank = open_bank()
+    assert [bank.get_balance("10000000%d" % i) for i in range(1, 6)] == balances
+    assert len(bank.get_transactions("100000001")) == 1
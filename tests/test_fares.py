@@ -0,0 +1,69 @@
+import json
+
+import pytest
+
+from bank import Bank, BankError
+from fares import FareEngine, FareTable
+
+RULES = {
+    'paise_per_km': 100,
+    'default_distance_km': 500,
+    'routes': {'PUNE-DELHI': 1450},
+    'class_percent': {'1': 100, '2': 300},
+    'quota_surcharge': {'5': 50000},
+    'surge': [{'from': "2026-12-20", 'to': "2027-01-05", 'percent': 120, 'classes': ['2']},
+              {'from': "2026-12-24", 'to': "2026-12-26", 'percent': 150}],
+}
+
+
+def test_default_rules_keep_the_old_fares():
+    bank = Bank()
+    assert [bank.ticket_fare(travel_class, '1') for travel_class in '1234'] == [50000, 150000, 100000, 80000]
+    assert bank.ticket_fare('1', '5') == 100000
+    with pytest.raises(BankError, match="Invalid travel class"):
+        bank.ticket_fare('9', '1')
+
+
+def test_routes_classes_quotas_and_surge():
+    table = FareTable(RULES)
+    assert table.fare("PUNE-DELHI", '1', '1', "2026-06-01") == 145000
+    assert table.fare("DELHI-PUNE", '2', '1', "2026-06-01") == 435000
+    assert table.fare("GOA-AGRA", '1', '5', "2026-06-01") == 50000 + 50000
+    # Only the second class surges in the first window; the highest window wins
+    assert table.fare("PUNE-DELHI", '1', '1', "2026-12-21") == 145000
+    assert table.fare("PUNE-DELHI", '2', '1', "2026-12-21") == 522000
+    assert table.fare("PUNE-DELHI", '2', '1', "2026-12-25") == 652500
+    assert table.fare("PUNE-DELHI", '1', '1', "2026-12-25") == 217500
+
+
+def test_quotes_are_cached_until_a_reload(tmp_path):
+    path = tmp_path / "fares.json"
+    path.write_text(json.dumps(RULES))
+    engine = FareEngine(str(path))
+    for _ in range(3):
+        engine.quote("PUNE-DELHI", '1', '1', "2026-06-01")
+    assert (engine.stats()['hits'], engine.stats()['misses'], engine.stats()['routes']) == (2, 1, 2)
+    path.write_text(json.dumps(dict(RULES, paise_per_km=200)))
+    engine.reload()
+    assert engine.stats()['cached'] == 0
+    assert engine.quote("PUNE-DELHI", '1', '1', "2026-06-01") == 290000
+
+
+def test_bank_quotes_from_its_rule_file(tmp_path):
+    path = tmp_path / "fares.json"
+    path.write_text(json.dumps(RULES))
+    bank = Bank(fare_rules=str(path))
+    assert bank.fare_quote("pune", "delhi", "2026-06-01", '1', '1')['fare'] == 145000
+    with pytest.raises(BankError, match="Invalid quota"):
+        bank.fare_quote("pune", "delhi", "2026-06-01", '1', '9')
+
+
+def test_unpadded_dates_surge_and_share_a_quote(tmp_path):
+    path = tmp_path / "fares.json"
+    path.write_text(json.dumps(dict(RULES, surge=[dict(RULES['surge'][0], to="2027-1-5")])))
+    bank = Bank(fare_rules=str(path))
+    assert bank.fare_quote("pune", "delhi", "2027-1-2", '2', '1')['fare'] == 522000
+    assert bank.fare_quote("pune", "delhi", "2027-01-02", '2', '1')['fare'] == 522000
+    assert (bank.fare_cache_stats()['hits'], bank.fare_cache_stats()['misses']) == (1, 1)
+    with pytest.raises(BankError, match="Invalid travel date"):
+        bank.fare_quote("pune", "delhi", "2027-13-40", '2', '1')
@@ -0,0 +1,91 @@
+import csv
+import json
+
+import pytest
+
+from bank import Bank, BankError
+from importer import import_accounts
+
+
+def columns(**overrides):
+    batch = {'account_number': ['100000001', '100000002'], 'account_holder': ['Asha Rao', 'Ravi Iyer'],
+             'account_type': ['Savings', 'checking'], 'initial_balance': [10000, 250000]}
+    batch.update(overrides)
+    return batch
+
+
+def test_open_accounts_reports_every_problem_of_a_row():
+    bank = Bank()
+    bank.open_account("100000003", "Existing Holder", "savings", 10000)
+    result = bank.open_accounts(columns(
+        account_number=['100000001', '12', '100000003', '100000001'],
+        account_holder=['Asha Rao', 'R2D2', 'Mira Das', 'Asha Rao'],
+        account_type=['SAVINGS', 'loan', 'checking', 'savings'],
+        initial_balance=[10000, 50, 10000, 10000]))
+    assert result['opened'] == 1
+    rejected = {index: messages for index, _, messages in result['rejected']}
+    assert sorted(rejected) == [1, 2, 3]
+    assert len(rejected[1]) >= 4
+    assert "Invalid account type" in rejected[1]
+    assert "Initial balance must be at least 100.00" in rejected[1]
+    assert rejected[2] == ["Account number already exists"]
+    assert rejected[3] == ["Account number already exists"]
+    assert bank.get_account('100000001')['type'] == 'savings'
+
+
+@pytest.mark.parametrize("batch, message", [
+    (columns(account_holder=[None, 'Ravi Iyer']), "Row 0: account number, holder and type must be strings"),
+    (columns(account_type=['savings', 7]), "Row 1: account number, holder and type must be strings"),
+    (columns(owner=[None, ['us_er1']]), "Row 1: owner must be a username or None"),
+    (columns(initial_balance=[10000]), "Columns must all have the same length"),
+    ({'account_number': [], 'account_holder': []}, "Missing column(s): account_type, initial_balance"),
+])
+def test_open_accounts_rejects_malformed_batches(batch, message):
+    bank = Bank()
+    with pytest.raises(BankError) as error:
+        bank.open_accounts(batch)
+    assert str(error.value) == message
+    assert bank.total_balance() == 0
+
+
+def test_import_csv_writes_rejects(tmp_path):
+    path = tmp_path / "accounts.csv"
+    path.write_text("account_type,account_number,account_holder,initial_balance\n"
+                    "savings,100000001,Asha Rao,2500.75\n"
+                    "savings,100000002,Ravi Iyer,abc\n"
+                    "checking,100000001,Mira Das,500\n"
+                    "investment,100000003\n"
+                    "checking,100000004,Dev Nair,1000\n")
+    bank = Bank()
+    result = import_accounts(bank, str(path), chunk_size=2)
+    assert (result['imported'], result['rejected']) == (2, 3)
+    assert bank.get_balance('100000001') == 250075
+    assert bank.get_balance('100000004') == 100000
+    with open(result['reject_path'], newline="") as f:
+        rows = list(csv.reader(f))
+    assert rows[0] == ['line', 'account_number', 'account_holder', 'account_type', 'initial_balance', 'errors']
+    assert [row[0] for row in rows[1:]] == ['3', '4', '5']
+    assert rows[1][5] == "Initial balance must be a number"
+    # Repeated in a later chunk, so caught as already in the bank
+    assert rows[2][5] == "Account number already exists"
+
+
+def test_import_jsonl(tmp_path):
+    path = tmp_path / "accounts.jsonl"
+    path.write_text(json.dumps({'account_number': '100000001', 'account_holder': 'Asha Rao',
+                                'account_type': 'savings', 'initial_balance': 300}) + "\n"
+                    + "not json\n")
+    bank = Bank()
+    result = import_accounts(bank, str(path))
+    assert (result['imported'], result['rejected']) == (1, 1)
+    assert bank.get_balance('100000001') == 30000
+    with open(result['reject_path']) as f:
+        assert json.loads(f.readline())['line'] == 2
+
+
+def test_import_csv_missing_column(tmp_path):
+    path = tmp_path / "accounts.csv"
+    path.write_text("account_number,account_holder\n100000001,Asha Rao\n")
+    with pytest.raises(ValueError) as error:
+        import_accounts(Bank(), str(path))
+    assert str(error.value) == "CSV header is missing column(s): account_type, initial_balance"
@@ -0,0 +1,224 @@
+import json
+import os
+import shutil
+import threading
+
+import pytest
+
+from ledger import HEADER, Journal, LedgerError, WriteAheadLog
+
+
+def state(bank):
+    return json.loads(json.dumps(bank._dump_state(), sort_keys=True))
+
+
+def open_two(bank):
+    bank.open_account("100000001", "Asha Rao", "savings", 500000)
+    bank.open_account("100000002", "Ravi Iyer", "checking", 200000)
+
+
+def test_log_round_trip(tmp_path):
+    path = str(tmp_path / "wal.log")
+    log = WriteAheadLog(path)
+    for index in range(5):
+        log.commit(log.append({'op': 'test', 'n': index}))
+    log.close()
+
+    log = WriteAheadLog(path)
+    assert [(record['lsn'], record['n']) for record in log.records()] == [(index + 1, index) for index in range(5)]
+    assert log.durable_lsn == 5
+    assert log.append({'op': 'test', 'n': 5}) == 6
+    log.close()
+
+
+@pytest.mark.parametrize("tail", [
+    b"\x05\x00",                                    # half a header
+    HEADER.pack(100, 0) + b'{"op":"te',             # header and part of its payload
+    HEADER.pack(4, 12345) + b"junk",                # whole record, wrong checksum
+])
+def test_torn_tail_is_cut_off(tmp_path, tail):
+    path = str(tmp_path / "wal.log")
+    log = WriteAheadLog(path)
+    for index in range(3):
+        log.commit(log.append({'op': 'test', 'n': index}))
+    log.close()
+    intact = os.path.getsize(path)
+    with open(path, "ab") as f:
+        f.write(tail)
+
+    log = WriteAheadLog(path)
+    assert [record['n'] for record in log.records()] == [0, 1, 2]
+    assert os.path.getsize(path) == intact
+    # New records follow the intact ones, not the garbage
+    log.commit(log.append({'op': 'test', 'n': 3}))
+    log.close()
+    log = WriteAheadLog(path)
+    assert [(record['lsn'], record['n']) for record in log.records()] == [(1, 0), (2, 1), (3, 2), (4, 3)]
+    log.close()
+
+
+def test_bank_recovers_before_torn_tail(open_bank, tmp_path):
+    bank = open_bank()
+    open_two(bank)
+    bank.post_deposit("100000001", 2500)
+    bank.transfer("100000001", "100000002", 1000)
+    expected = state(bank)
+    bank.close()
+    with open(tmp_path / "wal.log", "ab") as f:
+        f.write(HEADER.pack(64, 0) + b'{"op":"deposit"')
+
+    bank = open_bank()
+    assert state(bank) == expected
+    bank.post_withdrawal("100000002", 500)
+    bank.close()
+    bank = open_bank()
+    assert bank.get_balance("100000001") == 501500
+    assert bank.get_balance("100000002") == 200500
+    assert bank.reconcile()['ok']
+
+
+def test_group_commit_shares_fsyncs(tmp_path):
+    log = WriteAheadLog(str(tmp_path / "wal.log"))
+    threads, per_thread = 8, 50
+    start = threading.Barrier(threads)
+
+    def worker(index):
+        start.wait()
+        for n in range(per_thread):
+            lsn = log.append({'op': 'test', 'thread': index, 'n': n})
+            log.commit(lsn)
+            assert log.durable_lsn >= lsn
+
+    workers = [threading.Thread(target=worker, args=(index,)) for index in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    assert log.durable_lsn == threads * per_thread
+    assert log.fsync_count < threads * per_thread
+    log.close()
+    log = WriteAheadLog(log.path)
+    assert len(list(log.records())) == threads * per_thread
+    log.close()
+
+
+def test_journal_counts_every_record_across_threads(tmp_path):
+    journal = Journal(str(tmp_path), snapshot_every=0)
+    threads, per_thread = 8, 200
+    start = threading.Barrier(threads)
+
+    def worker(index):
+        start.wait()
+        for n in range(per_thread):
+            journal.log('test', {'thread': index, 'n': n})
+        journal.settle()
+
+    workers = [threading.Thread(target=worker, args=(index,)) for index in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    assert journal.since_snapshot == threads * per_thread
+    journal.close()
+
+
+def test_group_commit_block_takes_one_fsync(open_bank):
+    bank = open_bank()
+    open_two(bank)
+    wal = bank.journal.wal
+    before = wal.fsync_count
+    with bank.group_commit():
+        for _ in range(10):
+            bank.post_deposit("100000001", 100)
+        assert wal.fsync_count == before
+    assert wal.fsync_count == before + 1
+    assert wal.durable_lsn == wal.next_lsn - 1
+
+
+def test_failed_write_fails_the_log(tmp_path, monkeypatch):
+    log = WriteAheadLog(str(tmp_path / "wal.log"))
+    log.commit(log.append({'op': 'test'}))
+    lsn = log.append({'op': 'test'})
+
+    def fsync(fd):
+        raise OSError(5, "Input/output error")
+
+    monkeypatch.setattr(os, "fsync", fsync)
+    with pytest.raises(LedgerError):
+        log.commit(lsn)
+    assert log.durable_lsn == lsn - 1
+    with pytest.raises(LedgerError):
+        log.append({'op': 'test'})
+    with pytest.raises(LedgerError):
+        log.close()
+
+
+@pytest.mark.parametrize("snapshot_format", ["binary", "json"])
+def test_replay_after_snapshot(open_bank, tmp_path, snapshot_format):
+    bank = open_bank(snapshot_every=5, snapshot_format=snapshot_format)
+    open_two(bank)
+    for _ in range(12):
+        bank.transfer("100000001", "100000002", 100)
+    expected = state(bank)
+    assert bank.journal.snapshot_lsn > 0
+    # Only the records since the last snapshot are left to replay
+    assert len(list(WriteAheadLog(str(tmp_path / "wal.log")).records())) < 14
+    bank.close()
+
+    bank = open_bank(snapshot_format=snapshot_format)
+    assert state(bank) == expected
+    assert bank.get_balance("100000001") == 498800
+    assert len(bank.get_transactions("100000002")) == 12
+    assert bank.reconcile()['ok']
+
+
+def test_records_covered_by_snapshot_are_skipped(open_bank, tmp_path):
+    bank = open_bank()
+    open_two(bank)
+    bank.post_deposit("100000001", 700)
+    bank.close()
+    # A crash after the snapshot was written but before the log was reset
+    shutil.copy(tmp_path / "wal.log", tmp_path / "wal.copy")
+    bank = open_bank()
+    with bank.locks.hold_all():
+        bank.journal.snapshot(bank)
+    bank.close()
+    os.replace(tmp_path / "wal.copy", tmp_path / "wal.log")
+
+    bank = open_bank()
+    assert bank.get_balance("100000001") == 500700
+    assert len(bank.get_transactions("100000001")) == 1
+    bank.post_deposit("100000001", 300)
+    bank.close()
+    bank = open_bank()
+    assert bank.get_balance("100000001") == 501000
+
+
+def test_post_transaction_is_journalled(open_bank):
+    bank = open_bank()
+    open_two(bank)
+    bank.post_transaction("100000001", "deposit", 1500)
+    bank.post_transaction("100000002", "withdrawal", 500, timestamp="2024-01-02T03:04:05")
+    with pytest.raises(ValueError):
+        bank.post_transaction("999999999", "deposit", 100)
+    expected = state(bank)
+    bank.close()
+
+    bank = open_bank()
+    assert state(bank) == expected
+    assert bank.get_balance("100000001") == 501500
+    assert bank.get_balance("100000002") == 199500
+    assert [entry['amount'] for entry in bank.get_transactions("100000001")] == [1500]
+    assert bank.reconcile()['ok']
+
+
+def test_record_transaction_posts_like_post_transaction(open_bank):
+    bank = open_bank()
+    open_two(bank)
+    bank.record_transaction("100000001", "deposit", 500)
+    assert bank.reconcile()['ok']
+    bank.close()
+
+    bank = open_bank()
+    assert bank.get_balance("100000001") == 500500
+    assert [entry['amount'] for entry in bank.get_transactions("100000001")] == [500]
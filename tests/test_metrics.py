@@ -0,0 +1,63 @@
+import pytest
+
+import metrics
+from bank import Bank, BankError
+
+
+@pytest.fixture
+def bank():
+    bank = Bank()
+    bank.open_account("100000001", "Asha Rao", "savings", 100000)
+    return bank
+
+
+def test_histogram_buckets():
+    for value in (0, 1, 15, 16, 17, 1000, 123456789, 2 ** 40 + 5):
+        index = metrics.bucket_index(value)
+        assert metrics.bucket_lower(index) <= value < metrics.bucket_upper(index)
+    histogram = metrics.Histogram()
+    for value in range(1, 101):
+        histogram.record(value)
+    summary = histogram.summary()
+    assert summary['count'] == 100
+    assert 45 <= summary['p50_ns'] <= 56
+    assert 100 <= summary['max_ns'] <= 112
+
+
+def test_counts_calls_and_errors(bank):
+    bank.boom = lambda: 1 // 0
+    recorder = metrics.instrument(bank, metrics.OPERATIONS + ('boom',))
+    assert metrics.instrument(bank) is recorder
+    bank.post_deposit("100000001", 100)
+    bank.post_deposit("100000001", 200)
+    with pytest.raises(BankError):
+        bank.post_withdrawal("100000001", 10 ** 9)
+    with pytest.raises(ZeroDivisionError):
+        bank.boom()
+    snapshot = recorder.snapshot()
+    operations = snapshot['operations']
+    assert operations['post_deposit']['count'] == 2
+    assert operations['post_deposit']['errors'] == 0
+    # Failed calls are timed too
+    assert operations['post_withdrawal']['count'] == 1
+    assert operations['boom'] == dict(operations['boom'], count=1, errors=1)
+    assert snapshot['errors'] == {'post_withdrawal': {"Insufficient balance.": 1}, 'boom': {'ZeroDivisionError': 1}}
+    text = recorder.prometheus()
+    assert 'bank_operation_errors_total{operation="boom",message="ZeroDivisionError"} 1' in text
+    assert 'bank_operation_seconds_count{operation="post_deposit"} 2' in text
+
+
+def test_record_transaction_is_timed(bank):
+    recorder = metrics.instrument(bank)
+    bank.record_transaction("100000001", 'deposit', 100)
+    assert recorder.snapshot()['operations']['record_transaction']['count'] == 1
+
+
+def test_uninstrument(bank):
+    metrics.instrument(bank)
+    assert 'post_deposit' in bank.__dict__
+    metrics.uninstrument(bank)
+    assert 'post_deposit' not in bank.__dict__
+    assert bank.metrics is None
+    bank.post_deposit("100000001", 100)
+    assert bank.get_balance("100000001") == 100100
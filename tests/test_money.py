@@ -0,0 +1,64 @@
+import pytest
+
+from bank import Bank, BankError
+from money import format_money, is_money, parse_money
+
+
+@pytest.mark.parametrize("text, paise", [
+    ("1250", 125000),
+    ("12.5", 1250),
+    ("12.05", 1205),
+    ("-0.75", -75),
+    ("+3", 300),
+    (" 1,250.50 ", 125050),
+    (".5", 50),
+    ("5.", 500),
+    ("0", 0),
+    (42, 4200),
+    ("90071992547409.93", 9007199254740993),
+])
+def test_parse_money(text, paise):
+    assert parse_money(text) == paise
+
+
+@pytest.mark.parametrize("text", ["", ".", "-", "abc", "1e3", "1.234", "--1", "1.-5", "1 000", "0x10"])
+def test_parse_money_rejects(text):
+    with pytest.raises(ValueError):
+        parse_money(text)
+
+
+@pytest.mark.parametrize("paise, text", [(125050, "1250.50"), (-75, "-0.75"), (0, "0.00"), (5, "0.05")])
+def test_format_money(paise, text):
+    assert format_money(paise) == text
+    assert parse_money(text) == paise
+
+
+def test_is_money():
+    assert is_money(100)
+    assert not is_money(True)
+    assert not is_money(1.5)
+    assert not is_money("100")
+
+
+def test_bank_takes_paise(open_bank):
+    bank = open_bank()
+    bank.open_account("100000001", "Asha Rao", "savings", parse_money("5000.10"))
+    bank.post_deposit("100000001", parse_money("0.10"))
+    assert format_money(bank.get_balance("100000001")) == "5000.20"
+    with pytest.raises(BankError):
+        bank.post_deposit("100000001", 0.1)
+
+
+def test_interactive_methods_take_rupees():
+    bank = Bank()
+    bank.open_account("100000001", "Asha Rao", "savings", "150")
+    assert bank.get_balance("100000001") == 15000
+    assert bank.deposit("100000001", 50) == "Deposited 50.00 successfully. New balance : 200.00"
+    assert bank.withdraw("100000001", "0.75") == "Withdrew 0.75 successfully. New balance : 199.25"
+    assert bank.withdraw("100000001", 12.5) == "Withdrew 12.50 successfully. New balance : 186.75"
+    assert bank.get_balance("100000001") == 18675
+    assert bank.withdraw("100000001", 1000) == "Insufficient balance."
+    assert bank.deposit("100000001", "1.234").endswith("at most 2 decimal places")
+    assert bank.validate_initial_balance(150) == (True, "")
+    assert bank.validate_initial_balance("99.99") == (False, "Initial balance must be at least 100.00")
+    assert bank.validate_initial_balance("lots") == (False, "Initial balance must be a number")
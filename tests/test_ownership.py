@@ -0,0 +1,79 @@
+import builtins
+
+import pytest
+
+from bank import Bank, BankError
+from conftest import FAST_KDF
+
+
+def register(bank, *usernames):
+    for index, username in enumerate(usernames):
+        bank.register_user(username, f"user{index}@example.com", "Secret123")
+
+
+@pytest.fixture
+def bank():
+    bank = Bank(kdf_params=FAST_KDF)
+    register(bank, "asha_1", "ravi_2")
+    bank.open_account("100000001", "Asha Rao", "savings", 50000, owner="asha_1")
+    bank.open_account("100000002", "Asha Rao", "checking", 20000, owner="asha_1")
+    bank.open_account("100000003", "Ravi Iyer", "savings", 30000, owner="ravi_2")
+    bank.open_account("100000004", "Asha Rao", "savings", 10000)
+    return bank
+
+
+def test_ownership_index(bank):
+    assert bank.user_accounts("asha_1") == ["100000001", "100000002"]
+    assert bank.holder_accounts("Asha Rao") == ["100000001", "100000002", "100000004"]
+    assert bank.owns("asha_1", "100000001") and not bank.owns("asha_1", "100000003")
+    assert not bank.owns("asha_1", "100000004") and not bank.owns("nobody_9", "100000001")
+    assert bank.owner_error("asha_1", "100000003") == "Account does not belong to you"
+    assert bank.owner_error("asha_1", "100000001") == ""
+    assert bank.owner_error("asha_1", "999999999") == ""
+    with pytest.raises(BankError, match="Unknown user"):
+        bank.open_account("100000005", "Asha Rao", "savings", 10000, owner="nobody_9")
+
+
+def test_assigning_an_owner_moves_the_account(bank):
+    bank.assign_owner("100000004", "ravi_2")
+    bank.assign_owner("100000001", "ravi_2")
+    assert bank.user_accounts("asha_1") == ["100000002"]
+    assert bank.user_accounts("ravi_2") == ["100000003", "100000004", "100000001"]
+
+
+def test_portfolio(bank):
+    bank.post_deposit("100000001", 100)
+    bank.post_deposit("100000001", 200)
+    portfolio = bank.portfolio("asha_1", recent=1)
+    assert portfolio['total_balance'] == 70300
+    assert [account['account_number'] for account in portfolio['accounts']] == ["100000001", "100000002"]
+    assert [entry['amount'] for entry in portfolio['accounts'][0]['recent']] == [200]
+    assert portfolio['accounts'][1]['recent'] == []
+    with pytest.raises(BankError, match="Unknown user"):
+        bank.portfolio("nobody_9")
+
+
+def test_menu_refuses_another_users_account(bank, monkeypatch):
+    answers = iter(["100000003", "100000001", "500"])
+    monkeypatch.setattr(builtins, 'input', lambda prompt="": next(answers))
+    assert bank.transfer_funds("asha_1") == "Error: Account does not belong to you"
+    assert bank.get_balance("100000003") == 30000
+
+
+def test_owners_survive_a_restart(open_bank):
+    bank = open_bank()
+    register(bank, "asha_1")
+    bank.open_account("100000001", "Asha Rao", "savings", 50000, owner="asha_1")
+    bank.open_accounts({'account_number': ["100000002", "100000003"], 'account_holder': ["Asha Rao"] * 2,
+                        'account_type': ["savings"] * 2, 'initial_balance': [10000] * 2,
+                        'owner': ["asha_1", None]})
+    bank.close()
+    bank = open_bank()
+    assert bank.user_accounts("asha_1") == ["100000001", "100000002"]
+    bank.assign_owner("100000003", "asha_1")
+    bank.close()
+    bank = open_bank(snapshot_every=1)
+    bank.post_deposit("100000001", 100)
+    bank.close()
+    bank = open_bank()
+    assert bank.user_accounts("asha_1") == ["100000001", "100000002", "100000003"]
@@ -0,0 +1,118 @@
+import pytest
+
+from bank import Bank, BankError, BatchRejected
+from risk import RiskScreen
+
+ACCOUNT = "100000001"
+RULES = {'accounts': {'*': {'minute': {'count': 2}}}}
+
+
+@pytest.fixture
+def bank():
+    bank = Bank(risk_rules=RULES)
+    bank.open_account(ACCOUNT, "Asha Rao", "savings", 1000000)
+    return bank
+
+
+def test_atomic_batch_over_the_limit_is_rejected(bank):
+    batch = [(ACCOUNT, 100, 'withdrawal')] * 3
+    with pytest.raises(BatchRejected) as rejected:
+        bank.post_batch(batch)
+    assert [(index, message) for index, _, message in rejected.value.rejects] == \
+        [(2, "Debit limit reached: 2 debits per minute from this account")]
+    assert bank.get_balance(ACCOUNT) == 1000000
+    # Nothing of the rejected batch is left counted
+    assert bank.risk_usage(ACCOUNT)['minute'] == {'count': 0, 'amount': 0}
+    bank.post_withdrawal(ACCOUNT, 100)
+    bank.post_withdrawal(ACCOUNT, 100)
+    with pytest.raises(BankError):
+        bank.post_withdrawal(ACCOUNT, 100)
+
+
+def test_non_atomic_batch_posts_up_to_the_limit(bank):
+    result = bank.post_batch([(ACCOUNT, 100, 'withdrawal')] * 3 + [(ACCOUNT, 500, 'deposit')], atomic=False)
+    assert result['posted'] == 3
+    assert [index for index, _, _ in result['rejected']] == [2]
+    assert bank.get_balance(ACCOUNT) == 1000300
+    assert bank.risk_usage(ACCOUNT)['minute'] == {'count': 2, 'amount': 200}
+
+
+def test_rejected_batch_releases_user_counters():
+    bank = Bank(risk_rules={'user': {'day': {'amount': 1000}}}, kdf_params={'n': 16, 'r': 1, 'p': 1})
+    bank.register_user("us_er1", "user1@bank.com", "Passw0rd!x")
+    bank.open_account(ACCOUNT, "Asha Rao", "savings", 1000000, owner="us_er1")
+    with pytest.raises(BatchRejected):
+        bank.post_batch([(ACCOUNT, 600, 'withdrawal'), (ACCOUNT, 600, 'withdrawal')])
+    assert bank.risk_usage(username="us_er1")['day'] == {'count': 0, 'amount': 0}
+    bank.post_withdrawal(ACCOUNT, 1000)
+    stats = bank.risk_stats()
+    assert (stats['screened'], stats['declined']) == (2, 1)
+
+
+T0 = 1700000000 * 1000000
+SECOND = 1000000
+
+
+def test_count_window_slides():
+    screen = RiskScreen({'accounts': {'*': {'minute': {'count': 2}}}})
+    assert screen.screen(ACCOUNT, 'savings', None, 100, T0) == ""
+    assert screen.screen(ACCOUNT, 'savings', None, 100, T0 + 15 * SECOND) == ""
+    assert screen.screen(ACCOUNT, 'savings', None, 100, T0 + 30 * SECOND) == \
+        "Debit limit reached: 2 debits per minute from this account"
+    # A minute and a bucket later the first debits have left the window
+    assert screen.screen(ACCOUNT, 'savings', None, 100, T0 + 80 * SECOND) == ""
+    assert screen.stats() == {'screened': 4, 'declined': 1, 'accounts_tracked': 1, 'users_tracked': 0}
+
+
+def test_amount_limits_by_account_type_and_user():
+    screen = RiskScreen({'accounts': {'checking': {'hour': {'amount': 1000}}},
+                         'user': {'day': {'amount': 1500}}})
+    assert screen.screen("100000001", 'checking', "us_er1", 800, T0) == ""
+    assert screen.screen("100000001", 'checking', "us_er1", 300, T0) == \
+        "Debit limit reached: at most 10.00 per hour from this account"
+    assert screen.screen("100000002", 'savings', "us_er1", 800, T0) == \
+        "Debit limit reached: at most 15.00 per day from your accounts"
+    # Accounts of other types, without an owner, are not limited or counted
+    assert screen.screen("100000003", 'savings', None, 10 ** 9, T0) == ""
+    assert "100000003" not in screen.accounts
+
+
+def test_without_rules_nothing_is_counted():
+    screen = RiskScreen()
+    assert screen.screen(ACCOUNT, 'savings', "us_er1", 10 ** 12, T0) == ""
+    assert screen.stats()['screened'] == 0 and not screen.accounts
+
+
+def test_new_rules_keep_the_counters():
+    screen = RiskScreen({'accounts': {'*': {'day': {'count': 5}}}})
+    for second in range(3):
+        screen.screen(ACCOUNT, 'savings', None, 100, T0 + second * SECOND)
+    screen.load({'accounts': {'*': {'day': {'count': 3}}}})
+    assert screen.screen(ACCOUNT, 'savings', None, 100, T0 + 5 * SECOND).startswith("Debit limit reached")
+
+
+def test_idle_counters_are_swept():
+    screen = RiskScreen({'accounts': {'*': {'minute': {'count': 2}}}, 'user': {'minute': {'count': 5}}})
+    screen.screen(ACCOUNT, 'savings', "us_er1", 100, T0)
+    screen.sweep(T0 + 30 * SECOND)
+    assert ACCOUNT in screen.accounts
+    screen.sweep(T0 + 2 * 86400 * SECOND)
+    assert screen.stats()['accounts_tracked'] == screen.stats()['users_tracked'] == 0
+
+
+def test_every_debit_path_is_screened(bank):
+    bank.open_account("100000002", "Ravi Iyer", "savings", 1000000)
+    bank.post_withdrawal(ACCOUNT, 100)
+    bank.transfer(ACCOUNT, "100000002", 100)
+    for call in (lambda: bank.post_withdrawal(ACCOUNT, 100),
+                 lambda: bank.transfer(ACCOUNT, "100000002", 100),
+                 lambda: bank.pay_bill('gas', "ABC12345", ACCOUNT, 100)):
+        with pytest.raises(BankError, match="Debit limit reached"):
+            call()
+    assert bank.get_balance(ACCOUNT) == 1000000 - 200
+    # Credits are never limited
+    bank.post_deposit(ACCOUNT, 100)
+    assert bank.risk_usage(ACCOUNT)['minute'] == {'count': 2, 'amount': 200}
+    bank.reload_risk_rules(None)
+    bank.post_withdrawal(ACCOUNT, 100)
+    assert bank.get_balance(ACCOUNT) == 1000000 - 200
@@ -0,0 +1,116 @@
+import asyncio
+import json
+
+import pytest
+
+import server
+from bank import Bank
+
+
+def run(client, bank=None):
+    """Start a server on a free port, run client(reader, writer) against it and return its result."""
+    bank = bank or Bank()
+
+    async def main():
+        listener = await server.BankServer(bank).start("127.0.0.1", 0)
+        port = listener.sockets[0].getsockname()[1]
+        try:
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            try:
+                return await asyncio.wait_for(client(reader, writer), 10)
+            finally:
+                writer.close()
+        finally:
+            listener.close()
+            await listener.wait_closed()
+
+    return asyncio.run(main())
+
+
+def line(request):
+    return json.dumps(request).encode() + b"\n"
+
+
+def frame(request):
+    payload = json.dumps(request).encode()
+    return server.FRAME_HEADER.pack(len(payload)) + payload
+
+
+async def read_lines(reader, count):
+    return [json.loads(await reader.readline()) for _ in range(count)]
+
+
+async def read_frames(reader, count):
+    responses = []
+    for _ in range(count):
+        (length,) = server.FRAME_HEADER.unpack(await reader.readexactly(server.FRAME_HEADER.size))
+        responses.append(json.loads(await reader.readexactly(length)))
+    return responses
+
+
+OPEN = {'id': 1, 'op': 'open_account', 'args': {'account_number': '100000001', 'account_holder': 'Asha Rao',
+                                                 'account_type': 'savings', 'initial_balance': 100000}}
+
+
+def test_pipelined_lines_answer_in_order():
+    async def client(reader, writer):
+        # Leading blank lines and spaces still mean newline JSON
+        writer.write(b"\n  \r\n" + line(OPEN) + b"\n" + line({'id': 2, 'op': 'deposit', 'args': {
+            'account_number': '100000001', 'amount': 500}}) + b"not json\n"
+            + line({'id': 4, 'op': 'nope'}) + line({'id': 5, 'op': 'withdraw', 'args': {
+                'account_number': '100000001', 'amount': 10 ** 9}})
+            + line({'id': 6, 'op': 'balance', 'args': {'account_number': '100000001', 'extra': 1}})
+            + line({'id': 7, 'op': 'balance', 'args': {'account_number': '100000001'}}))
+        await writer.drain()
+        return await read_lines(reader, 7)
+
+    responses = run(client)
+    assert [response['id'] for response in responses] == [1, 2, None, 4, 5, 6, 7]
+    assert [response['ok'] for response in responses] == [True, True, False, False, False, False, True]
+    assert responses[1]['result']['balance'] == 100500
+    assert responses[2]['error'] == "Malformed request"
+    assert responses[3]['error'] == "Unknown operation: nope"
+    assert responses[4]['error'] == "Insufficient balance."
+    assert responses[6]['result'] == 100500
+
+
+def test_frames():
+    async def client(reader, writer):
+        writer.write(frame(OPEN) + frame({'id': 2, 'op': 'account', 'args': {'account_number': '100000001'}}))
+        await writer.drain()
+        return await read_frames(reader, 2)
+
+    responses = run(client)
+    assert responses[1] == {'id': 2, 'ok': True, 'result': {'account_number': '100000001', 'account_holder':
+                                                             'Asha Rao', 'type': 'savings', 'balance': 100000}}
+
+
+def test_unexpected_error_is_answered(monkeypatch):
+    def broken(bank):
+        raise RuntimeError("boom")
+
+    monkeypatch.setitem(server.OPERATIONS, 'broken', broken)
+
+    async def client(reader, writer):
+        writer.write(line({'id': 1, 'op': 'broken'}) + line({'id': 2, 'op': 'treasury'}))
+        await writer.drain()
+        return await read_lines(reader, 2)
+
+    responses = run(client)
+    assert responses[0] == {'id': 1, 'ok': False, 'error': "Internal error (RuntimeError): boom"}
+    assert responses[1]['ok']
+
+
+@pytest.mark.parametrize("framed", [False, True])
+def test_oversized_request_closes_the_connection(monkeypatch, framed):
+    monkeypatch.setattr(server, "MAX_FRAME", 64)
+
+    async def client(reader, writer):
+        if framed:
+            writer.write(server.FRAME_HEADER.pack(65) + b"{" * 65)
+        else:
+            writer.write(b'{"id": 1, "op": "treasury", "args": {}' + b" " * 100)
+        await writer.drain()
+        return await reader.read()
+
+    assert run(client) == b""
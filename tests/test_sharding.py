@@ -0,0 +1,95 @@
+import pytest
+
+import sharding
+from sharding import ShardedBank, shard_for
+
+SOURCE, TARGET = "100000001", "100000002"
+
+
+@pytest.fixture
+def open_sharded(tmp_path):
+    banks = []
+
+    def open_sharded():
+        bank = ShardedBank(str(tmp_path), shards=2, snapshot_every=0)
+        banks.append(bank)
+        return bank
+
+    yield open_sharded
+    for bank in banks:
+        if bank.coordinator_log is not None:
+            bank.close()
+
+
+def crash_after_prepare(bank, txid, commit):
+    """Prepare both legs, log `commit` if asked, then stop as a crash would."""
+    bank.shard(SOURCE).call('prepare_transfer', txid, SOURCE, 30000, 'debit')
+    bank.shard(TARGET).call('prepare_transfer', txid, TARGET, 30000, 'credit')
+    if commit:
+        bank._log({'op': 'decide', 'txid': txid, 'commit': True}, durable=True)
+    bank.close()
+
+
+def test_accounts_on_different_shards():
+    assert shard_for(SOURCE, 2) != shard_for(TARGET, 2)
+
+
+@pytest.mark.parametrize("commit", [True, False])
+def test_in_doubt_transfer_resolved_on_restart(open_sharded, commit):
+    bank = open_sharded()
+    bank.open_account(SOURCE, "Asha Rao", "savings", 100000)
+    bank.open_account(TARGET, "Ravi Iyer", "savings", 100000)
+    crash_after_prepare(bank, "tx1", commit)
+
+    bank = open_sharded()
+    for shard in bank.shards:
+        assert shard.call('in_doubt') == []
+    if commit:
+        assert (bank.get_balance(SOURCE), bank.get_balance(TARGET)) == (70000, 130000)
+    else:
+        assert (bank.get_balance(SOURCE), bank.get_balance(TARGET)) == (100000, 100000)
+    assert bank.total_balance() == 200000
+    assert all(report['ok'] for report in bank.reconcile())
+    # Recovery resets the coordinator log once nothing is in doubt
+    assert list(bank.coordinator_log.records()) == []
+
+
+def test_transfer_survives_restart(open_sharded):
+    bank = open_sharded()
+    bank.open_account(SOURCE, "Asha Rao", "savings", 100000)
+    bank.open_account(TARGET, "Ravi Iyer", "savings", 100000)
+    bank.transfer(SOURCE, TARGET, 25000)
+    bank.close()
+
+    bank = open_sharded()
+    assert (bank.get_balance(SOURCE), bank.get_balance(TARGET)) == (75000, 125000)
+    assert all(report['ok'] for report in bank.reconcile())
+
+
+def test_coordinator_log_is_reset_between_transfers(open_sharded, monkeypatch):
+    monkeypatch.setattr(sharding, 'COORDINATOR_LOG_RECORDS', 30)
+    bank = open_sharded()
+    bank.open_account(SOURCE, "Asha Rao", "savings", 100000)
+    bank.open_account(TARGET, "Ravi Iyer", "savings", 100000)
+    for _ in range(100):
+        bank.transfer(SOURCE, TARGET, 100)
+    # Three records a transfer, so the log was reset at least nine times
+    assert len(list(bank.coordinator_log.records())) < 30
+    assert (bank.get_balance(SOURCE), bank.get_balance(TARGET)) == (90000, 110000)
+
+
+def test_execute_many_keeps_results_of_applied_calls():
+    bank = ShardedBank(shards=2)
+    try:
+        bank.open_account(SOURCE, "Asha Rao", "savings", 100000)
+        results = bank.execute_many([
+            ('post_deposit', (SOURCE, 100)),
+            ('book_ticket', (SOURCE, None, None, None, None, None)),
+            ('post_withdrawal', (TARGET, 100)),
+        ])
+        assert results[0]['balance'] == 100100
+        assert isinstance(results[1], Exception)
+        assert str(results[2]) == "Account does not exist"
+        assert bank.get_balance(SOURCE) == 100100
+    finally:
+        bank.close()
@@ -0,0 +1,128 @@
+import json
+import os
+import random
+
+import pytest
+
+import snapshot
+from ledger import LedgerError
+
+
+def take_snapshot(bank):
+    with bank.locks.hold_all():
+        bank.journal.snapshot(bank)
+
+
+def state(bank):
+    """The bank's state with stored and in-memory containers made comparable."""
+    return json.loads(json.dumps(bank._dump_state(), sort_keys=True))
+
+
+def populate(bank, count=200):
+    numbers = [str(200000000 + index) for index in range(count)]
+    bank.open_accounts({'account_number': numbers,
+                        'account_holder': [f"Holder {chr(65 + index % 26)}" for index in range(count)],
+                        'account_type': ['savings', 'checking'] * (count // 2),
+                        'initial_balance': [100000] * count})
+    for index in range(5):
+        bank.register_user(f"us_er{index}", f"user{index}@bank.com", "Passw0rd!x")
+        bank.assign_owner(numbers[index], f"us_er{index}")
+    bank.post_deposit(numbers[0], 2500)
+    bank.transfer(numbers[1], numbers[2], 750)
+    return numbers
+
+
+def mutate(bank, numbers, rng, round):
+    for _ in range(100):
+        account_number = rng.choice(numbers)
+        choice = rng.random()
+        if choice < 0.5:
+            bank.post_deposit(account_number, rng.randint(1, 1000))
+        elif choice < 0.7:
+            bank.transfer(account_number, rng.choice(numbers), 5)
+        elif choice < 0.85:
+            bank.assign_owner(account_number, f"us_er{rng.randrange(5)}")
+        else:
+            account_number = str(300000000 + len(numbers))
+            numbers.append(account_number)
+            bank.open_account(account_number, "Fresh " + "ABCDEF"[round % 6], "checking", 70000,
+                              owner=rng.choice([None, "us_er1"]))
+    bank.register_user(f"la_ter{round}", f"later{round}@bank.com", "Passw0rd!x")
+
+
+def test_binary_round_trip(open_bank, tmp_path):
+    bank = open_bank()
+    numbers = populate(bank)
+    expected = state(bank)
+    take_snapshot(bank)
+    bank.close()
+
+    bank = open_bank()
+    assert os.path.exists(tmp_path / "snapshot.bin")
+    assert isinstance(bank.users, snapshot.StoredUsers)
+    assert state(bank) == expected
+    assert bank.get_balance(numbers[0]) == 102500
+    assert bank.get_balance(numbers[2]) == 100750
+    assert bank.owns("us_er1", numbers[1])
+    assert "us_er4" in bank.users and "nobody_1" not in bank.users
+    assert sorted(bank.users) == [f"us_er{index}" for index in range(5)]
+    assert bank.reconcile()['ok']
+
+
+def test_merge_over_several_snapshots(open_bank):
+    rng = random.Random(7)
+    bank = open_bank()
+    numbers = populate(bank)
+    for round in range(4):
+        mutate(bank, numbers, rng, round)
+        expected = state(bank)
+        portfolios = {f"us_er{index}": bank.portfolio(f"us_er{index}", 0) for index in range(5)}
+        take_snapshot(bank)
+        bank.close()
+
+        bank = open_bank()
+        assert state(bank) == expected, round
+        assert {f"us_er{index}": bank.portfolio(f"us_er{index}", 0) for index in range(5)} == portfolios
+        assert f"la_ter{round}" in bank.users
+        assert bank.reconcile()['ok']
+
+
+def test_journal_replayed_over_snapshot(open_bank):
+    bank = open_bank()
+    numbers = populate(bank)
+    take_snapshot(bank)
+    bank.post_withdrawal(numbers[3], 400)
+    bank.open_account("400000001", "After Snapshot", "savings", 50000, owner="us_er0")
+    expected = state(bank)
+    bank.close()
+
+    bank = open_bank()
+    assert state(bank) == expected
+    assert bank.get_balance(numbers[3]) == 99600
+    assert bank.owns("us_er0", "400000001")
+
+
+@pytest.mark.parametrize("formats", [("binary", "json", "binary"), ("json", "binary", "json")])
+def test_switching_formats(open_bank, tmp_path, formats):
+    rng = random.Random(3)
+    bank = open_bank(snapshot_format=formats[0])
+    numbers = populate(bank)
+    for round, format in enumerate(formats):
+        mutate(bank, numbers, rng, round)
+        expected = state(bank)
+        take_snapshot(bank)
+        bank.close()
+        assert sorted(name for name in os.listdir(tmp_path) if name.startswith("snapshot.")) == \
+            ["snapshot.bin" if format == "binary" else "snapshot.json"]
+
+        following = formats[round + 1] if round + 1 < len(formats) else format
+        bank = open_bank(snapshot_format=following)
+        assert state(bank) == expected, (round, format)
+        assert bank.reconcile()['ok']
+
+
+def test_not_a_snapshot(tmp_path):
+    path = tmp_path / "snapshot.bin"
+    path.write_bytes(b"not a snapshot" * 10)
+    with pytest.raises(LedgerError):
+        snapshot.Snapshot(str(path))
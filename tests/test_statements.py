@@ -0,0 +1,100 @@
+import csv
+import gzip
+import json
+import threading
+from datetime import datetime
+
+import pytest
+
+import statements
+from bank import Bank
+
+ACCOUNTS = [str(100000001 + index) for index in range(7)]
+
+
+def make_bank(deposit=100):
+    bank = Bank()
+    bank.open_accounts({'account_number': ACCOUNTS, 'account_holder': ["Asha Rao"] * len(ACCOUNTS),
+                        'account_type': ["savings"] * len(ACCOUNTS),
+                        'initial_balance': [100000] * len(ACCOUNTS)})
+    for account_number in ACCOUNTS[:5]:
+        bank.post_transaction(account_number, 'deposit', deposit, timestamp=datetime(2024, 4, 30, 12))
+        bank.post_transaction(account_number, 'withdrawal', 300, timestamp=datetime(2024, 5, 2, 9, 30))
+        bank.post_transaction(account_number, 'deposit', 50, timestamp=datetime(2024, 6, 1))
+    return bank
+
+
+def read(result):
+    rows = []
+    for summary in result['files']:
+        with gzip.open(summary['file'], "rt", newline="") as f:
+            rows.extend(list(csv.reader(f))[1:])
+    return rows
+
+
+@pytest.mark.parametrize("processes", [1, 2])
+def test_statements_for_a_period(tmp_path, processes):
+    bank = make_bank()
+    result = bank.write_statements(str(tmp_path), "2024-05-01", "2024-06-01", processes=processes,
+                                   accounts_per_file=3)
+    assert (result['statements'], result['processes']) == (len(ACCOUNTS), processes)
+    assert result['entries'] == 5
+    assert [summary['statements'] for summary in result['files']] == [3, 3, 1]
+    rows = read(result)
+    assert rows[:3] == [
+        ['100000001', '2024-05-01T00:00:00', 'opening_balance', '', '100100'],
+        ['100000001', '2024-05-02T09:30:00', 'withdrawal', '300', '99800'],
+        ['100000001', '2024-06-01T00:00:00', 'closing_balance', '', '99800'],
+    ]
+    # Accounts without a history still get an opening and a closing balance
+    assert [row[2:] for row in rows if row[0] == ACCOUNTS[6]] == \
+        [['opening_balance', '', '100000'], ['closing_balance', '', '100000']]
+
+
+def test_jsonl_whole_history(tmp_path):
+    bank = make_bank()
+    result = bank.write_statements(str(tmp_path), format="jsonl", processes=1)
+    with gzip.open(result['files'][0]['file'], "rt") as f:
+        records = [json.loads(line) for line in f]
+    first = [record for record in records if record['account_number'] == ACCOUNTS[0]]
+    assert [(record['type'], record['balance']) for record in first] == [
+        ('opening_balance', 100000), ('deposit', 100100), ('withdrawal', 99800),
+        ('deposit', 99850), ('closing_balance', 99850)]
+    assert first[0]['timestamp'] is None
+
+
+def test_concurrent_writes_keep_their_own_books(tmp_path):
+    banks = [make_bank(deposit) for deposit in (100, 700)]
+    results = [None, None]
+
+    def write(index):
+        results[index] = banks[index].write_statements(str(tmp_path / str(index)), processes=2,
+                                                       accounts_per_file=2)
+
+    threads = [threading.Thread(target=write, args=(index,)) for index in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    for deposit, result in zip((100, 700), results):
+        deposits = {row[3] for row in read(result) if row[2] == 'deposit'}
+        assert deposits == {str(deposit), '50'}
+
+
+def test_workers_get_only_the_period(tmp_path):
+    bank = make_bank()
+    names = list(bank.transaction_history.type_names)
+    book = {'credit': [name in ('deposit',) for name in names],
+            'start': statements._timestamp_us("2024-05-01"), 'end': statements._timestamp_us("2024-06-01")}
+    _, numbers, openings, periods = statements._cut(book, bank.accounts, bank.transaction_history, 0, 0, 2)
+    assert numbers == ACCOUNTS[:2]
+    assert list(memoryview(openings).cast('q')) == [100100, 100100]
+    # One withdrawal each: the entries before and after the period stay behind
+    assert [len(period[1]) for period in periods] == [1, 1]
+
+
+def test_minute_cache_is_bounded():
+    assert statements._minute.cache_info().maxsize == statements.MINUTE_CACHE
+    assert statements._iso(None) == ""
+    timestamp = int(datetime(2024, 5, 2, 9, 30, 15, 250).timestamp()) * 1000000 + 250
+    assert statements._iso(timestamp) == "2024-05-02T09:30:15.000250"
@@ -0,0 +1,48 @@
+import json
+import os
+import subprocess
+import sys
+
+BENCHMARKS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks")
+sys.path.insert(0, BENCHMARKS)
+
+import suite  # noqa: E402
+import workload  # noqa: E402
+
+
+def test_workload_is_reproducible():
+    assert workload.operations(50, 500, seed=3) == workload.operations(50, 500, seed=3)
+    assert workload.operations(50, 500, seed=3) != workload.operations(50, 500, seed=4)
+    stream = workload.operations(50, 2000, mix={'deposit': 1, 'transfer': 1}, seed=3)
+    assert {name for name, _, _ in stream} == {'deposit', 'transfer'}
+    assert all(args[0] != args[1] for name, _, args in stream if name == 'transfer')
+    bank = workload.build_bank(3, 50, seed=3)
+    other = workload.build_bank(3, 50, seed=3)
+    assert bank.total_balance() == other.total_balance() and len(bank.users) == 3
+
+
+def test_regressions_beyond_the_threshold():
+    baseline = {'throughput_ops': 1000, 'bytes_per_op': 100,
+                'operations': {'deposit': {'p50_us': 10, 'p99_us': 50}}}
+    current = {'throughput_ops': 950, 'bytes_per_op': 130,
+               'operations': {'deposit': {'p50_us': 10.5, 'p99_us': 80}, 'bill': {'p50_us': 1, 'p99_us': 2}}}
+    found = suite.regressions(baseline, current, 0.10)
+    assert [line.split(":")[0] for line in found] == ["bytes_per_op", "deposit p99_us"]
+    assert suite.regressions(baseline, baseline, 0.10) == []
+
+
+def test_run_and_compare(tmp_path):
+    out = str(tmp_path / "results.json")
+    script = os.path.join(BENCHMARKS, "suite.py")
+    subprocess.run([sys.executable, script, "run", "--users", "3", "--accounts", "50", "--ops", "300",
+                    "--out", out], check=True, capture_output=True)
+    with open(out) as f:
+        results = json.load(f)
+    assert sum(entry['count'] for entry in results['operations'].values()) == 300
+    slower = str(tmp_path / "slower.json")
+    with open(slower, "w") as f:
+        json.dump(dict(results, throughput_ops=results['throughput_ops'] / 2), f)
+
+    def compare(current):
+        return subprocess.run([sys.executable, script, "compare", out, current], capture_output=True).returncode
+    assert (compare(out), compare(slower)) == (0, 1)
@@ -0,0 +1,86 @@
+from datetime import date, timedelta
+
+import pytest
+
+import trains
+from bank import Bank, BankError
+from trains import CONFIRMED, WAITLISTED, SeatInventory
+
+TRAVEL_DATE = (date.today() + timedelta(days=30)).isoformat()
+FIRST_AC = '2'
+LADIES = '2'
+
+
+def book(bank, account_number, quota=LADIES):
+    return bank.book_ticket(account_number, "MUMBAI", "PUNE", TRAVEL_DATE, FIRST_AC, quota)
+
+
+@pytest.fixture
+def bank():
+    bank = Bank()
+    for account_number in ("100000001", "100000002", "100000003"):
+        bank.open_account(account_number, "Asha Rao", "savings", 10000000)
+    return bank
+
+
+def test_every_quota_gets_a_pool():
+    inventory = SeatInventory(trains.CAPACITY[FIRST_AC])
+    available = inventory.available()
+    assert set(available) == set(trains.QUOTAS)
+    assert all(available.values())
+    assert sum(available.values()) == trains.CAPACITY[FIRST_AC]
+    seats = [seat for free in inventory.free.values() for seat in free]
+    assert sorted(seats) == list(range(1, trains.CAPACITY[FIRST_AC] + 1))
+
+
+def test_cancelling_a_seat_promotes_the_waitlist(bank):
+    first = book(bank, "100000001")
+    second = book(bank, "100000002")
+    third = book(bank, "100000003")
+    assert (first['status'], second['status'], third['status']) == (CONFIRMED, WAITLISTED, WAITLISTED)
+    assert second['seat'] is None and len({first['pnr'], second['pnr'], third['pnr']}) == 3
+
+    cancelled = bank.cancel_ticket("100000001", first['pnr'])
+    assert cancelled['promoted'] == second['pnr']
+    promoted = bank.get_ticket("100000002")
+    assert (promoted['status'], promoted['seat']) == (CONFIRMED, first['seat'])
+    assert bank.get_balance("100000001") == 10000000
+    with pytest.raises(BankError, match="already cancelled"):
+        bank.cancel_ticket("100000001", first['pnr'])
+
+    # A waitlisted ticket that cancels just leaves the queue
+    bank.cancel_ticket("100000003")
+    assert bank.cancel_ticket("100000002")['promoted'] is None
+    assert book(bank, "100000001")['status'] == CONFIRMED
+
+
+def test_full_waitlist_refuses_without_charging(bank, monkeypatch):
+    monkeypatch.setattr(trains, 'WAITLIST_LIMIT', 1)
+    book(bank, "100000001")
+    book(bank, "100000002")
+    with pytest.raises(BankError, match="No seats or waitlist places left"):
+        book(bank, "100000003")
+    assert bank.get_balance("100000003") == 10000000
+    assert book(bank, "100000003", quota='1')['status'] == CONFIRMED
+
+
+def test_tickets_survive_a_restart(open_bank):
+    bank = open_bank()
+    bank.open_account("100000001", "Asha Rao", "savings", 10000000)
+    bank.open_account("100000002", "Ravi Iyer", "savings", 10000000)
+    first = book(bank, "100000001")
+    second = book(bank, "100000002")
+    bank.cancel_ticket("100000001")
+    bank.close()
+    bank = open_bank()
+    assert bank.get_ticket("100000002", second['pnr'])['status'] == CONFIRMED
+    assert [ticket['pnr'] for ticket in bank.get_tickets("100000001")] == [first['pnr']]
+    assert book(bank, "100000001")['pnr'] > second['pnr']
+
+
+def test_unpadded_date_books_the_same_inventory(bank):
+    year = date.today().year + 1
+    first = bank.book_ticket("100000001", "MUMBAI", "PUNE", f"{year}-01-02", FIRST_AC, LADIES)
+    second = bank.book_ticket("100000002", "MUMBAI", "PUNE", f"{year}-1-2", FIRST_AC, LADIES)
+    assert second['travel_date'] == f"{year}-01-02"
+    assert first['status'] == CONFIRMED and second['status'] == WAITLISTED
@@ -0,0 +1,92 @@
+from datetime import datetime
+
+from txstore import TransactionStore, to_datetime, to_timestamp_us
+
+T0 = to_timestamp_us(datetime(2024, 3, 1, 9, 30))
+
+
+def test_entries_read_back_as_dicts():
+    store = TransactionStore()
+    store.append("100000001", 'deposit', 5000, T0)
+    store.append("100000001", 'withdrawal', 1200, T0 + 1)
+    history = store["100000001"]
+    assert len(history) == 2
+    assert history[0] == {'timestamp': datetime(2024, 3, 1, 9, 30), 'type': 'deposit', 'amount': 5000}
+    assert history[-1]['type'] == 'withdrawal'
+    assert [entry['amount'] for entry in history] == [5000, 1200]
+    assert store.type_names == ['deposit', 'withdrawal']
+
+
+def test_timestamps_never_go_backwards():
+    store = TransactionStore()
+    store.append("100000001", 'deposit', 100, T0)
+    store.append("100000001", 'deposit', 100, T0 - 1000000)
+    store.extend("100000001", ['deposit', 'withdrawal'], [1, 2], T0 - 5)
+    store.append_run(["100000001", "100000002"], 'interest', [3, 4], T0 - 7)
+    assert list(store["100000001"].timestamps) == [T0] * 5
+    assert list(store["100000002"].timestamps) == [T0 - 7]
+
+
+def test_dump_and_load_round_trip():
+    store = TransactionStore()
+    store.extend("100000001", ['deposit', 'withdrawal'], [700, 200], T0)
+    store.append("100000002", 'interest', 3, T0 + 10)
+    loaded = TransactionStore.load(store.dump())
+    assert sorted(loaded) == ["100000001", "100000002"]
+    assert loaded["100000001"][:] == store["100000001"][:]
+    assert loaded["100000002"][0]['timestamp'] == to_datetime(T0 + 10)
+    assert loaded.entry_count() == 3
+
+
+def history_of(count):
+    """One account with `count` entries a second apart, alternating deposits and withdrawals."""
+    store = TransactionStore()
+    for i in range(count):
+        store.append("100000001", 'deposit' if i % 2 == 0 else 'withdrawal', (i + 1) * 100, T0 + i * 1000000)
+    return store["100000001"]
+
+
+def test_query_filters():
+    history = history_of(10)
+    amounts = [entry['amount'] for entry in history.query(start=T0 + 2000000, end=datetime(2024, 3, 1, 9, 30, 7))]
+    assert amounts == [300, 400, 500, 600, 700]
+    assert [entry['amount'] for entry in history.query(types=['withdrawal'], min_amount=400, max_amount=800)] == \
+        [400, 600, 800]
+    assert [entry['amount'] for entry in history.query(newest_first=True, types=['deposit'])] == \
+        [900, 700, 500, 300, 100]
+    assert list(history.query(types=['interest'])) == []
+
+
+def test_pages_cover_every_entry_once():
+    history = history_of(25)
+    for newest_first in (False, True):
+        amounts = []
+        cursor = None
+        while True:
+            page = history.page(limit=10, cursor=cursor, newest_first=newest_first)
+            amounts.extend(entry['amount'] for entry in page['entries'])
+            cursor = page['next_cursor']
+            if cursor is None:
+                break
+        expected = [(i + 1) * 100 for i in range(25)]
+        assert amounts == (expected[::-1] if newest_first else expected)
+
+
+def test_filtered_pages():
+    history = history_of(25)
+    first = history.page(limit=4, types=['withdrawal'])
+    assert [entry['amount'] for entry in first['entries']] == [200, 400, 600, 800]
+    second = history.page(limit=4, cursor=first['next_cursor'], types=['withdrawal'])
+    assert [entry['amount'] for entry in second['entries']] == [1000, 1200, 1400, 1600]
+
+
+def test_bank_queries(open_bank):
+    bank = open_bank()
+    bank.open_account("100000001", "Asha Rao", "savings", 50000)
+    for amount in (100, 200, 300):
+        bank.post_deposit("100000001", amount)
+    assert [entry['amount'] for entry in bank.query_transactions("100000001", min_amount=200)] == [200, 300]
+    page = bank.transaction_page("100000001", limit=2, newest_first=True)
+    assert [entry['amount'] for entry in page['entries']] == [300, 200]
+    assert bank.transaction_page("999999999") == {'entries': [], 'next_cursor': None}
+    assert list(bank.query_transactions("999999999")) == []
@@ -0,0 +1,62 @@
+import pytest
+
+import validation
+from bank import Bank
+
+
+@pytest.mark.parametrize("field, value", [
+    ('username', "asha_1"),
+    ('email', "asha1@example.com"),
+    ('password', "Secret123"),
+    ('mpin', "123456"),
+    ('account_number', "123456789"),
+    ('account_holder', "José García"),
+    ('account_holder', "राम कुमार"),
+    ('customer_id', "ABC12345"),
+    ('mobile_number', "9876543210"),
+])
+def test_valid_values(field, value):
+    assert validation.errors(field, value) == []
+    assert validation.first_error(field, value) == ""
+
+
+def test_every_broken_rule_is_reported_in_order():
+    assert validation.errors('password', "secret") == [
+        "Password must contain at least one uppercase letter",
+        "Password must contain at least one digit",
+        "Password length must be between 8 and 15 characters",
+    ]
+    assert validation.first_error('username', "1bad") == "Username must be start with a letter"
+
+
+@pytest.mark.parametrize("field", ['account_number', 'mpin', 'mobile_number', 'account_holder', 'email'])
+def test_validate_many_agrees_with_errors(field):
+    values = ["123456789", "12345", "12345678x", "", "１２３４５６７８９", "1234567890", "123456",
+              "Asha Rao", " ", "Asha 2", "asha1@example.com"] * 40
+    expected = [(index, validation.errors(field, value))
+                for index, value in enumerate(values) if validation.errors(field, value)]
+    assert validation.validate_many(field, values) == expected
+
+
+def test_validate_many_gives_each_value_its_own_list():
+    failures = validation.validate_many('account_number', ["12", "34"])
+    assert failures == [(0, ["Account number length must be between 9 and 18 digits"]),
+                        (1, ["Account number length must be between 9 and 18 digits"])]
+    failures[0][1].append("changed")
+    assert len(failures[1][1]) == 1
+
+
+def test_validate_many_on_a_valid_column():
+    assert validation.validate_many('account_number', ["123456789"] * 1000) == []
+    assert validation.validate_many('account_holder', ["Asha Rao"] * 1000) == []
+
+
+def test_bank_validate_many_reports_existing_and_repeated_numbers():
+    bank = Bank()
+    bank.open_account("100000003", "Mira Das", "savings", 10000)
+    failures = bank.validate_many('account_number', ["100000001", "100000003", "100000001", "12"])
+    assert failures == [
+        (1, ["Account number already exists"]),
+        (2, ["Account number already exists"]),
+        (3, ["Account number length must be between 9 and 18 digits"]),
+    ]
@@ -0,0 +1,202 @@
+"""Seat inventory, PNRs and waitlists for train bookings.
+
+Seats are sold per (train, travel date, class). Each of those has a pool of
+seats per quota, carved out of the class's capacity by QUOTA_SHARES, with
+General taking whatever is left. Every quota with a share gets at least
+one seat, so a small class (First AC) still has a Ladies and a PH seat. A pool is a stack of free seat numbers,
+so reserving or releasing a seat is one list operation. When a pool is
+empty, bookings join its waitlist, up to WAITLIST_LIMIT; cancelling a
+confirmed ticket hands its seat to the first ticket waiting in the same
+pool.
+
+Every booking gets a PNR and an account can hold any number of tickets.
+Reservations does no locking of its own: Bank.book_ticket and
+cancel_ticket call it holding the stripe locks of both the account and
+the inventory key, so each pool changes under one lock.
+"""
+
+import threading
+from collections import deque
+
+CLASSES = {'1': 'Sleeper', '2': 'First AC', '3': 'Second AC', '4': 'Third AC'}
+QUOTAS = {'1': 'General', '2': 'Ladies', '3': 'Sr. Citizen', '4': 'Physically Handicapped', '5': 'Tatkal'}
+GENERAL_QUOTA = '1'
+# Seats per class on every train
+CAPACITY = {'1': 720, '2': 24, '3': 96, '4': 256}
+# Fraction of a class's seats held for each quota other than General
+QUOTA_SHARES = {'2': 0.02, '3': 0.05, '4': 0.01, '5': 0.25}
+WAITLIST_LIMIT = 100
+
+CONFIRMED = 'CNF'
+WAITLISTED = 'WL'
+CANCELLED = 'CAN'
+
+
+def travel_day(travel_date):
+    """The ISO form of a YYYY-MM-DD date, so "2027-1-2" and "2027-01-02" are one day.
+
+    Raises ValueError for a date that does not parse.
+    """
+    from datetime import datetime
+    return datetime.strptime(travel_date, '%Y-%m-%d').date().isoformat()
+
+
+def inventory_key(train, travel_date, travel_class):
+    return f"{train}|{travel_date}|{travel_class}"
+
+
+def route_train(from_station, to_station):
+    """The train a booking without one uses: one train per route."""
+    return from_station.strip().upper() + "-" + to_station.strip().upper()
+
+
+class SeatInventory:
+    """Free seats and waitlist of every quota pool of one train, date and class."""
+
+    __slots__ = ('free', 'waiting')
+
+    def __init__(self, capacity):
+        self.free = {}
+        self.waiting = {}
+        start = 1
+        for quota in QUOTAS:
+            if quota == GENERAL_QUOTA:
+                continue
+            share = QUOTA_SHARES.get(quota, 0)
+            size = max(1, int(capacity * share)) if share else 0
+            # Leave General at least one seat too
+            size = min(size, capacity - start)
+            self._add_pool(quota, start, size)
+            start += size
+        self._add_pool(GENERAL_QUOTA, start, capacity - start + 1)
+
+    def _add_pool(self, quota, start, size):
+        # Reversed, so pop() hands out the lowest seat number first
+        self.free[quota] = list(range(start + size - 1, start - 1, -1))
+        self.waiting[quota] = deque()
+
+    def has_room(self, quota):
+        return bool(self.free[quota]) or len(self.waiting[quota]) < WAITLIST_LIMIT
+
+    def reserve(self, pnr, quota):
+        """A seat number for `pnr`, or None when it joined the waitlist."""
+        free = self.free[quota]
+        if free:
+            return free.pop()
+        waiting = self.waiting[quota]
+        if len(waiting) >= WAITLIST_LIMIT:
+            raise ValueError("No seats or waitlist places left in this quota")
+        waiting.append(pnr)
+        return None
+
+    def release(self, seat, quota):
+        """Free `seat`; returns the PNR promoted into it, or None."""
+        waiting = self.waiting[quota]
+        if waiting:
+            return waiting.popleft()
+        self.free[quota].append(seat)
+        return None
+
+    def leave_waitlist(self, pnr, quota):
+        self.waiting[quota].remove(pnr)
+
+    def available(self):
+        return {quota: len(free) for quota, free in self.free.items()}
+
+    def dump(self):
+        return {'free': self.free, 'waiting': {quota: list(pnrs) for quota, pnrs in self.waiting.items()}}
+
+    @classmethod
+    def load(cls, data):
+        inventory = cls.__new__(cls)
+        inventory.free = data['free']
+        inventory.waiting = {quota: deque(pnrs) for quota, pnrs in data['waiting'].items()}
+        return inventory
+
+
+class Reservations:
+    """Every ticket by PNR, the PNRs of each account, and the seat inventories."""
+
+    def __init__(self):
+        self.tickets = {}
+        self.by_account = {}
+        self.inventories = {}
+        self.last_pnr = 0
+        self._pnr_lock = threading.Lock()
+
+    def next_pnr(self):
+        with self._pnr_lock:
+            self.last_pnr += 1
+            return str(self.last_pnr).zfill(10)
+
+    def inventory(self, key):
+        inventory = self.inventories.get(key)
+        if inventory is None:
+            travel_class = key.rsplit("|", 1)[1]
+            inventory = self.inventories.setdefault(key, SeatInventory(CAPACITY[travel_class]))
+        return inventory
+
+    def has_room(self, ticket):
+        key = inventory_key(ticket['train'], ticket['travel_date'], ticket['travel_class'])
+        return self.inventory(key).has_room(ticket['quota'])
+
+    def book(self, account_number, ticket):
+        """Seat or waitlist `ticket` (which carries its PNR) and file it under the account.
+
+        Raises ValueError, leaving everything unchanged, when the pool and
+        its waitlist are both full.
+        """
+        pnr = ticket['pnr']
+        key = inventory_key(ticket['train'], ticket['travel_date'], ticket['travel_class'])
+        seat = self.inventory(key).reserve(pnr, ticket['quota'])
+        ticket = dict(ticket, account=account_number, seat=seat,
+                      status=CONFIRMED if seat is not None else WAITLISTED)
+        self.tickets[pnr] = ticket
+        self.by_account.setdefault(account_number, []).append(pnr)
+        if int(pnr) > self.last_pnr:
+            self.last_pnr = int(pnr)
+        return ticket
+
+    def cancel(self, pnr):
+        """Cancel a ticket; returns it and the ticket promoted into its seat, if any."""
+        ticket = self.tickets[pnr]
+        key = inventory_key(ticket['train'], ticket['travel_date'], ticket['travel_class'])
+        promoted = None
+        if ticket['status'] == CONFIRMED and ticket['seat'] is not None:
+            promoted_pnr = self.inventory(key).release(ticket['seat'], ticket['quota'])
+            if promoted_pnr is not None:
+                promoted = self.tickets[promoted_pnr]
+                promoted['seat'] = ticket['seat']
+                promoted['status'] = CONFIRMED
+        elif ticket['status'] == WAITLISTED:
+            self.inventory(key).leave_waitlist(pnr, ticket['quota'])
+        ticket['status'] = CANCELLED
+        ticket['seat'] = None
+        return ticket, promoted
+
+    def of_account(self, account_number):
+        return [self.tickets[pnr] for pnr in self.by_account.get(account_number, ())]
+
+    def latest_active(self, account_number):
+        for pnr in reversed(self.by_account.get(account_number, ())):
+            if self.tickets[pnr]['status'] != CANCELLED:
+                return self.tickets[pnr]
+        return None
+
+    def dump(self):
+        return {
+            'tickets': self.tickets,
+            'inventories': {key: inventory.dump() for key, inventory in self.inventories.items()},
+            'last_pnr': self.last_pnr
+        }
+
+    @classmethod
+    def load(cls, data):
+        reservations = cls()
+        reservations.tickets = data['tickets']
+        for pnr, ticket in reservations.tickets.items():
+            reservations.by_account.setdefault(ticket['account'], []).append(pnr)
+        reservations.inventories = {key: SeatInventory.load(inventory)
+                                    for key, inventory in data['inventories'].items()}
+        reservations.last_pnr = data['last_pnr']
+        return reservations
@@ -0,0 +1,258 @@
+"""Columnar, array-backed storage for Bank.transaction_history."""
+
+import threading
+from array import array
+from bisect import bisect_left
+
+def to_datetime(timestamp_us):
+    from datetime import datetime
+    seconds, micros = divmod(timestamp_us, 1000000)
+    return datetime.fromtimestamp(seconds).replace(microsecond=micros)
+
+
+def _as_timestamp_us(value):
+    return value if isinstance(value, int) else to_timestamp_us(value)
+
+
+def to_timestamp_us(value):
+    """Epoch microseconds from a datetime or an ISO-8601 string."""
+    if isinstance(value, str):
+        from datetime import datetime
+        value = datetime.fromisoformat(value)
+    return int(value.timestamp()) * 1000000 + value.microsecond
+
+
+class AccountHistory:
+    """One account's transactions as three parallel columns.
+
+    Timestamps are int64 epoch microseconds, types are uint8 codes into the
+    store's type table and amounts are int64 paise, so each
+    entry costs 17 bytes and a scan is a walk over contiguous arrays.
+    Indexing still yields the familiar {'timestamp', 'type', 'amount'} dict,
+    built only for the entries actually read.
+    """
+
+    __slots__ = ('store', 'timestamps', 'types', 'amounts')
+
+    def __init__(self, store):
+        self.store = store
+        self.timestamps = array('q')
+        self.types = array('B')
+        self.amounts = array('q')
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self.entry(i) for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        return self.entry(index)
+
+    def __iter__(self):
+        for i in range(len(self.timestamps)):
+            yield self.entry(i)
+
+    def rows(self, start=None, end=None, types=None, min_amount=None, max_amount=None,
+             newest_first=False, cursor=None):
+        """Yield the indexes of matching entries, lazily.
+
+        `start`/`end` bound the timestamp (end exclusive) and are found by
+        bisecting the timestamp column, which is monotonic per account.
+        `cursor` is the position a previous page stopped at.
+        """
+        timestamps = self.timestamps
+        low = 0 if start is None else bisect_left(timestamps, _as_timestamp_us(start))
+        high = len(timestamps) if end is None else bisect_left(timestamps, _as_timestamp_us(end))
+        if cursor is not None:
+            if newest_first:
+                high = min(high, cursor)
+            else:
+                low = max(low, cursor)
+        indexes = range(high - 1, low - 1, -1) if newest_first else range(low, high)
+
+        codes = None
+        if types is not None:
+            type_codes = self.store.type_codes
+            codes = {type_codes[t] for t in types if t in type_codes}
+        if codes is None and min_amount is None and max_amount is None:
+            yield from indexes
+            return
+        type_column = self.types
+        amounts = self.amounts
+        for i in indexes:
+            if codes is not None and type_column[i] not in codes:
+                continue
+            amount = amounts[i]
+            if min_amount is not None and amount < min_amount:
+                continue
+            if max_amount is not None and amount > max_amount:
+                continue
+            yield i
+
+    def query(self, **filters):
+        """Lazily yield the entries matching `filters` (see rows())."""
+        for i in self.rows(**filters):
+            yield self.entry(i)
+
+    def page(self, limit=50, cursor=None, newest_first=False, **filters):
+        """One page of matching entries plus the cursor for the next page.
+
+        `next_cursor` is None once there is nothing left to read.
+        """
+        entries = []
+        next_cursor = None
+        for i in self.rows(cursor=cursor, newest_first=newest_first, **filters):
+            if len(entries) == limit:
+                next_cursor = i + 1 if newest_first else i
+                break
+            entries.append(self.entry(i))
+        return {'entries': entries, 'next_cursor': next_cursor}
+
+    def entry(self, i):
+        return {
+            'timestamp': to_datetime(self.timestamps[i]),
+            'type': self.store.type_names[self.types[i]],
+            'amount': self.amounts[i]
+        }
+
+
+class TransactionStore:
+    """Mapping of account number to AccountHistory with a shared type table.
+
+    A store opened from a binary snapshot keeps `stored`, the histories
+    still in the file (see snapshot.py). Reads see those in place; one is
+    copied into `histories` when it is first written to.
+    """
+
+    def __init__(self):
+        self.histories = {}
+        self.stored = None
+        self.type_names = []
+        self.type_codes = {}
+        self._types_lock = threading.Lock()
+
+    def type_code(self, transaction_type):
+        code = self.type_codes.get(transaction_type)
+        if code is None:
+            with self._types_lock:
+                code = self.type_codes.get(transaction_type)
+                if code is None:
+                    if len(self.type_names) == 256:
+                        raise ValueError("Too many transaction types")
+                    self.type_names.append(transaction_type)
+                    code = self.type_codes[transaction_type] = len(self.type_names) - 1
+        return code
+
+    def history(self, account_number):
+        """The account's history to append to, created if it has none."""
+        history = self.histories.get(account_number)
+        if history is None:
+            position = self.stored.find(account_number) if self.stored is not None else None
+            history = AccountHistory(self) if position is None else self.stored.copy(self, position)
+            # A reader may be copying the same history; both keep the first
+            history = self.histories.setdefault(account_number, history)
+        return history
+
+    def append(self, account_number, transaction_type, amount, timestamp_us):
+        history = self.history(account_number)
+        timestamps = history.timestamps
+        # Keep each account's timestamps non-decreasing so range queries can
+        # bisect, even if the clock steps back or two writers race.
+        if timestamps and timestamp_us < timestamps[-1]:
+            timestamp_us = timestamps[-1]
+        timestamps.append(timestamp_us)
+        history.types.append(self.type_code(transaction_type))
+        history.amounts.append(amount)
+
+    def extend(self, account_number, types, amounts, timestamp_us):
+        """Append one account's run of transactions sharing one timestamp."""
+        codes = self.type_codes
+        for transaction_type in set(types):
+            if transaction_type not in codes:
+                self.type_code(transaction_type)
+        history = self.history(account_number)
+        if history.timestamps and timestamp_us < history.timestamps[-1]:
+            timestamp_us = history.timestamps[-1]
+        history.timestamps.extend(array('q', [timestamp_us]) * len(types))
+        history.types.extend(array('B', map(codes.__getitem__, types)))
+        history.amounts.extend(amounts)
+
+    def append_run(self, account_numbers, transaction_type, amounts, timestamp_us):
+        """Append one transaction of the same type to each of many accounts."""
+        code = self.type_code(transaction_type)
+        histories = self.histories
+        for account_number, amount in zip(account_numbers, amounts):
+            history = histories.get(account_number)
+            if history is None:
+                history = self.history(account_number)
+            timestamps = history.timestamps
+            timestamps.append(timestamp_us if not timestamps or timestamp_us >= timestamps[-1]
+                              else timestamps[-1])
+            history.types.append(code)
+            history.amounts.append(amount)
+
+    def entry_count(self):
+        return sum(len(history) for _, history in self.items())
+
+    def __contains__(self, account_number):
+        return account_number in self.histories or (self.stored is not None
+                                                     and self.stored.find(account_number) is not None)
+
+    def __getitem__(self, account_number):
+        history = self.get(account_number)
+        if history is None:
+            raise KeyError(account_number)
+        return history
+
+    def get(self, account_number, default=None):
+        history = self.histories.get(account_number)
+        if history is None and self.stored is not None:
+            position = self.stored.find(account_number)
+            if position is not None:
+                history = self.stored.view(self, position)
+        return default if history is None else history
+
+    def __iter__(self):
+        for account_number, _ in self.items():
+            yield account_number
+
+    def __len__(self):
+        if self.stored is None:
+            return len(self.histories)
+        return sum(1 for _ in self.items())
+
+    def items(self):
+        if self.stored is None:
+            return self.histories.items()
+        return self._all_items()
+
+    def _all_items(self):
+        histories = self.histories
+        yield from list(histories.items())
+        stored = self.stored
+        for position, account_number in enumerate(stored.numbers()):
+            if account_number not in histories:
+                yield account_number, stored.view(self, position)
+
+    def dump(self):
+        return {
+            'types': self.type_names,
+            'accounts': {
+                account_number: [list(h.timestamps), list(h.types), list(h.amounts)]
+                for account_number, h in self.items()
+            }
+        }
+
+    @classmethod
+    def load(cls, data):
+        store = cls()
+        for name in data['types']:
+            store.type_code(name)
+        for account_number, (timestamps, types, amounts) in data['accounts'].items():
+            history = store.history(account_number)
+            history.timestamps.extend(timestamps)
+            history.types.extend(types)
+            history.amounts.extend(amounts)
+        return store
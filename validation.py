@@ -0,0 +1,210 @@
+"""Precompiled input validators that report every failure in one go.
+
+Each field has one precompiled pattern that matches exactly the valid
+values, so the common case is a single pass in C. validate_many checks
+digit-only fields with one inline pass of str methods, and first tries
+names as a whole column (join the values and test them once), only
+looking at values one by one when that fails. Only a value that fails
+goes through the field's rules, which gather its characters into a set
+once and test that against fixed character classes, to report every rule
+broken. Rules and messages match the Bank.validate_* methods, in the same
+order, so the first failure reported is the same one those methods
+returned.
+
+The patterns and column checks only know ASCII letters; they are fast
+paths, never the last word. A value they do not match is judged by the
+rules, which test letters and digits with the str methods as the
+original validators did, so names like "José García" are still
+accepted. A name may also carry combining marks after a letter, such as
+Devanagari vowel signs, which str.isalpha() does not count as letters,
+so "राम कुमार" is accepted too. Account numbers, MPINs and mobile numbers stay
+ASCII digits, which is what the account table stores.
+
+    errors("password", "secret")  ->  ['Password must contain at least one uppercase letter', ...]
+    validate_many("email", emails)  ->  [(index, [messages]), ...] for the bad values only
+"""
+
+# Spelled out rather than taken from the string module, which imports re
+DIGITS = frozenset("0123456789")
+# What the whole-column check of names accepts without looking further
+NAME_CHARS = frozenset("ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz ")
+# Values per block when a whole-column check fails
+BLOCK = 256
+
+
+def _has(test, chars):
+    """Whether any of `chars` passes the str method `test`."""
+    return any(map(test, chars))
+
+
+def _is_name(value):
+    """Letters and spaces, where a letter may be followed by combining marks."""
+    letters = value.replace(" ", "")
+    if letters.isalpha():
+        return True
+    if not letters[:1].isalpha():
+        return False
+    from unicodedata import category
+    return all(char.isalpha() or category(char).startswith("M") for char in letters)
+
+
+# field -> [(test(value, chars), message)]; a test returns True when the value passes
+RULES = {
+    'username': [
+        (lambda value, chars: value[:1].isalpha(), "Username must be start with a letter"),
+        (lambda value, chars: _has(str.isdigit, chars), "Username must contain at least one number"),
+        (lambda value, chars: '_' in chars, "Username must contain an underscore"),
+        (lambda value, chars: 6 <= len(value) <= 20, "Username length must be between 6 and 20 characters"),
+    ],
+    'email': [
+        (lambda value, chars: '@' in chars, "Invalid email format. Email must be contain '@'"),
+        (lambda value, chars: value.endswith('.com'), "Invalid email format. Email must be end with '.com'"),
+        (lambda value, chars: _has(str.isalpha, chars), "Email must contain at least one letter"),
+        (lambda value, chars: _has(str.isdigit, chars), "Email must contain at least one digit"),
+    ],
+    'password': [
+        (lambda value, chars: _has(str.isupper, chars), "Password must contain at least one uppercase letter"),
+        (lambda value, chars: _has(str.islower, chars), "Password must contain at least one lowercase letter"),
+        (lambda value, chars: _has(str.isdigit, chars), "Password must contain at least one digit"),
+        (lambda value, chars: 8 <= len(value) <= 15, "Password length must be between 8 and 15 characters"),
+    ],
+    'mpin': [
+        (lambda value, chars: len(value) == 6 and chars <= DIGITS, "MPIN must be a 6-digit number"),
+    ],
+    'account_number': [
+        (lambda value, chars: bool(chars) and chars <= DIGITS, "Account number must contain only digits"),
+        (lambda value, chars: 9 <= len(value) <= 18, "Account number length must be between 9 and 18 digits"),
+    ],
+    'account_holder': [
+        (lambda value, chars: _is_name(value), "Account holder's name must contain only alphabets"),
+    ],
+    'customer_id': [
+        (lambda value, chars: value[:3].isalpha() and value[3:].isdigit(),
+         "Customer ID must start with 3 alphabetic characters followed by 5 digits."),
+    ],
+    'mobile_number': [
+        (lambda value, chars: len(value) == 10 and chars <= DIGITS, "Mobile number must be 10 digits"),
+    ],
+}
+
+
+# field -> pattern that fully matches a value passing every rule above (an
+# ASCII subset of the valid values; the rules decide the rest)
+PATTERNS = {
+    'username': r"[A-Za-z](?=.*[0-9])(?=.*_).{5,19}",
+    'email': r"(?=.*@)(?=.*[0-9]).*\.com",
+    'password': r"(?=.*[A-Z])(?=.*[a-z])(?=.*[0-9]).{8,15}",
+    'account_holder': r" *[A-Za-z][A-Za-z ]*",
+    'customer_id': r"[A-Za-z]{3}[0-9]+",
+}
+
+# Plain digit strings are checked faster by str methods than by a pattern
+DIGIT_LENGTHS = {
+    'mpin': (6, 6),
+    'account_number': (9, 18),
+    'mobile_number': (10, 10),
+}
+
+# Compiled on first use, so importing this module does not import re
+_matchers = {}
+
+
+def _digits_matcher(shortest, longest):
+    def match(value):
+        return shortest <= len(value) <= longest and value.isdigit() and value.isascii()
+    return match
+
+
+def _matcher(field):
+    matcher = _matchers.get(field)
+    if matcher is None:
+        if field in DIGIT_LENGTHS:
+            matcher = _digits_matcher(*DIGIT_LENGTHS[field])
+        else:
+            import re
+            matcher = re.compile(PATTERNS[field], re.ASCII | re.DOTALL).fullmatch
+        _matchers[field] = matcher
+    return matcher
+
+
+def errors(field, value):
+    """Every rule `value` breaks, in rule order; empty when it is valid."""
+    if _matcher(field)(value):
+        return []
+    chars = set(value)
+    return [message for test, message in RULES[field] if not test(value, chars)]
+
+
+def first_error(field, value):
+    """The first broken rule's message, or "" when valid."""
+    if _matcher(field)(value):
+        return ""
+    chars = set(value)
+    for test, message in RULES[field]:
+        if not test(value, chars):
+            return message
+    return ""
+
+
+def _names_valid(values):
+    """Whole-column check for names, run as a few C-level passes.
+
+    True means every value is valid; False only means some value may not be.
+    """
+    return set("".join(values)) <= NAME_CHARS and all(map(str.strip, values))
+
+
+def validate_many(field, values):
+    """Check a sequence of values; returns (index, messages) for each bad one."""
+    if field in DIGIT_LENGTHS:
+        return _validate_digits(field, values)
+    if field == 'account_holder':
+        if _names_valid(values):
+            return []
+        # Narrow down to the blocks holding the bad values
+        match = _matcher(field)
+        bad = []
+        for start in range(0, len(values), BLOCK):
+            block = values[start:start + BLOCK]
+            if not _names_valid(block):
+                bad.extend(start + index for index, value in enumerate(block) if not match(value))
+    else:
+        match = _matcher(field)
+        bad = [index for index, value in enumerate(values) if not match(value)]
+    rules = RULES[field]
+    failures = []
+    for index in bad:
+        value = values[index]
+        chars = set(value)
+        messages = [message for test, message in rules if not test(value, chars)]
+        if messages:
+            failures.append((index, messages))
+    return failures
+
+
+def _validate_digits(field, values):
+    """validate_many for the digit fields, whose rules look only at the
+    length and whether every character is an ASCII digit.
+
+    One pass of str methods per value costs about what joining the column
+    would, and the rules run once per shape (length, and whether it is all
+    digits) rather than once per bad value. It is a plain loop because the
+    list comprehension form measured at half speed on its first calls.
+    """
+    shortest, longest = DIGIT_LENGTHS[field]
+    rules = RULES[field]
+    shapes = {}
+    failures = []
+    for index, value in enumerate(values):
+        if shortest <= len(value) <= longest and value.isdigit() and value.isascii():
+            continue
+        # The length, complemented when a character is not an ASCII digit
+        shape = len(value) if value.isdigit() and value.isascii() else ~len(value)
+        messages = shapes.get(shape)
+        if messages is None:
+            chars = set(value)
+            messages = shapes[shape] = [message for test, message in rules if not test(value, chars)]
+        if messages:
+            # Callers add to the lists, so each value gets its own
+            failures.append((index, messages[:]))
+    return failures